@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import os
+
+import numpy as np
+
 
 __author__ = 'Johan Stabekk'
 __email__ = 'johan.stabekk@nmbu.no'
@@ -38,6 +42,87 @@ class ListRand:
         return number
 
 
+class ReplayRand:
+
+    def __init__(self, source, dtype='<u4', offset=0, cache_size=4096):
+        """
+        Replays a recorded stream of random numbers without copying it.
+
+        Arguments
+        ---------
+        source : str, os.PathLike or buffer
+            Binary file with the recorded numbers, which is memory mapped,
+            or any object supporting the buffer protocol (bytes, bytearray,
+            memoryview, mmap, NumPy array), which is used in place.
+        dtype : str or np.dtype
+            Data type of the recorded numbers, little-endian uint32 by
+            default (see ``record``)
+        offset : int
+            Number of bytes to skip at the start of the source
+        cache_size : int
+            Numbers converted to Python ints at a time for ``rand``
+        """
+        if isinstance(source, (str, os.PathLike)):
+            self.numbers = np.memmap(source, dtype=dtype, mode='r',
+                                     offset=offset)
+        else:
+            self.numbers = np.frombuffer(source, dtype=dtype, offset=offset)
+            # The view of a writable buffer, like a bytearray, is writable
+            self.numbers.flags.writeable = False
+        self.position = 0
+        self.cache_size = cache_size
+        self._cache = []
+        self._cache_start = 0
+
+    @staticmethod
+    def record(numbers, filename, dtype='<u4'):
+        """
+        Write a stream of random numbers to a binary file that ReplayRand
+        can replay.
+        """
+        np.asarray(numbers, dtype=dtype).tofile(filename)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position):
+        if not 0 <= position <= len(self.numbers):
+            raise ValueError('Position outside of the recorded stream')
+        self.position = position
+
+    def rand(self):
+
+        index = self.position - self._cache_start
+        if not 0 <= index < len(self._cache):
+            if self.position >= len(self.numbers):
+                raise RuntimeError
+            self._cache_start = self.position
+            self._cache = self.numbers[
+                self.position:self.position + self.cache_size
+            ].tolist()
+            index = 0
+
+        self.position += 1
+
+        return self._cache[index]
+
+    def rand_block(self, k):
+        """
+        Returns the next k numbers (fewer at the end of the stream) as a
+        read-only view into the recorded stream.
+        """
+        if self.position >= len(self.numbers):
+            raise RuntimeError
+
+        block = self.numbers[self.position:self.position + k]
+        self.position += len(block)
+
+        return block
+
+
 if __name__ == '__main__':
 
     list_nr = ListRand([1, 5, 1, 2, 3, 4])
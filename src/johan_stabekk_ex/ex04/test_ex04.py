@@ -5,8 +5,9 @@ Acceptance test suite for EX04.
 Your code should pass these tests before submission.
 """
 
+import numpy as np
 import pytest
-from myrand import LCGRand, ListRand
+from myrand import LCGRand, ListRand, ReplayRand
 from walker import Walker
 
 __author__ = 'Johan Stabekk'
@@ -40,3 +41,33 @@ def test_walker():
     assert w.get_position() != start
     w.move()
     assert w.get_steps() == 2
+
+
+def test_replay_rng(tmp_path):
+    """Test that ReplayRand replays a recorded stream."""
+    numbers = [4, 5, 29, 11, 2 ** 32 - 2]
+    filename = tmp_path / 'stream.u4'
+    ReplayRand.record(numbers, filename)
+
+    for source in [filename, np.array(numbers, dtype='<u4').tobytes()]:
+        rr = ReplayRand(source, cache_size=2)
+        assert [rr.rand() for _ in range(len(numbers))] == numbers
+        with pytest.raises(RuntimeError):
+            rr.rand()
+
+        rr.seek(1)
+        assert rr.rand_block(3).tolist() == numbers[1:4]
+        assert rr.tell() == 4
+        assert rr.rand() == numbers[4]
+
+
+def test_replay_rng_does_not_copy():
+    """Test that ReplayRand reads from the buffer it is given."""
+    buffer = bytearray(np.arange(10, dtype='<u4').tobytes())
+    rr = ReplayRand(buffer)
+    block = rr.rand_block(4)
+    assert np.shares_memory(block, rr.numbers)
+    buffer[0] = 7
+    assert block[0] == 7
+    with pytest.raises(ValueError):
+        block[0] = 8
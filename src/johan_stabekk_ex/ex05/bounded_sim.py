@@ -7,7 +7,9 @@ __email__ = 'johan.stabekk@nmbu.no'
 
 
 class BoundedWalker(Walker):
-    def __init__(self, start, home, left_limit, right_limit):
+    __slots__ = ('left', 'right')
+
+    def __init__(self, start, home, left_limit, right_limit, rng=None):
         """
         Initialise the walker
 
@@ -21,8 +23,11 @@ class BoundedWalker(Walker):
             The left boundary of walker movement
         right_limit : int
             The right boundary  of walker movement
+        rng : random.Random or None
+            Random generator with a ``randint`` method, the global
+            generator of the ``random`` module is used if None
         """
-        super().__init__(start, home)
+        super().__init__(start, home, rng)
         self.left = left_limit
         self.right = right_limit
 
@@ -35,9 +40,54 @@ class BoundedWalker(Walker):
         elif self.position < self.left:
             self.position = self.left
 
+    def walk_until_home(self, path=None):
+        """
+        Move the walker until it reaches home, respecting the boundaries.
+
+        Same as ``Walker.walk_until_home``, but the position is clipped to
+        the boundaries after every step, as in ``move``.
+
+        Arguments
+        ---------
+        path : list or None
+            If given, the current position and the position after every
+            step are appended to this list
+
+        Returns
+        -------
+        int
+            The total number of steps taken by the walker
+        """
+        position, home, steps = self.position, self.end_point, self.steps
+        left, right = self.left, self.right
+        randint = self.rng.randint
+
+        if path is None:
+            while position != home:
+                position += 2 * randint(0, 1) - 1
+                steps += 1
+                if position > right:
+                    position = right
+                elif position < left:
+                    position = left
+        else:
+            record = path.append
+            record(position)
+            while position != home:
+                position += 2 * randint(0, 1) - 1
+                steps += 1
+                if position > right:
+                    position = right
+                elif position < left:
+                    position = left
+                record(position)
+
+        self.position, self.steps = position, steps
+        return steps
+
 
 class BoundedSimulation(Simulation):
-    def __init__(self, start, home, seed, left_limit, right_limit):
+    def __init__(self, start, home, seed, left_limit, right_limit, rng=None):
         """
         Initialise the simulation
 
@@ -53,20 +103,24 @@ class BoundedSimulation(Simulation):
             The left boundary of walker movement
         right_limit : int
             The right boundary  of walker movement
+        rng : random.Random or None
+            Random generator with a ``randint`` method. If None, a
+            ``random.Random`` seeded with ``seed`` is used.
         """
-        super().__init__(start, home, seed)
         self.right = right_limit
         self.left = left_limit
+        super().__init__(start, home, seed, rng)
 
-    def single_walk(self):
-        walker = BoundedWalker(self.start, self.home, self.left, self.right)
-
-        stride = 0
-        while not walker.is_at_home():
-            walker.move()
-            stride += 1
+    def _create_walker(self):
+        """
+        Create the bounded walker instance that is reused for every walk.
 
-        return stride
+        Returns
+        -------
+        BoundedWalker
+        """
+        return BoundedWalker(self.start, self.home, self.left, self.right,
+                             self.rng)
 
 
 if __name__ == '__main__':
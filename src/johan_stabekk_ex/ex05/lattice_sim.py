@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""
+Random walks on the 2-D/3-D (or any dimensional) integer lattice.
+
+A lattice walker moves one step along a randomly chosen axis every time it
+moves, and the walk ends when it enters its home region, which may be a
+single lattice point or a set of points. Bounded walkers are kept inside a
+box, in the same way as ``BoundedWalker`` is kept between its limits.
+
+The simulations have the same API as ``Simulation``, but
+``run_simulation`` moves all walkers of the ensemble in parallel with
+NumPy. Whether a walker has reached home is looked up in a precomputed
+boolean occupancy grid that covers the home region.
+"""
+
+import random
+
+import numpy as np
+
+__author__ = 'Johan Stabekk'
+__email__ = 'johan.stabekk@nmbu.no'
+
+
+def _as_points(home):
+    """
+    Convert a single point or an iterable of points to a set of tuples.
+
+    Arguments
+    ---------
+    home : tuple[int] or iterable of tuple[int]
+        A lattice point or a collection of lattice points
+
+    Returns
+    -------
+    set[tuple[int]]
+    """
+    home = list(home)
+    if all(isinstance(coordinate, (int, np.integer)) for coordinate in home):
+        return {tuple(home)}
+    return {tuple(point) for point in home}
+
+
+class HomeGrid:
+    def __init__(self, home):
+        """
+        Boolean occupancy grid covering the bounding box of a home region.
+
+        Arguments
+        ---------
+        home : tuple[int] or iterable of tuple[int]
+            The home point or the points that make up the home region
+        """
+        points = np.array(sorted(_as_points(home)), dtype=np.int64)
+        if points.size == 0:
+            raise ValueError('The home region must contain a point')
+
+        self.origin = points.min(axis=0)
+        self.shape = points.max(axis=0) - self.origin + 1
+        self.grid = np.zeros(self.shape, dtype=bool)
+        self.grid[tuple((points - self.origin).T)] = True
+
+    @property
+    def dimension(self):
+        return len(self.origin)
+
+    def contains(self, positions):
+        """
+        Test which positions are in the home region.
+
+        Arguments
+        ---------
+        positions : np.ndarray(shape=(n, d))
+            Lattice positions
+
+        Returns
+        -------
+        np.ndarray(shape=(n,), dtype=bool)
+            True for every position that is in the home region
+        """
+        shifted = positions - self.origin
+        inside = np.all((shifted >= 0) & (shifted < self.shape), axis=1)
+        at_home = np.zeros(len(positions), dtype=bool)
+        at_home[inside] = self.grid[tuple(shifted[inside].T)]
+        return at_home
+
+
+def ensemble_walk(starts, home_grid, rng, lower=None, upper=None,
+                  max_steps=None):
+    """
+    Move an ensemble of lattice walkers in parallel until all are home.
+
+    In every step each walker that is not yet home moves one lattice unit
+    along a uniformly chosen axis. Walkers that are home are removed from
+    the working arrays, so later steps only touch the walkers still out.
+
+    Arguments
+    ---------
+    starts : np.ndarray(shape=(n, d))
+        The initial position of each walker
+    home_grid : HomeGrid
+        The home region
+    rng : np.random.Generator
+        Random generator for the steps
+    lower : sequence of int or None
+        Lower corner of the box the walkers are kept within (inclusive)
+    upper : sequence of int or None
+        Upper corner of the box the walkers are kept within (inclusive)
+    max_steps : int or None
+        Stop after this many steps, walks that are not finished get -1
+
+    Returns
+    -------
+    np.ndarray(shape=(n,), dtype=int)
+        The number of steps taken by each walker
+    """
+    positions = np.array(starts, dtype=np.int64, ndmin=2)
+    num_walkers, dimension = positions.shape
+    if dimension != home_grid.dimension:
+        raise ValueError('Start and home have different dimensions')
+
+    steps = np.full(num_walkers, -1, dtype=np.int64)
+    active = np.arange(num_walkers)
+
+    step = 0
+    while True:
+        at_home = home_grid.contains(positions)
+        steps[active[at_home]] = step
+        positions, active = positions[~at_home], active[~at_home]
+        if len(active) == 0 or step == max_steps:
+            return steps
+
+        rows = np.arange(len(active))
+        axes = rng.integers(dimension, size=len(active))
+        positions[rows, axes] += 2 * rng.integers(2, size=len(active)) - 1
+        if lower is not None:
+            np.clip(positions, lower, upper, out=positions)
+        step += 1
+
+
+class LatticeWalker:
+    __slots__ = ('position', 'home', 'steps', 'rng')
+
+    def __init__(self, start, home, rng=None):
+        """
+        Initialise the walker
+
+        Arguments
+        ---------
+        start : tuple[int]
+            The walker's initial lattice position
+        home : tuple[int] or iterable of tuple[int]
+            The walk ends when the walker reaches one of the home points
+        rng : random.Random or None
+            Random generator with ``randrange`` and ``randint`` methods,
+            the global generator of the ``random`` module is used if None
+        """
+        self.position = tuple(start)
+        self.home = _as_points(home)
+        self.steps = 0
+        self.rng = random if rng is None else rng
+
+    def reset(self, start):
+        """
+        Place the walker at a new start position and clear the step count.
+
+        Arguments
+        ---------
+        start : tuple[int]
+            The walker's new initial lattice position
+        """
+        self.position = tuple(start)
+        self.steps = 0
+
+    def _step(self):
+        position = list(self.position)
+        axis = self.rng.randrange(len(position))
+        position[axis] += 2 * self.rng.randint(0, 1) - 1
+        return position
+
+    def move(self):
+        """ Move the walker one step along a randomly chosen axis.
+
+        Returns nothing
+        -------
+
+        """
+        self.position = tuple(self._step())
+        self.steps += 1
+
+    def is_at_home(self):
+        return self.position in self.home
+
+    def get_position(self):
+        return self.position
+
+    def get_steps(self):
+        return self.steps
+
+    def walk_until_home(self):
+        """
+        Move the walker until it reaches home.
+
+        Returns
+        -------
+        int
+            The total number of steps taken by the walker
+        """
+        while not self.is_at_home():
+            self.move()
+
+        return self.steps
+
+
+class BoundedLatticeWalker(LatticeWalker):
+    __slots__ = ('lower', 'upper')
+
+    def __init__(self, start, home, lower, upper, rng=None):
+        """
+        Initialise the walker
+
+        Arguments
+        ---------
+        start : tuple[int]
+            The walker's initial lattice position
+        home : tuple[int] or iterable of tuple[int]
+            The walk ends when the walker reaches one of the home points
+        lower : tuple[int]
+            Lower corner of the box the walker is kept within
+        upper : tuple[int]
+            Upper corner of the box the walker is kept within
+        rng : random.Random or None
+            Random generator with ``randrange`` and ``randint`` methods,
+            the global generator of the ``random`` module is used if None
+        """
+        super().__init__(start, home, rng)
+        self.lower = tuple(lower)
+        self.upper = tuple(upper)
+
+    def move(self):
+        self.position = tuple(
+            min(max(coordinate, low), high)
+            for coordinate, low, high in zip(self._step(), self.lower,
+                                             self.upper)
+        )
+        self.steps += 1
+
+
+class LatticeSimulation:
+    def __init__(self, start, home, seed):
+        """
+        Initialise the simulation
+
+        Arguments
+        ---------
+        start : tuple[int]
+            The walkers' initial lattice position
+        home : tuple[int] or iterable of tuple[int]
+            The walk ends when the walker reaches one of the home points
+        seed : int
+            Random generator seed
+        """
+        self.start = tuple(start)
+        self.home = HomeGrid(home)
+        self.seed = seed
+        self.lower = None
+        self.upper = None
+        self._rng = np.random.default_rng(seed)
+
+    def single_walk(self):
+        """
+        Simulate single walk from start to home, returning number of steps.
+
+        Returns
+        -------
+        int
+           The number of steps taken
+        """
+        return self.run_simulation(1)[0]
+
+    def run_simulation(self, num_walks, max_steps=None):
+        """
+        Run a set of walks in parallel, returns list of number of steps
+        taken.
+
+        Arguments
+        ---------
+        num_walks : int
+            The number of walks to simulate
+        max_steps : int or None
+            Stop after this many steps, walks that are not finished get -1.
+            Unbounded walks in three or more dimensions may never return,
+            so they should be given a maximum.
+
+        Returns
+        -------
+        list[int]
+            List with the number of steps per walk
+        """
+        starts = np.tile(self.start, (num_walks, 1))
+        return ensemble_walk(starts, self.home, self._rng, self.lower,
+                             self.upper, max_steps).tolist()
+
+
+class BoundedLatticeSimulation(LatticeSimulation):
+    def __init__(self, start, home, seed, lower, upper):
+        """
+        Initialise the simulation
+
+        Arguments
+        ---------
+        start : tuple[int]
+            The walkers' initial lattice position
+        home : tuple[int] or iterable of tuple[int]
+            The walk ends when the walker reaches one of the home points
+        seed : int
+            Random generator seed
+        lower : tuple[int]
+            Lower corner of the box the walkers are kept within
+        upper : tuple[int]
+            Upper corner of the box the walkers are kept within
+        """
+        super().__init__(start, home, seed)
+        self.lower = np.array(lower, dtype=np.int64)
+        self.upper = np.array(upper, dtype=np.int64)
+
+
+if __name__ == '__main__':
+    boundaries = [0, -10, -100]
+
+    for boundary in boundaries:
+        steps = BoundedLatticeSimulation(
+            (0, 0), [(20, y) for y in range(-5, 6)], 12345,
+            (boundary, -20), (20, 20)
+        ).run_simulation(20)
+        print(f'2-D, left boundary {boundary:5d}: {steps}')
+
+    simulation = BoundedLatticeSimulation((0, 0, 0), (5, 5, 5), 12345,
+                                          (-10, -10, -10), (10, 10, 10))
+    print(f'3-D box: {simulation.run_simulation(20)}')
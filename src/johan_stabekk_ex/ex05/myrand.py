@@ -1,12 +1,50 @@
 # -*- coding: utf-8 -*-
 
+import numpy as np
+
 __author__ = 'Johan Stabekk'
 __email__ = 'johan.stabekk@nmbu.no'
 
 
+def _power_table(multiplier, count, modulus):
+    """
+    Compute ``multiplier ** k % modulus`` for ``k = 0, ..., count - 1``.
+
+    The table is filled by doubling: once the first ``k`` powers are known,
+    the next ``k`` are the first ``k`` multiplied by ``multiplier ** k``,
+    so only about log2(count) vectorised steps are needed.
+
+    Arguments
+    ---------
+    multiplier : int
+    count : int
+    modulus : int
+        Must be less than 2**32, so that products fit in 64 bits
+
+    Returns
+    -------
+    np.ndarray(shape=(count,), dtype=np.uint64)
+    """
+    powers = np.empty(count, dtype=np.uint64)
+    powers[0] = 1
+    size = 1
+    factor = multiplier % modulus
+    while size < count:
+        chunk = min(size, count - size)
+        target = powers[size:size + chunk]
+        np.multiply(powers[:chunk], np.uint64(factor), out=target)
+        np.remainder(target, np.uint64(modulus), out=target)
+        size += chunk
+        factor = factor * factor % modulus
+    return powers
+
+
 class LCGRand:
     slope = 7 ** 5
     congruence_class = 2 ** 31 - 1
+    # The slope is a primitive root modulo the prime congruence class, so
+    # every nonzero seed runs through all numbers 1, ..., m - 1.
+    period = congruence_class - 1
 
     def __init__(self, seed):
         """
@@ -33,8 +71,330 @@ class LCGRand:
 
         return self._hidden_state
 
-    def random_sequence(self, length):
-        return RandIter(self, length)
+    def rand_array(self, n):
+        """
+        Generates ``n`` random numbers at once.
+
+        The result is the same as calling ``rand`` ``n`` times.
+
+        Arguments
+        ---------
+        n : int
+            The number of random numbers to generate
+
+        Returns
+        -------
+        np.ndarray(shape=(n,), dtype=np.uint64)
+            The random numbers
+        """
+        numbers = np.empty(n, dtype=np.uint64)
+        self.fill(numbers)
+        return numbers
+
+    def fill(self, out):
+        """
+        Fills an array with the next ``len(out)`` random numbers.
+
+        The sequence is split into rows of about ``sqrt(n)`` numbers. The
+        state at the start of row ``j`` is ``(a ** (row_length * j)) * x``
+        and number ``i`` of a row is ``a ** (i + 1)`` times the start of the
+        row (all modulo ``m``), so every number is computed from tables of
+        jump-ahead multipliers instead of from the number before it.
+
+        Arguments
+        ---------
+        out : np.ndarray
+            One-dimensional integer array to write the numbers to
+
+        Returns
+        -------
+        out : np.ndarray
+        """
+        n = len(out)
+        if n == 0:
+            return out
+        if out.dtype != np.uint64 or not out.flags.c_contiguous:
+            out[:] = self.rand_array(n)
+            return out
+
+        modulus = self.congruence_class
+        row_length = int(np.ceil(np.sqrt(n)))
+        num_rows = -(-n // row_length)
+
+        multipliers = _power_table(self.slope, row_length + 1, modulus)[1:]
+        row_starts = _power_table(pow(self.slope, row_length, modulus),
+                                  num_rows, modulus)
+        row_starts *= np.uint64(self._hidden_state % modulus)
+        row_starts %= np.uint64(modulus)
+
+        num_full_rows = n // row_length
+        full_rows = out[:num_full_rows * row_length].reshape(num_full_rows,
+                                                             row_length)
+        np.multiply(row_starts[:num_full_rows, np.newaxis], multipliers,
+                    out=full_rows)
+        np.remainder(full_rows, np.uint64(modulus), out=full_rows)
+
+        rest = out[num_full_rows * row_length:]
+        if len(rest):
+            np.multiply(row_starts[-1], multipliers[:len(rest)], out=rest)
+            np.remainder(rest, np.uint64(modulus), out=rest)
+
+        self._hidden_state = int(out[-1])
+        return out
+
+    def random(self):
+        """
+        Generates a random float in [0, 1).
+
+        Returns
+        -------
+        float
+        """
+        return (self.rand() - 1) / (self.congruence_class - 1)
+
+    def random_array(self, n):
+        """
+        Generates ``n`` random floats in [0, 1), the same numbers as ``n``
+        calls to ``random``.
+
+        Returns
+        -------
+        np.ndarray(shape=(n,), dtype=float)
+        """
+        return ((self.rand_array(n) - np.uint64(1))
+                / (self.congruence_class - 1))
+
+    def randint(self, a, b):
+        """
+        Returns a random integer N such that a <= N <= b.
+
+        Numbers from the top of the generator's range that would make some
+        results more likely than others are rejected, so all results are
+        equally likely.
+
+        Arguments
+        ---------
+        a : int
+            The smallest possible result
+        b : int
+            The largest possible result
+
+        Returns
+        -------
+        int
+
+        Raises
+        ------
+        ValueError
+            If ``b < a``, like ``random.randint``
+        """
+        num_values = self._num_values(a, b)
+        num_outputs = self.congruence_class - 1
+        limit = num_outputs - num_outputs % num_values
+
+        number = self.rand() - 1
+        while number >= limit:
+            number = self.rand() - 1
+        return a + number % num_values
+
+    @staticmethod
+    def _num_values(a, b):
+        """
+        The number of integers from ``a`` to ``b``, both included.
+
+        Raises
+        ------
+        ValueError
+            If the range is empty
+        """
+        if b < a:
+            raise ValueError(f'Empty range for randint({a}, {b})')
+        return b - a + 1
+
+    def randrange(self, start, stop=None):
+        """
+        Returns a random integer from ``range(start, stop)``, or from
+        ``range(start)`` if ``stop`` is not given.
+        """
+        if stop is None:
+            start, stop = 0, start
+        return self.randint(start, stop - 1)
+
+    def _packing(self, num_values):
+        """
+        Choose how many results to pack into one random number.
+
+        A random number ``u`` in [0, m - 1) below
+        ``limit = (m - 1) // num_values ** k * num_values ** k`` holds ``k``
+        unbiased base-``num_values`` digits. Larger ``k`` gives more digits
+        per number, but may reject more numbers, so the ``k`` with most
+        digits per number on average is chosen.
+
+        Returns
+        -------
+        tuple[int, int]
+            The number of digits ``k`` and ``limit``
+        """
+        num_outputs = self.congruence_class - 1
+        if num_values > num_outputs:
+            raise ValueError('Range is larger than the generator can produce')
+
+        best = (1, num_outputs - num_outputs % num_values)
+        k, block = 1, num_values
+        while block * num_values <= num_outputs:
+            k, block = k + 1, block * num_values
+            limit = num_outputs // block * block
+            if k * limit > best[0] * best[1]:
+                best = (k, limit)
+        return best
+
+    def randint_array(self, a, b, n):
+        """
+        Generates ``n`` random integers N such that a <= N <= b.
+
+        Every random number from the generator is turned into several
+        results when the range is small, about 10 dice rolls or 25 coin
+        flips per number on average, and numbers
+        that would bias the results are rejected. The results are
+        therefore not the same as ``n`` calls to ``randint``.
+
+        Arguments
+        ---------
+        a : int
+            The smallest possible result
+        b : int
+            The largest possible result
+        n : int
+            The number of results
+
+        Returns
+        -------
+        np.ndarray(shape=(n,), dtype=np.int64)
+
+        Raises
+        ------
+        ValueError
+            If ``b < a``
+        """
+        num_values = self._num_values(a, b)
+        if num_values == 1:
+            # Every result is a, no random numbers are needed
+            return np.full(n, a, dtype=np.int64)
+        digits, limit = self._packing(num_values)
+        place_values = np.uint64(num_values) ** np.arange(digits,
+                                                          dtype=np.uint64)
+        acceptance = limit / (self.congruence_class - 1)
+
+        results = np.empty(n, dtype=np.int64)
+        filled = 0
+        while filled < n:
+            needed = -(-(n - filled) // digits)
+            numbers = self.rand_array(
+                self._draw_size(int(needed / acceptance) + 1))
+            numbers -= np.uint64(1)
+            numbers = numbers[numbers < np.uint64(limit)]
+
+            values = (numbers[:, np.newaxis] // place_values
+                      % np.uint64(num_values)).ravel()[:n - filled]
+            results[filled:filled + len(values)] = values
+            filled += len(values)
+
+        results += a
+        return results
+
+    def _draw_size(self, count):
+        """
+        The number of random numbers ``randint_array`` draws at once when
+        it wants ``count`` of them.
+
+        Returns
+        -------
+        int
+        """
+        return count
+
+    def _current_state(self):
+        """
+        The state the next random number is generated from.
+        """
+        return self._hidden_state
+
+    def _substream(self, state):
+        """
+        Create a generator of the same kind that continues from ``state``.
+        """
+        return LCGRand(state)
+
+    def jump(self, k):
+        """
+        Skip the next ``k`` random numbers in constant time.
+
+        After ``jump(k)``, the generator is in the same state as after ``k``
+        calls to ``rand``. The state is multiplied by ``slope ** k`` modulo
+        ``congruence_class``, which is computed with modular
+        exponentiation in O(log k) steps. Since the sequence is periodic, a
+        negative ``k`` steps back.
+
+        Arguments
+        ---------
+        k : int
+            The number of random numbers to skip
+        """
+        multiplier = pow(self.slope, k % self.period, self.congruence_class)
+        self._hidden_state = (self._hidden_state * multiplier
+                              % self.congruence_class)
+
+    def spawn(self, n):
+        """
+        Split the rest of the stream into independent substreams.
+
+        The period is divided into ``n + 1`` segments of equal length. This
+        generator keeps the first segment, and the ``n`` new generators
+        start at the beginning of the others, so none of the substreams
+        overlap until one has produced ``period // (n + 1)`` numbers.
+
+        Arguments
+        ---------
+        n : int
+            The number of substreams
+
+        Returns
+        -------
+        list[LCGRand]
+            The new generators
+        """
+        spacing = self.period // (n + 1)
+        multiplier = pow(self.slope, spacing, self.congruence_class)
+
+        state = self._current_state()
+        substreams = []
+        for _ in range(n):
+            state = state * multiplier % self.congruence_class
+            substreams.append(self._substream(state))
+        return substreams
+
+    def getstate(self):
+        """
+        Returns the state of the generator, for use with ``setstate``.
+
+        Returns
+        -------
+        int
+        """
+        return self._current_state()
+
+    def setstate(self, state):
+        """
+        Restore the generator to a state returned by ``getstate``.
+
+        Arguments
+        ---------
+        state : int
+        """
+        self._hidden_state = state
+
+    def random_sequence(self, length, block_size=None):
+        return RandIter(self, length, block_size)
 
     def infinite_random_sequence(self):
         """
@@ -49,8 +409,83 @@ class LCGRand:
             yield self.rand()
 
 
+class BufferedLCGRand(LCGRand):
+    def __init__(self, seed, block_size=1024):
+        """
+        Linear congruence generator that computes its numbers in blocks.
+
+        The sequence is the same as for ``LCGRand``, but the numbers are
+        generated ``block_size`` at a time into a buffer that ``rand``
+        reads from, which makes ``randint`` faster when it is used as
+        ``rng`` for the walkers and simulations.
+
+        Arguments
+        ---------
+        seed : int
+            The initial seed for the generator
+        block_size : int
+            The number of random numbers generated per block
+        """
+        super().__init__(seed)
+        self.block_size = block_size
+        self._buffer = []
+        self._position = 0
+
+    def _fill_buffer(self):
+        """
+        Generate the next block of random numbers into the buffer.
+        """
+        self._buffer = super().rand_array(self.block_size).tolist()
+        self._position = 0
+
+    def _current_state(self):
+        if self._position == 0:
+            return self._hidden_state
+        return self._buffer[self._position - 1]
+
+    def _discard_buffer(self):
+        """
+        Drop the unused buffered numbers and rewind the hidden state to the
+        last number returned by ``rand``.
+        """
+        self._hidden_state = self._current_state()
+        self._buffer = []
+        self._position = 0
+
+    def _substream(self, state):
+        return BufferedLCGRand(state, self.block_size)
+
+    def setstate(self, state):
+        super().setstate(state)
+        self._buffer = []
+        self._position = 0
+
+    def fill(self, out):
+        self._discard_buffer()
+        return super().fill(out)
+
+    def jump(self, k):
+        self._discard_buffer()
+        super().jump(k)
+
+    def rand(self):
+        """
+        Returns the next random number from the buffer.
+
+        Returns
+        -------
+        int
+            A random integer
+        """
+        if self._position == len(self._buffer):
+            self._fill_buffer()
+        number = self._buffer[self._position]
+        self._position += 1
+        return number
+
+
 class RandIter:
-    def __init__(self, random_number_generator, length):
+    def __init__(self, random_number_generator, length, block_size=None):
         """
 
         Arguments
@@ -60,10 +495,18 @@ class RandIter:
             takes no arguments and returns a random number.
         length : int
             The number of random numbers to generate
+        block_size : int or None
+            If given, the numbers are fetched from the generator in blocks
+            of this size (with its ``rand_array`` method if it has one) and
+            served from a buffer.
         """
         self.generator = random_number_generator
         self.length = length
+        self.block_size = block_size
         self.num_generated_numbers = None
+        self._buffer = np.empty(0, dtype=np.uint64)
+        self._buffer_position = 0
+        self._restored = False
 
     def __iter__(self):
         """
@@ -76,14 +519,36 @@ class RandIter:
         Raises
         ------
         RuntimeError
-            If iter is called twice on the same RandIter object.
+            If iter is called twice on the same RandIter object, unless
+            the iterator was restored from a checkpoint in between.
         """
-        if self.num_generated_numbers is not None:
+        if self.num_generated_numbers is not None and not self._restored:
             raise RuntimeError('Can not iterate through twice')
 
-        self.num_generated_numbers = 0
+        if self.num_generated_numbers is None:
+            self.num_generated_numbers = 0
+        self._restored = False
         return self
 
+    def _check_started(self):
+        if self.num_generated_numbers is None:
+            raise RuntimeError(
+                'Can not call ``next`` before the the iteration is started'
+                )
+
+    def _generate(self, k):
+        """
+        Fetch ``k`` numbers directly from the generator.
+
+        Returns
+        -------
+        np.ndarray(shape=(k,), dtype=np.uint64)
+        """
+        if hasattr(self.generator, 'rand_array'):
+            return self.generator.rand_array(k)
+        return np.fromiter((self.generator.rand() for _ in range(k)),
+                           dtype=np.uint64, count=k)
+
     def __next__(self):
         """
         Generate the next random number.
@@ -100,12 +565,99 @@ class RandIter:
         StopIteration
             If ``self.length`` random numbers are generated.
         """
-        if self.num_generated_numbers is None:
-            raise RuntimeError(
-                'Can not call ``next`` before the the iteration is started'
-                )
+        self._check_started()
         if self.num_generated_numbers == self.length:
             raise StopIteration
-        number = self.generator.rand()
+
+        if self._buffer_position < len(self._buffer):
+            number = int(self._buffer[self._buffer_position])
+            self._buffer_position += 1
+        elif self.block_size is not None:
+            self._buffer = self._generate(
+                min(self.block_size, self.length - self.num_generated_numbers)
+            )
+            number = int(self._buffer[0])
+            self._buffer_position = 1
+        else:
+            number = self.generator.rand()
+
         self.num_generated_numbers += 1
         return number
+
+    def next_block(self, k):
+        """
+        Generate up to ``k`` random numbers at once.
+
+        Numbers that are already buffered are returned as a view into the
+        buffer, the rest are fetched from the generator in one call.
+
+        Arguments
+        ---------
+        k : int
+            The maximal number of random numbers to return
+
+        Returns
+        -------
+        np.ndarray(dtype=np.uint64)
+            The random numbers, fewer than ``k`` (possibly none) if the end
+            of the sequence is reached.
+
+        Raises
+        ------
+        RuntimeError
+            If the ``next_block`` method is called before ``__iter__``.
+        """
+        self._check_started()
+        k = min(k, self.length - self.num_generated_numbers)
+
+        buffered = self._buffer[self._buffer_position:
+                                self._buffer_position + k]
+        self._buffer_position += len(buffered)
+        if len(buffered) < k:
+            block = self._generate(k - len(buffered))
+            if len(buffered):
+                block = np.concatenate([buffered, block])
+        else:
+            block = buffered
+
+        self.num_generated_numbers += k
+        return block
+
+    def checkpoint(self):
+        """
+        Save the position of the iterator and the generator state.
+
+        The generator must have a ``getstate`` method. Numbers that are
+        buffered but not yet returned are stored in the checkpoint as well,
+        so that the iterator continues with exactly the same numbers.
+
+        Returns
+        -------
+        dict
+            Checkpoint that can be given to ``restore``, it only contains
+            ints and lists of ints.
+        """
+        return {
+            'generator_state': self.generator.getstate(),
+            'num_generated_numbers': self.num_generated_numbers,
+            'buffer': self._buffer[self._buffer_position:].tolist(),
+        }
+
+    def restore(self, checkpoint):
+        """
+        Continue from a checkpoint made by ``checkpoint``.
+
+        The generator state is restored with its ``setstate`` method. After
+        restoring, the iterator can be iterated over again, starting from
+        the checkpoint.
+
+        Arguments
+        ---------
+        checkpoint : dict
+            Checkpoint returned by ``checkpoint``
+        """
+        self.generator.setstate(checkpoint['generator_state'])
+        self.num_generated_numbers = checkpoint['num_generated_numbers']
+        self._buffer = np.array(checkpoint['buffer'], dtype=np.uint64)
+        self._buffer_position = 0
+        self._restored = True
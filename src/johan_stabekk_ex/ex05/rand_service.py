@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+"""
+A random number service that shares one LCGRand stream between threads
+and asyncio tasks.
+
+The stream of the service is cut into blocks of ``block_size`` numbers.
+Block ``i`` always holds the numbers at positions
+``i * block_size, ..., (i + 1) * block_size - 1`` of the stream that a single
+``LCGRand(seed)`` would produce, and its start state is found in constant
+time with ``LCGRand.jump``. Consumers reserve whole blocks and draw from
+them without touching any shared state, so no locks are needed: the block
+counter is an ``itertools.count``, whose ``next`` is atomic in CPython.
+
+Which consumer gets which block depends on the order in which blocks are
+reserved. Consumers that must get the same numbers in every run, whatever
+the thread scheduling, should ask for a fixed block with ``block(index)``.
+"""
+
+import asyncio
+import itertools
+
+import numpy as np
+
+from myrand import LCGRand
+
+__author__ = 'Johan Stabekk'
+__email__ = 'johan.stabekk@nmbu.no'
+
+
+class StreamBlock(LCGRand):
+    def __init__(self, state, index, size):
+        """
+        A reserved block of the service's stream.
+
+        Arguments
+        ---------
+        state : int
+            The generator state at the start of the block
+        index : int
+            The block number
+        size : int
+            The number of random numbers in the block
+        """
+        super().__init__(state)
+        self.index = index
+        self.remaining = size
+
+    def rand(self):
+        """
+        Returns the next random number of the block.
+
+        Raises
+        ------
+        RuntimeError
+            If all numbers of the block are used.
+        """
+        if self.remaining == 0:
+            raise RuntimeError('All numbers in the block are used')
+        self.remaining -= 1
+        return super().rand()
+
+    def fill(self, out):
+        """
+        Fills an array with the next ``len(out)`` numbers of the block.
+
+        Raises
+        ------
+        RuntimeError
+            If the block has fewer than ``len(out)`` numbers left.
+        """
+        if out.dtype != np.uint64 or not out.flags.c_contiguous:
+            out[:] = self.rand_array(len(out))
+            return out
+        if len(out) > self.remaining:
+            raise RuntimeError('Not enough numbers left in the block')
+        self.remaining -= len(out)
+        return super().fill(out)
+
+    def jump(self, k):
+        """
+        Skip the next ``k`` numbers of the block.
+
+        Raises
+        ------
+        ValueError
+            If ``k`` is negative, since stepping back would repeat numbers
+            that may already be used.
+        RuntimeError
+            If the block has fewer than ``k`` numbers left.
+        """
+        if k < 0:
+            raise ValueError('A block can only jump forward')
+        if k > self.remaining:
+            raise RuntimeError('Not enough numbers left in the block')
+        self.remaining -= k
+        super().jump(k)
+
+    def _draw_size(self, count):
+        """
+        Draw at most the numbers left in the block, so ``randint_array``
+        only fails if the block really runs out.
+
+        Raises
+        ------
+        RuntimeError
+            If all numbers of the block are used.
+        """
+        if self.remaining == 0:
+            raise RuntimeError('All numbers in the block are used')
+        return min(count, self.remaining)
+
+    def spawn(self, n):
+        """
+        Split the rest of the block into ``n + 1`` blocks of equal size.
+
+        This block keeps the first part and the ``n`` new blocks get the
+        others, so they do not overlap each other or any other block of the
+        service. Numbers left over by the division are not used.
+
+        Arguments
+        ---------
+        n : int
+            The number of new blocks
+
+        Returns
+        -------
+        list[StreamBlock]
+            The new blocks, with the index of this block
+
+        Raises
+        ------
+        RuntimeError
+            If the block has fewer than ``n + 1`` numbers left.
+        """
+        size = self.remaining // (n + 1)
+        if size == 0:
+            raise RuntimeError('Not enough numbers left in the block')
+        multiplier = pow(self.slope, size, self.congruence_class)
+
+        state = self._current_state()
+        blocks = []
+        for _ in range(n):
+            state = state * multiplier % self.congruence_class
+            blocks.append(StreamBlock(state, self.index, size))
+        self.remaining = size
+        return blocks
+
+
+class LCGService:
+    def __init__(self, seed, block_size=2 ** 20):
+        """
+        Initialise the service
+
+        Arguments
+        ---------
+        seed : int
+            The seed of the shared stream
+        block_size : int
+            The number of random numbers per block
+        """
+        self.seed = seed
+        self.block_size = block_size
+        self._block_counter = itertools.count()
+        self._block_jump = pow(LCGRand.slope, block_size,
+                               LCGRand.congruence_class)
+
+    def block(self, index):
+        """
+        Get block number ``index`` of the stream.
+
+        Arguments
+        ---------
+        index : int
+
+        Returns
+        -------
+        StreamBlock
+        """
+        state = (self.seed * pow(self._block_jump, index,
+                                 LCGRand.congruence_class)
+                 % LCGRand.congruence_class)
+        return StreamBlock(state, index, self.block_size)
+
+    def reserve(self):
+        """
+        Reserve the next block that no one has reserved yet.
+
+        This is safe to call from several threads at the same time.
+
+        Returns
+        -------
+        StreamBlock
+        """
+        return self.block(next(self._block_counter))
+
+    async def reserve_async(self):
+        """
+        Reserve the next block from an asyncio task.
+
+        Reserving a block never waits, so this does not block the event
+        loop.
+
+        Returns
+        -------
+        StreamBlock
+        """
+        return self.reserve()
+
+    def consumer(self):
+        """
+        Create a consumer that reserves new blocks whenever it needs them.
+
+        Returns
+        -------
+        BlockConsumer
+        """
+        return BlockConsumer(self)
+
+
+class BlockConsumer:
+    def __init__(self, service):
+        """
+        Draws random numbers from blocks reserved from a service.
+
+        A consumer must only be used by one thread or task at a time.
+
+        Arguments
+        ---------
+        service : LCGService
+        """
+        self.service = service
+        self.block_indices = []
+        self._block = None
+
+    def _current_block(self):
+        if self._block is None or self._block.remaining == 0:
+            self._block = self.service.reserve()
+            self.block_indices.append(self._block.index)
+        return self._block
+
+    def rand(self):
+        """
+        Returns the next random number.
+
+        Returns
+        -------
+        int
+        """
+        return self._current_block().rand()
+
+    def rand_array(self, n):
+        """
+        Returns the next ``n`` random numbers, from as many blocks as
+        needed.
+
+        Returns
+        -------
+        np.ndarray(shape=(n,), dtype=np.uint64)
+        """
+        numbers = np.empty(n, dtype=np.uint64)
+        filled = 0
+        while filled < n:
+            block = self._current_block()
+            count = min(block.remaining, n - filled)
+            block.fill(numbers[filled:filled + count])
+            filled += count
+        return numbers
+
+
+if __name__ == '__main__':
+    from concurrent.futures import ThreadPoolExecutor
+
+    service = LCGService(346, block_size=10 ** 6)
+
+    def worker(index):
+        return int(service.block(index).rand_array(10 ** 6).sum())
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        print(f'Block sums: {list(pool.map(worker, range(8)))}')
+
+    async def task():
+        block = await service.reserve_async()
+        return block.index, block.rand()
+
+    async def main():
+        return await asyncio.gather(*(task() for _ in range(4)))
+
+    print(f'Async blocks: {asyncio.run(main())}')
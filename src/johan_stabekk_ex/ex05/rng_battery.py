@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""
+Statistical quality and throughput tests for random number generators.
+
+Each generator is wrapped as a *source*: a function that takes a count
+``k`` and returns ``k`` uniform numbers in [0, 1) as a NumPy array. The
+battery draws the stream chunk by chunk, so that even 10**8 numbers never
+have to be in memory at once, and updates these vectorised tests with every
+chunk:
+
+* chi-square test of uniformity over equally wide bins,
+* lag-one serial correlation,
+* runs above and below one half (Wald-Wolfowitz runs test),
+* gap test, Knuth's test of the gaps between numbers that fall in
+  ``[alpha, beta)``.
+
+All tests give a p-value, very small values (or values very close to one
+for the chi-square tests) indicate that the stream is not uniform and
+independent. The time spent drawing numbers is reported as numbers/second.
+"""
+
+import importlib.util
+import os
+import random
+import time
+
+import numpy as np
+from scipy import stats
+
+from myrand import LCGRand
+
+__author__ = 'Johan Stabekk'
+__email__ = 'johan.stabekk@nmbu.no'
+
+
+class ChiSquareUniformity:
+    def __init__(self, num_bins=256):
+        self.num_bins = num_bins
+        self.counts = np.zeros(num_bins, dtype=np.int64)
+
+    def update(self, numbers):
+        bins = (numbers * self.num_bins).astype(np.int64)
+        self.counts += np.bincount(bins, minlength=self.num_bins)
+
+    def result(self):
+        expected = self.counts.sum() / self.num_bins
+        statistic = float(((self.counts - expected) ** 2).sum() / expected)
+        return {'statistic': statistic,
+                'p_value': float(stats.chi2.sf(statistic, self.num_bins - 1))}
+
+
+class SerialCorrelation:
+    def __init__(self):
+        self.previous = None
+        self.count = 0
+        self.sums = np.zeros(5)
+
+    def update(self, numbers):
+        if self.previous is not None:
+            numbers = np.concatenate([[self.previous], numbers])
+        if len(numbers) < 2:
+            self.previous = numbers[-1] if len(numbers) else self.previous
+            return
+        x, y = numbers[:-1], numbers[1:]
+        self.sums += [x.sum(), y.sum(), x @ x, y @ y, x @ y]
+        self.count += len(x)
+        self.previous = numbers[-1]
+
+    def result(self):
+        n = self.count
+        sx, sy, sxx, syy, sxy = self.sums
+        correlation = ((n * sxy - sx * sy)
+                       / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2)))
+        statistic = float(correlation * np.sqrt(n))
+        return {'correlation': float(correlation), 'statistic': statistic,
+                'p_value': float(2 * stats.norm.sf(abs(statistic)))}
+
+
+class RunsTest:
+    def __init__(self):
+        self.previous = None
+        self.num_runs = 0
+        self.num_above = 0
+        self.count = 0
+
+    def update(self, numbers):
+        if len(numbers) == 0:
+            return
+        above = numbers >= 0.5
+        changes = int(np.count_nonzero(above[1:] != above[:-1]))
+        if self.previous is None or self.previous != above[0]:
+            changes += 1
+        self.num_runs += changes
+        self.num_above += int(above.sum())
+        self.count += len(numbers)
+        self.previous = above[-1]
+
+    def result(self):
+        n, n_above = self.count, self.num_above
+        n_below = n - n_above
+        mean = 2 * n_above * n_below / n + 1
+        variance = (mean - 1) * (mean - 2) / (n - 1)
+        statistic = float((self.num_runs - mean) / np.sqrt(variance))
+        return {'runs': self.num_runs, 'statistic': statistic,
+                'p_value': float(2 * stats.norm.sf(abs(statistic)))}
+
+
+class GapTest:
+    def __init__(self, alpha=0.3, beta=0.4, max_gap=50):
+        self.alpha = alpha
+        self.beta = beta
+        self.max_gap = max_gap
+        self.counts = np.zeros(max_gap + 1, dtype=np.int64)
+        self.last_hit = None
+        self.offset = 0
+
+    def update(self, numbers):
+        hits = np.flatnonzero((numbers >= self.alpha)
+                              & (numbers < self.beta)) + self.offset
+        if len(hits):
+            if self.last_hit is not None:
+                hits = np.concatenate([[self.last_hit], hits])
+            gaps = np.minimum(np.diff(hits) - 1, self.max_gap)
+            self.counts += np.bincount(gaps, minlength=self.max_gap + 1)
+            self.last_hit = hits[-1]
+        self.offset += len(numbers)
+
+    def result(self):
+        p = self.beta - self.alpha
+        lengths = np.arange(self.max_gap)
+        probabilities = np.append(p * (1 - p) ** lengths,
+                                  (1 - p) ** self.max_gap)
+        expected = probabilities * self.counts.sum()
+        statistic = float(((self.counts - expected) ** 2 / expected).sum())
+        return {'statistic': statistic,
+                'p_value': float(stats.chi2.sf(statistic, self.max_gap))}
+
+
+def run_battery(source, n, chunk_size=2 ** 22):
+    """
+    Run all tests on ``n`` numbers from a source.
+
+    Arguments
+    ---------
+    source : callable
+        Function that takes a count ``k`` and returns ``k`` uniform numbers
+        in [0, 1) as a NumPy array
+    n : int
+        The number of random numbers to test
+    chunk_size : int
+        The number of random numbers drawn and tested at a time
+
+    Returns
+    -------
+    dict
+        The result of every test, and the throughput of the source in
+        ``numbers_per_second``
+    """
+    tests = {
+        'chi_square': ChiSquareUniformity(),
+        'serial_correlation': SerialCorrelation(),
+        'runs': RunsTest(),
+        'gap': GapTest(),
+    }
+
+    draw_time = 0
+    remaining = n
+    while remaining > 0:
+        start_time = time.perf_counter()
+        numbers = source(min(chunk_size, remaining))
+        draw_time += time.perf_counter() - start_time
+
+        for test in tests.values():
+            test.update(numbers)
+        remaining -= len(numbers)
+
+    results = {name: test.result() for name, test in tests.items()}
+    results['numbers_per_second'] = n / draw_time
+    return results
+
+
+def integer_source(draw, low, high):
+    """
+    Make a source from a function returning integers in [low, high].
+
+    Arguments
+    ---------
+    draw : callable
+        Function that takes a count ``k`` and returns ``k`` integers
+    low : int
+        Smallest number the generator can return
+    high : int
+        Largest number the generator can return
+
+    Returns
+    -------
+    callable
+    """
+    def source(k):
+        numbers = np.asarray(draw(k), dtype=np.float64)
+        return (numbers - low) / (high - low + 1)
+    return source
+
+
+def looped(rand):
+    """
+    Turn a function returning one number into one returning ``k``.
+    """
+    def draw(k):
+        return np.fromiter((rand() for _ in range(k)), dtype=np.float64,
+                           count=k)
+    return draw
+
+
+def lcg_source(seed=346):
+    lcg = LCGRand(seed)
+    return integer_source(lcg.rand_array, 1, lcg.congruence_class - 1)
+
+
+def rand_iter_source(seed=346, length=2 ** 62, block_size=2 ** 16):
+    numbers = iter(LCGRand(seed).random_sequence(length, block_size))
+    return integer_source(numbers.next_block, 1,
+                          LCGRand.congruence_class - 1)
+
+
+def ex04_lcg_source(seed=346):
+    """
+    Source for the EX04 LCGRand, which has no bulk method.
+
+    The module is loaded from its file, since EX04 and EX05 both have a
+    ``myrand`` module.
+    """
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'ex04', 'myrand.py')
+    spec = importlib.util.spec_from_file_location('ex04_myrand', filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    lcg = module.LCGRand(seed)
+    return integer_source(looped(lcg.rand), 1, lcg.m - 1)
+
+
+def stdlib_source(seed=346):
+    return looped(random.Random(seed).random)
+
+
+def numpy_source(seed=346):
+    return np.random.default_rng(seed).random
+
+
+if __name__ == '__main__':
+    import sys
+
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10 ** 7
+    n_looped = min(n, 10 ** 6)
+
+    sources = [
+        ('ex05 LCGRand', lcg_source(), n),
+        ('ex05 RandIter', rand_iter_source(), n),
+        ('numpy Generator', numpy_source(), n),
+        ('ex04 LCGRand', ex04_lcg_source(), n_looped),
+        ('random.Random', stdlib_source(), n_looped),
+    ]
+    for name, source, size in sources:
+        results = run_battery(source, size)
+        print(f'{name} ({size} numbers, '
+              f'{results.pop("numbers_per_second"):.3g} numbers/s)')
+        for test, result in results.items():
+            print(f'    {test:>18}: statistic {result["statistic"]:10.3f}, '
+                  f'p-value {result["p_value"]:.4f}')
@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
 from walker_sim import Walker, Simulation
 from bounded_sim import BoundedWalker, BoundedSimulation
-from myrand import LCGRand
+from myrand import LCGRand, BufferedLCGRand
+from lattice_sim import (HomeGrid, LatticeWalker, BoundedLatticeWalker,
+                         LatticeSimulation, BoundedLatticeSimulation,
+                         ensemble_walk)
+from trajectory import TrajectoryStore
+from rng_battery import run_battery, lcg_source
+from rand_service import LCGService
 
 __author__ = "Hans Ekkehard Plesser"
 __email__ = "hans.ekkehard.plesser@nmbu.no"
@@ -87,3 +101,429 @@ def test_bounded_simulation():
     assert all(rs > 0 for rs in r)
 
 
+def test_walker_reset():
+    """Test that a walker can be reset and reused for a new walk."""
+
+    w = Walker(10, 20)
+    w.move()
+    w.reset(15)
+    assert w.get_position() == 15
+    assert w.get_steps() == 0
+
+
+def test_walkers_have_no_instance_dict():
+    """Test that the walkers store their attributes in slots."""
+
+    assert not hasattr(Walker(10, 20), '__dict__')
+    assert not hasattr(BoundedWalker(10, 20, 0, 30), '__dict__')
+
+
+def test_walk_until_home_matches_move():
+    """Test that the inner loop draws the same walk as repeated moves."""
+
+    for make_walker in [lambda: Walker(10, 20),
+                        lambda: BoundedWalker(10, 20, 0, 30)]:
+        random.seed(12345)
+        w = make_walker()
+        while not w.is_at_home():
+            w.move()
+
+        random.seed(12345)
+        fast = make_walker()
+        assert fast.walk_until_home() == w.get_steps()
+        assert fast.get_position() == 20
+
+
+def test_simulation_reuses_walker():
+    """Test that repeated simulations with the same seed agree."""
+
+    first = BoundedSimulation(0, 20, 12345, -10, 20).run_simulation(10)
+    second = BoundedSimulation(0, 20, 12345, -10, 20).run_simulation(10)
+    assert first == second
+
+
+def test_home_grid():
+    """Test that the occupancy grid finds the home points."""
+
+    grid = HomeGrid([(1, 2), (3, 2)])
+    positions = np.array([[1, 2], [2, 2], [3, 2], [-5, 7]])
+    assert grid.contains(positions).tolist() == [True, False, True, False]
+
+
+def test_lattice_walker():
+    """Test that LatticeWalker class can be used as required."""
+
+    start, home = (0, 0), (2, 2)
+    w = LatticeWalker(start, home)
+    assert not w.is_at_home()
+    w.move()
+    assert w.get_position() != start
+    assert sum(abs(c) for c in w.get_position()) == 1
+    w.move()
+    assert w.get_steps() == 2
+
+
+def test_bounded_lattice_walker_stays_in_box():
+    """Test that BoundedLatticeWalker never leaves its box."""
+
+    w = BoundedLatticeWalker((0, 0, 0), (3, 3, 3), (0, 0, 0), (3, 3, 3))
+    for _ in range(200):
+        w.move()
+        assert all(0 <= c <= 3 for c in w.get_position())
+
+
+def test_lattice_simulation():
+    """Test that the lattice simulations can be used as required."""
+
+    home = [(1, y) for y in range(-20, 21)]
+    s = LatticeSimulation((0, 0), home, 12345)
+    assert s.single_walk() != 0
+    r = s.run_simulation(5, max_steps=10000)
+    assert len(r) == 5
+    assert all(rs != 0 for rs in r)
+    assert (LatticeSimulation((0, 0), home, 1).run_simulation(5, 10000)
+            == LatticeSimulation((0, 0), home, 1).run_simulation(5, 10000))
+
+    s = BoundedLatticeSimulation((0, 0, 0), [(2, 2, 2), (2, 2, 1)], 12345,
+                                 (-3, -3, -3), (3, 3, 3))
+    r = s.run_simulation(5)
+    assert len(r) == 5
+    assert all(rs >= 5 for rs in r)
+
+
+def test_ensemble_walk_max_steps():
+    """Test that unfinished walks are marked with -1."""
+
+    steps = ensemble_walk(np.zeros((3, 2)), HomeGrid((50, 50)),
+                          np.random.default_rng(1), max_steps=10)
+    assert steps.tolist() == [-1, -1, -1]
+
+
+def test_trajectory_recording():
+    """Test that run_simulation records the path of every walk."""
+
+    store = TrajectoryStore(capacity=4)
+    steps = BoundedSimulation(0, 5, 12345, -3, 5).run_simulation(
+        10, trajectories=store
+    )
+    assert len(store) == 10
+    assert store.steps().tolist() == steps
+    for path in store:
+        assert path[0] == 0 and path[-1] == 5
+        assert all(-3 <= p <= 5 for p in path)
+    assert store.positions.dtype == np.int32
+
+    random.seed(1)
+    w = Walker(0, 3)
+    path = []
+    w.walk_until_home(path)
+    assert path[0] == 0 and path[-1] == 3 and len(path) == w.get_steps() + 1
+
+
+def test_trajectory_store_spills_to_disk(tmp_path):
+    """Test that large stores are memory mapped and can be reopened."""
+
+    store = TrajectoryStore(capacity=2, spill_bytes=64)
+    paths = [list(range(n)) for n in range(1, 30)]
+    for path in paths:
+        store.append(path)
+    assert store.on_disk
+    assert [p.tolist() for p in store] == paths
+    store.close()
+
+    filename = str(tmp_path / 'walks.int32')
+    with TrajectoryStore(capacity=2, filename=filename) as store:
+        for i, path in enumerate(paths):
+            store.append(path)
+            if i == 10:
+                store.flush()
+    reopened = TrajectoryStore.open(filename)
+    assert len(reopened) == len(paths)
+    assert reopened[-1].tolist() == paths[-1]
+    assert os.path.getsize(filename) == reopened.positions.nbytes
+
+    with TrajectoryStore(capacity=2, filename=filename) as store:
+        store.flush()
+        assert len(TrajectoryStore.open(filename)) == 0
+    assert os.path.getsize(filename) == 0
+
+    path = tmp_path / 'path.int32'
+    with TrajectoryStore(capacity=2, filename=path) as store:
+        store.append(paths[3])
+    assert TrajectoryStore.open(path)[0].tolist() == paths[3]
+
+
+def test_buffered_lcg():
+    """Test that the buffered LCG gives the same numbers as LCGRand."""
+
+    lcg, buffered = LCGRand(346), BufferedLCGRand(346, block_size=7)
+    assert [lcg.rand() for _ in range(20)] == [
+        buffered.rand() for _ in range(20)
+    ]
+    assert all(buffered.randint(1, 6) in range(1, 7) for _ in range(100))
+
+
+def test_simulations_have_independent_streams():
+    """Test that interleaved simulations do not affect each other."""
+
+    expected = Simulation(0, 10, 12345).run_simulation(10)
+
+    first, second = Simulation(0, 10, 12345), Simulation(0, 10, 12345)
+    interleaved = []
+    for _ in range(10):
+        interleaved.append(first.single_walk())
+        random.seed(1)
+        second.single_walk()
+    assert interleaved == expected
+
+
+def test_simulations_in_threads_are_reproducible():
+    """Test that simulations give the same results in a thread pool."""
+
+    def simulate(seed):
+        rng = BufferedLCGRand(seed) if seed % 2 else None
+        return BoundedSimulation(0, 20, seed, -50, 20,
+                                 rng=rng).run_simulation(20)
+
+    seeds = list(range(1, 9))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        parallel = list(pool.map(simulate, seeds))
+    assert parallel == [simulate(seed) for seed in seeds]
+
+
+def test_rand_array():
+    """Test that bulk generation gives the same numbers as rand."""
+
+    for n in [1, 2, 17, 1000]:
+        lcg, bulk = LCGRand(346), LCGRand(346)
+        assert bulk.rand_array(n).tolist() == [lcg.rand() for _ in range(n)]
+        assert bulk.rand() == lcg.rand()
+
+
+def test_fill():
+    """Test that fill writes the sequence into a given array."""
+
+    out = np.zeros(50, dtype=np.uint32)
+    assert LCGRand(3).fill(out) is out
+    assert out[:3].tolist() == [50421, 847425747, 572982925]
+
+
+def test_jump():
+    """Test that jump skips numbers like repeated calls to rand."""
+
+    for lcg, jumper in [(LCGRand(346), LCGRand(346)),
+                        (LCGRand(346), BufferedLCGRand(346, block_size=8))]:
+        for _ in range(5):
+            lcg.rand()
+        jumper.rand()
+        jumper.jump(4)
+        last = lcg.rand()
+        assert jumper.rand() == last
+        jumper.jump(-1)
+        assert jumper.rand() == last
+        assert jumper.rand_array(3).tolist() == lcg.rand_array(3).tolist()
+
+    lcg = LCGRand(346)
+    lcg.jump(LCGRand.period)
+    assert lcg.rand() == 5815222
+
+
+def test_spawn():
+    """Test that spawned substreams start evenly spaced in the stream."""
+
+    lcg = LCGRand(346)
+    lcg.rand()
+    substreams = lcg.spawn(3)
+    assert len(substreams) == 3
+
+    spacing = LCGRand.period // 4
+    for i, substream in enumerate(substreams, start=1):
+        reference = LCGRand(346)
+        reference.rand()
+        reference.jump(i * spacing)
+        assert substream.rand() == reference.rand()
+    assert lcg.rand() == 1099672039
+
+
+def test_buffered_rand_iter():
+    """Test that the buffered iterator gives the same sequence."""
+
+    true = [50421, 847425747, 572982925, 807347327, 1284843143, 1410633816]
+    assert list(LCGRand(3).random_sequence(6, block_size=4)) == true
+
+    numbers = iter(LCGRand(3).random_sequence(6, block_size=4))
+    assert next(numbers) == true[0]
+    block = numbers.next_block(4)
+    assert isinstance(block, np.ndarray)
+    assert block.tolist() == true[1:5]
+    assert numbers.next_block(4).tolist() == true[5:]
+    assert len(numbers.next_block(4)) == 0
+
+
+def test_rand_iter_checkpoint():
+    """Test that an iterator can be restored and iterated again."""
+
+    for block_size in [None, 5]:
+        numbers = iter(BufferedLCGRand(3).random_sequence(20, block_size))
+        first = [next(numbers) for _ in range(7)]
+        checkpoint = numbers.checkpoint()
+        rest = numbers.next_block(20).tolist()
+        assert first + rest == LCGRand(3).rand_array(20).tolist()
+
+        numbers.restore(checkpoint)
+        assert list(numbers) == rest
+        with pytest.raises(RuntimeError):
+            iter(numbers)
+
+
+def test_rng_battery_accepts_good_generator():
+    """Test that the battery does not reject a good generator."""
+
+    results = run_battery(lcg_source(), 200000, chunk_size=30000)
+    assert results['numbers_per_second'] > 0
+    for name in ['chi_square', 'serial_correlation', 'runs', 'gap']:
+        assert results[name]['p_value'] > 1e-4
+
+
+def test_rng_battery_rejects_bad_generator():
+    """Test that the battery rejects a correlated stream."""
+
+    state = {'x': 0.0}
+
+    def drifting(k):
+        numbers = (state['x'] + 0.001 * np.arange(1, k + 1)) % 1
+        state['x'] = numbers[-1]
+        return numbers
+
+    results = run_battery(drifting, 200000, chunk_size=30000)
+    assert results['serial_correlation']['p_value'] < 1e-4
+    assert results['runs']['p_value'] < 1e-4
+    assert results['gap']['p_value'] < 1e-4
+
+
+def test_lcg_floats():
+    """Test that the float draws are in [0, 1) and agree."""
+
+    lcg, bulk = LCGRand(346), LCGRand(346)
+    floats = [lcg.random() for _ in range(100)]
+    assert all(0 <= f < 1 for f in floats)
+    assert np.allclose(bulk.random_array(100), floats)
+
+
+def test_lcg_bounded_integers():
+    """Test that dice rolls and coin flips are in range and uniform."""
+
+    lcg = LCGRand(346)
+    assert all(1 <= lcg.randint(1, 6) <= 6 for _ in range(100))
+    assert all(0 <= lcg.randrange(3) < 3 for _ in range(100))
+
+    rolls = lcg.randint_array(1, 6, 60000)
+    assert rolls.min() == 1 and rolls.max() == 6
+    assert np.all(np.abs(np.bincount(rolls)[1:] - 10000) < 500)
+    flips = lcg.randint_array(0, 1, 10001)
+    assert len(flips) == 10001
+    assert abs(flips.mean() - 0.5) < 0.03
+    assert np.array_equal(lcg.randint_array(3, 3, 5), [3] * 5)
+
+    with pytest.raises(ValueError):
+        lcg.randint(6, 1)
+    with pytest.raises(ValueError):
+        lcg.randint_array(6, 1, 10)
+    with pytest.raises(ValueError):
+        lcg.randrange(0)
+
+
+def test_lcg_as_simulation_rng():
+    """Test that LCGRand can be used as random generator for walkers."""
+
+    s = BoundedSimulation(0, 10, 1, -5, 10, rng=LCGRand(1))
+    assert s.run_simulation(3) == BoundedSimulation(
+        0, 10, 1, -5, 10, rng=BufferedLCGRand(1)
+    ).run_simulation(3)
+    w = LatticeWalker((0, 0), (2, 2), rng=LCGRand(5))
+    w.move()
+    assert w.get_steps() == 1
+
+
+def test_service_blocks_follow_the_stream():
+    """Test that service blocks are consecutive parts of one stream."""
+
+    service = LCGService(346, block_size=5)
+    stream = LCGRand(346).rand_array(15).tolist()
+    assert service.block(2).rand_array(5).tolist() == stream[10:]
+    assert [service.reserve().rand() for _ in range(3)] == stream[::5]
+
+    block = service.block(0)
+    block.rand_array(5)
+    with pytest.raises(RuntimeError):
+        block.rand()
+
+
+def test_service_blocks_stay_in_their_range():
+    """Test that jumps and spawned blocks do not leave the block."""
+
+    service = LCGService(346, block_size=10)
+    stream = LCGRand(346).rand_array(10).tolist()
+    block = service.block(0)
+    block.jump(3)
+    assert block.rand() == stream[3]
+    with pytest.raises(RuntimeError):
+        block.jump(7)
+    with pytest.raises(ValueError):
+        block.jump(-1)
+
+    block = service.block(0)
+    block.rand()
+    spawned, = block.spawn(1)
+    assert block.rand_array(4).tolist() == stream[1:5]
+    assert spawned.rand_array(4).tolist() == stream[5:9]
+    for part in (block, spawned):
+        with pytest.raises(RuntimeError):
+            part.rand()
+    with pytest.raises(RuntimeError):
+        service.block(0).spawn(10)
+
+    # The ten numbers of the block hold 100 dice rolls, although
+    # randint_array usually draws extra numbers to allow for rejections
+    block = service.block(0)
+    rolls = block.randint_array(1, 6, 100)
+    assert len(rolls) == 100 and 1 <= rolls.min() <= rolls.max() <= 6
+    assert block.remaining == 0
+    with pytest.raises(RuntimeError):
+        block.randint_array(0, 1, 1)
+
+
+def test_service_consumers_in_threads():
+    """Test that threads together draw each block of the stream once."""
+
+    service = LCGService(346, block_size=100)
+
+    def consume(_):
+        consumer = service.consumer()
+        numbers = consumer.rand_array(250).tolist()
+        return dict(zip(consumer.block_indices,
+                        [numbers[:100], numbers[100:200], numbers[200:]]))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        blocks = {}
+        for result in pool.map(consume, range(8)):
+            blocks.update(result)
+
+    assert sorted(blocks) == list(range(24))
+    stream = LCGRand(346).rand_array(2400).tolist()
+    for index, numbers in blocks.items():
+        assert numbers == stream[100 * index:100 * index + len(numbers)]
+
+
+def test_service_reserve_async():
+    """Test that asyncio tasks get different blocks."""
+
+    service = LCGService(346, block_size=10)
+
+    async def reserve_all():
+        return await asyncio.gather(
+            *(service.reserve_async() for _ in range(5))
+        )
+
+    blocks = asyncio.run(reserve_all())
+    assert sorted(block.index for block in blocks) == list(range(5))
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+"""
+Storage for the paths of many random walks.
+
+All positions are kept in one flat ``int32`` buffer and the start of each
+walk is kept in a compact ``int64`` offset index, so walk ``i`` is the
+slice ``positions[offsets[i]:offsets[i + 1]]``. The buffer lives in memory
+until it grows larger than ``spill_bytes``, after that it is a memory-mapped
+file on disk and only the parts that are sliced are read into RAM.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+__author__ = 'Johan Stabekk'
+__email__ = 'johan.stabekk@nmbu.no'
+
+
+class TrajectoryStore:
+    position_dtype = np.int32
+
+    def __init__(self, capacity=2 ** 16, spill_bytes=2 ** 28, filename=None):
+        """
+        Initialise an empty trajectory store
+
+        Arguments
+        ---------
+        capacity : int
+            Number of positions to preallocate room for
+        spill_bytes : int
+            The positions are moved to a memory-mapped file when the buffer
+            needs more than this many bytes
+        filename : str or os.PathLike or None
+            File to memory map the positions to. If None, a temporary file
+            is used and removed by ``close``. If given, the positions are
+            mapped to this file from the start and the offsets are written
+            next to it by ``flush``, so that the store can be reopened with
+            ``TrajectoryStore.open``.
+        """
+        self.spill_bytes = spill_bytes
+        if filename is not None:
+            filename = os.fspath(filename)
+        self.filename = filename
+        self._temporary = False
+        self._size = 0
+        self._num_walks = 0
+        self._offsets = np.zeros(1024, dtype=np.int64)
+
+        if filename is None:
+            self._positions = np.empty(capacity, dtype=self.position_dtype)
+        else:
+            self._positions = self._map_file(filename, capacity, 'w+')
+
+    def _map_file(self, filename, capacity, mode):
+        """
+        Memory map ``capacity`` positions of a file, resizing the file.
+
+        Returns
+        -------
+        np.memmap
+        """
+        with open(filename, 'r+b' if mode == 'r+' else 'w+b') as file:
+            file.truncate(capacity * np.dtype(self.position_dtype).itemsize)
+        return np.memmap(filename, dtype=self.position_dtype, mode='r+',
+                         shape=(capacity,))
+
+    def _spill(self, capacity):
+        """
+        Move the in-memory positions to a memory-mapped temporary file.
+        """
+        descriptor, self.filename = tempfile.mkstemp(suffix='.int32')
+        os.close(descriptor)
+        self._temporary = True
+
+        mapped = self._map_file(self.filename, capacity, 'r+')
+        mapped[:self._size] = self._positions[:self._size]
+        self._positions = mapped
+
+    def _reserve(self, num_positions):
+        """
+        Make room for ``num_positions`` more positions and one more walk.
+        """
+        needed = self._size + num_positions
+        capacity = len(self._positions)
+        if needed > capacity:
+            capacity = max(2 * capacity, needed)
+            nbytes = capacity * np.dtype(self.position_dtype).itemsize
+            if isinstance(self._positions, np.memmap):
+                self._positions.flush()
+                self._positions = self._map_file(self.filename, capacity,
+                                                 'r+')
+            elif nbytes > self.spill_bytes:
+                self._spill(capacity)
+            else:
+                positions = np.empty(capacity, dtype=self.position_dtype)
+                positions[:self._size] = self._positions[:self._size]
+                self._positions = positions
+
+        if self._num_walks + 2 > len(self._offsets):
+            offsets = np.zeros(2 * len(self._offsets), dtype=np.int64)
+            offsets[:self._num_walks + 1] = self.offsets
+            self._offsets = offsets
+
+    def append(self, path):
+        """
+        Add the path of one walk.
+
+        Arguments
+        ---------
+        path : sequence of int
+            The positions of the walker, starting with the start position
+        """
+        path = np.asarray(path, dtype=self.position_dtype)
+        self._reserve(len(path))
+
+        end = self._size + len(path)
+        self._positions[self._size:end] = path
+        self._size = end
+        self._num_walks += 1
+        self._offsets[self._num_walks] = end
+
+    @property
+    def positions(self):
+        """All recorded positions, walk after walk, as a view."""
+        return self._positions[:self._size]
+
+    @property
+    def offsets(self):
+        """Index of walk starts, walk ``i`` ends where walk ``i + 1``
+        starts."""
+        return self._offsets[:self._num_walks + 1]
+
+    @property
+    def on_disk(self):
+        return isinstance(self._positions, np.memmap)
+
+    def __len__(self):
+        return self._num_walks
+
+    def __getitem__(self, walk):
+        """
+        Get the path of a walk as a view into the storage buffer.
+
+        Arguments
+        ---------
+        walk : int
+            Index of the walk, negative indices count from the end
+
+        Returns
+        -------
+        np.ndarray
+        """
+        if walk < 0:
+            walk += self._num_walks
+        if not 0 <= walk < self._num_walks:
+            raise IndexError('Walk index out of range')
+
+        return self._positions[self._offsets[walk]:self._offsets[walk + 1]]
+
+    def __iter__(self):
+        for walk in range(self._num_walks):
+            yield self[walk]
+
+    def steps(self):
+        """
+        The number of steps of every walk, computed from the offsets.
+
+        Returns
+        -------
+        np.ndarray
+        """
+        return np.diff(self.offsets) - 1
+
+    def flush(self):
+        """
+        Write memory-mapped positions to disk, and the offsets next to the
+        positions file (``<filename>.offsets.npy``) if a file name was given.
+
+        The file is then shrunk to the recorded positions and mapped again,
+        so it holds no unused capacity. An empty store keeps its file size
+        until it is closed, as an empty file can not be memory mapped.
+        """
+        if self.on_disk and self._positions.mode != 'r':
+            self._positions.flush()
+            if not self._temporary:
+                np.save(self.filename + '.offsets.npy', self.offsets)
+                if 0 < self._size < len(self._positions):
+                    self._positions = self._map_file(self.filename,
+                                                     self._size, 'r+')
+
+    def close(self):
+        """
+        Flush the store, release the buffer and remove the temporary file,
+        if one was used. The store is empty after it is closed.
+        """
+        self.flush()
+        on_disk = self.on_disk and self._positions.mode != 'r'
+        self._positions = np.empty(0, dtype=self.position_dtype)
+        if on_disk and self._temporary:
+            os.remove(self.filename)
+            self.filename = None
+        elif on_disk and self._size == 0:
+            with open(self.filename, 'r+b') as file:
+                file.truncate(0)
+        self._size = 0
+        self._num_walks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Open a flushed trajectory file read-only, without loading it.
+
+        Arguments
+        ---------
+        filename : str or os.PathLike
+            The file name the store was created with
+
+        Returns
+        -------
+        TrajectoryStore
+        """
+        filename = os.fspath(filename)
+        store = cls.__new__(cls)
+        store.spill_bytes = 0
+        store.filename = filename
+        store._temporary = False
+        store._offsets = np.load(filename + '.offsets.npy')
+        store._num_walks = len(store._offsets) - 1
+        store._size = int(store._offsets[-1])
+        if store._size == 0:
+            # An empty file can not be memory mapped
+            store._positions = np.empty(0, dtype=cls.position_dtype)
+        else:
+            store._positions = np.memmap(filename, dtype=cls.position_dtype,
+                                         mode='r', shape=(store._size,))
+        return store
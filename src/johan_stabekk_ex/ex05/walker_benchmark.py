@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for the random walkers.
+
+``compare_walkers`` measures the per-step overhead of the walker loop, while
+``run_benchmarks`` times ``start_to_home`` from EX04 and the EX05
+simulations over grids of distances and left boundaries. It reports
+steps/second and walks/second, compares the measured walk lengths with
+the theoretical O(distance**2) behaviour and can store the results as a
+JSON baseline that later runs are compared against.
+
+Unbounded walks have heavy-tailed lengths (the mean is infinite), so their
+scaling is judged from the median, and the distances are kept small.
+"""
+
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import time
+
+import numpy as np
+
+from walker_sim import Walker, Simulation
+from bounded_sim import BoundedWalker, BoundedSimulation
+
+__author__ = 'Johan Stabekk'
+__email__ = 'johan.stabekk@nmbu.no'
+
+
+def method_call_walk(walker):
+    """
+    Walk home by calling ``is_at_home`` and ``move`` for every step, as the
+    simulations originally did.
+
+    Arguments
+    ---------
+    walker : Walker
+        The walker to move
+
+    Returns
+    -------
+    int
+        The number of steps taken
+    """
+    while not walker.is_at_home():
+        walker.move()
+
+    return walker.get_steps()
+
+
+def time_per_step(walk, make_walker, num_walks, seed):
+    """
+    Measure the average time per step of a walk function.
+
+    Arguments
+    ---------
+    walk : callable
+        Function that takes a walker, walks it home and returns the number
+        of steps
+    make_walker : callable
+        Function that returns a walker ready for the next walk
+    num_walks : int
+        The number of walks to time
+    seed : int
+        Random generator seed
+
+    Returns
+    -------
+    float
+        Seconds per step
+    """
+    random.seed(seed)
+    total_steps = 0
+    start_time = time.perf_counter()
+    for _ in range(num_walks):
+        total_steps += walk(make_walker())
+    return (time.perf_counter() - start_time) / total_steps
+
+
+def compare_walkers(start, home, num_walks, seed, left=None, right=None):
+    """
+    Compare the per-step time of a fresh walker moved through method calls
+    with a reused walker moved by ``walk_until_home``.
+
+    Arguments
+    ---------
+    start : int
+        The walker's initial position
+    home : int
+        The walk ends when the walker reaches home
+    num_walks : int
+        The number of walks to time for each variant
+    seed : int
+        Random generator seed, the same for both variants
+    left : int or None
+        Left boundary, a bounded walker is used if both limits are given
+    right : int or None
+        Right boundary, a bounded walker is used if both limits are given
+
+    Returns
+    -------
+    tuple[float, float]
+        Seconds per step for the method-call and the inner-loop variant
+    """
+    if left is None or right is None:
+        def new_walker():
+            return Walker(start, home)
+        reused = Walker(start, home)
+    else:
+        def new_walker():
+            return BoundedWalker(start, home, left, right)
+        reused = BoundedWalker(start, home, left, right)
+
+    def reused_walker():
+        reused.reset(start)
+        return reused
+
+    method_call = time_per_step(method_call_walk, new_walker, num_walks, seed)
+    inner_loop = time_per_step(
+        lambda walker: walker.walk_until_home(), reused_walker, num_walks, seed
+    )
+    return method_call, inner_loop
+
+
+def load_start_to_home():
+    """
+    Import ``start_to_home`` from the EX04 walker module.
+
+    The module is loaded from its file, since EX04 and EX05 both have a
+    ``myrand`` module and can not both be on the import path.
+
+    Returns
+    -------
+    callable
+    """
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'ex04', 'walker.py')
+    spec = importlib.util.spec_from_file_location('ex04_walker', filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.start_to_home
+
+
+def bounded_expected_steps(start, home, left):
+    """
+    Expected number of steps for a bounded walk from start to home.
+
+    A walker that tries to step past the left boundary stays where it is,
+    which gives the expectation
+    ``(home - left) * (home - left + 1) - (start - left) * (start - left + 1)``
+    for ``left <= start <= home``.
+
+    Returns
+    -------
+    int
+    """
+    return ((home - left) * (home - left + 1)
+            - (start - left) * (start - left + 1))
+
+
+def time_walks(walk_set, num_walks):
+    """
+    Time a set of walks.
+
+    Arguments
+    ---------
+    walk_set : callable
+        Function that takes the number of walks and returns their lengths
+    num_walks : int
+        The number of walks
+
+    Returns
+    -------
+    dict
+        Timing and walk length statistics
+    """
+    start_time = time.perf_counter()
+    lengths = walk_set(num_walks)
+    seconds = time.perf_counter() - start_time
+    total_steps = sum(lengths)
+    return {
+        'num_walks': num_walks,
+        'seconds': seconds,
+        'total_steps': total_steps,
+        'steps_per_second': total_steps / seconds,
+        'walks_per_second': num_walks / seconds,
+        'mean_steps': total_steps / num_walks,
+        'median_steps': statistics.median(lengths),
+    }
+
+
+def scaling_exponent(distances, lengths):
+    """
+    Fit ``lengths ~ distance ** exponent`` on a log-log scale.
+
+    Returns
+    -------
+    float
+        The exponent, which should be close to 2 for random walks
+    """
+    return float(np.polyfit(np.log(distances), np.log(lengths), 1)[0])
+
+
+def run_benchmarks(distances=(1, 2, 5, 10, 20), boundaries=(0, -10, -100),
+                   num_walks=50, seed=12345):
+    """
+    Benchmark ``start_to_home``, ``Simulation`` and ``BoundedSimulation``.
+
+    Every walk starts at 0 and goes home to each of the distances. The
+    bounded simulations use each left boundary, with the right boundary
+    at home.
+
+    Arguments
+    ---------
+    distances : sequence of int
+        Home positions to walk to
+    boundaries : sequence of int
+        Left boundaries for the bounded simulation
+    num_walks : int
+        The number of walks per distance (and boundary)
+    seed : int
+        Random generator seed
+
+    Returns
+    -------
+    dict
+        Results that can be written with ``write_baseline``
+    """
+    start_to_home = load_start_to_home()
+
+    def ex04_walks(distance):
+        def walk_set(n):
+            random.seed(seed)
+            return [start_to_home(0, distance) for _ in range(n)]
+        return walk_set
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'num_walks': num_walks,
+            'seed': seed,
+        },
+        'benchmarks': {},
+        'scaling': {},
+    }
+    benchmarks = results['benchmarks']
+
+    for distance in distances:
+        benchmarks[f'start_to_home/d={distance}'] = time_walks(
+            ex04_walks(distance), num_walks
+        )
+        benchmarks[f'Simulation/d={distance}'] = time_walks(
+            Simulation(0, distance, seed).run_simulation, num_walks
+        )
+        for left in boundaries:
+            result = time_walks(
+                BoundedSimulation(0, distance, seed, left,
+                                  distance).run_simulation,
+                num_walks
+            )
+            result['expected_mean_steps'] = bounded_expected_steps(
+                0, distance, left
+            )
+            result['mean_over_expected'] = (result['mean_steps']
+                                            / result['expected_mean_steps'])
+            benchmarks[f'BoundedSimulation/d={distance},left={left}'] = result
+
+    for name in ['start_to_home', 'Simulation']:
+        medians = [benchmarks[f'{name}/d={d}']['median_steps']
+                   for d in distances]
+        results['scaling'][name] = scaling_exponent(distances, medians)
+    for left in boundaries:
+        means = [benchmarks[f'BoundedSimulation/d={d},left={left}']
+                 ['mean_steps'] for d in distances]
+        expected = [bounded_expected_steps(0, d, left) for d in distances]
+        results['scaling'][f'BoundedSimulation/left={left}'] = {
+            'measured': scaling_exponent(distances, means),
+            'theoretical': scaling_exponent(distances, expected),
+        }
+
+    return results
+
+
+def write_baseline(results, filename):
+    """
+    Write benchmark results to a JSON file.
+    """
+    with open(filename, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, filename):
+    """
+    Compare benchmark results with a JSON baseline.
+
+    Arguments
+    ---------
+    results : dict
+        Results from ``run_benchmarks``
+    filename : str
+        File written by ``write_baseline``
+
+    Returns
+    -------
+    dict
+        Ratio of the new steps/second to the baseline steps/second for
+        every benchmark present in both, larger is faster
+    """
+    with open(filename) as file:
+        baseline = json.load(file)['benchmarks']
+
+    return {
+        name: result['steps_per_second'] / baseline[name]['steps_per_second']
+        for name, result in results['benchmarks'].items()
+        if name in baseline
+    }
+
+
+if __name__ == '__main__':
+    import sys
+
+    for name, limits in [('Walker', (None, None)),
+                         ('BoundedWalker', (-100, 20))]:
+        method_call, inner_loop = compare_walkers(0, 20, 200, 12345, *limits)
+        print(f'{name:>13}: method calls {method_call * 1e9:7.1f} ns/step, '
+              f'inner loop {inner_loop * 1e9:7.1f} ns/step, '
+              f'reduction {100 * (1 - inner_loop / method_call):5.1f} %')
+
+    results = run_benchmarks()
+    for name, result in results['benchmarks'].items():
+        print(f'{name:>36}: {result["steps_per_second"]:12.0f} steps/s '
+              f'{result["walks_per_second"]:10.1f} walks/s')
+    for name, exponent in results['scaling'].items():
+        if isinstance(exponent, dict):
+            print(f'Scaling exponent {name:>28}: {exponent["measured"]:.2f} '
+                  f'(theory {exponent["theoretical"]:.2f})')
+        else:
+            print(f'Scaling exponent {name:>28}: {exponent:.2f} (theory 2)')
+
+    if len(sys.argv) > 1:
+        baseline = sys.argv[1]
+        if os.path.exists(baseline):
+            for name, ratio in compare_to_baseline(results, baseline).items():
+                print(f'{name:>36}: {ratio:5.2f} x baseline')
+        else:
+            write_baseline(results, baseline)
@@ -7,10 +7,40 @@ __email__ = 'johan.stabekk@nmbu.no'
 
 
 class Walker:
-    def __init__(self, start, home):
+    __slots__ = ('position', 'end_point', 'steps', 'rng')
+
+    def __init__(self, start, home, rng=None):
+        """
+        Initialise the walker
+
+        Arguments
+        ---------
+        start : int
+            The walker's initial position
+        home : int
+            The walk ends when the walker reaches home
+        rng : random.Random or None
+            Random generator with a ``randint`` method, for example a
+            ``random.Random`` or a ``myrand.BufferedLCGRand`` instance.
+            The global generator of the ``random`` module is used if None.
+        """
         self.position = start
         self.end_point = home
         self.steps = 0
+        self.rng = random if rng is None else rng
+
+    def reset(self, start):
+        """
+        Place the walker at a new start position and clear the step count,
+        so that the same instance can be reused for another walk.
+
+        Arguments
+        ---------
+        start : int
+            The walker's new initial position
+        """
+        self.position = start
+        self.steps = 0
 
     def move(self):
         """ This function calculates one step for the walker class.
@@ -19,7 +49,7 @@ class Walker:
         -------
 
         """
-        self.position += 2 * random.randint(0, 1) - 1
+        self.position += 2 * self.rng.randint(0, 1) - 1
         self.steps += 1
 
     def is_at_home(self):
@@ -31,12 +61,53 @@ class Walker:
     def get_steps(self):
         return self.steps
 
+    def walk_until_home(self, path=None):
+        """
+        Move the walker until it reaches home.
+
+        The loop keeps position and step count in local variables and only
+        writes them back when the walk is finished, which avoids the method
+        calls and attribute lookups of ``move`` and ``is_at_home`` per step.
+        The random numbers are drawn exactly as in ``move``.
+
+        Arguments
+        ---------
+        path : list or None
+            If given, the current position and the position after every
+            step are appended to this list
+
+        Returns
+        -------
+        int
+            The total number of steps taken by the walker
+        """
+        position, home, steps = self.position, self.end_point, self.steps
+        randint = self.rng.randint
+
+        if path is None:
+            while position != home:
+                position += 2 * randint(0, 1) - 1
+                steps += 1
+        else:
+            record = path.append
+            record(position)
+            while position != home:
+                position += 2 * randint(0, 1) - 1
+                steps += 1
+                record(position)
+
+        self.position, self.steps = position, steps
+        return steps
+
 
 class Simulation:
-    def __init__(self, start, home, seed):
+    def __init__(self, start, home, seed, rng=None):
         """
         Initialise the simulation
 
+        Every simulation owns its random generator, so simulations do not
+        affect each other's random numbers and can run in separate threads.
+
         Arguments
         ---------
         start : int
@@ -45,28 +116,58 @@ class Simulation:
             The walk ends when the walker reaches home
         seed : int
             Random generator seed
+        rng : random.Random or None
+            Random generator with a ``randint`` method, for example a
+            ``myrand.BufferedLCGRand``. If None, a ``random.Random`` seeded
+            with ``seed`` is used.
         """
         self.start = start
         self.home = home
-        self.seed = random.seed(seed)
+        self.seed = seed
+        self.rng = random.Random(seed) if rng is None else rng
+        self._walker = self._create_walker()
 
-    def single_walk(self):
+    def _create_walker(self):
+        """
+        Create the walker instance that is reused for every walk.
+
+        Returns
+        -------
+        Walker
+        """
+        return Walker(self.start, self.home, self.rng)
+
+    def single_walk(self, trajectories=None):
         """
         Simulate single walk from start to home, returning number of steps.
 
+        The path is collected in a list and copied to the store when the
+        walk ends. This is deliberate: the length of a walk is not known
+        before it ends, and appending a Python int to a list is cheaper per
+        step than writing it into an int32 array.
+
+        Arguments
+        ---------
+        trajectories : TrajectoryStore or None
+            If given, the path of the walk is appended to this store
+
         Returns
         -------
         int
            The number of steps taken
         """
-        walker = Walker(self.start_pos, self.end_pos)
+        walker = self._walker
+        walker.reset(self.start)
 
-        while not walker.is_at_home():
-            walker.move()
+        if trajectories is None:
+            return walker.walk_until_home()
 
-        return walker.get_steps()
+        path = []
+        steps = walker.walk_until_home(path)
+        trajectories.append(path)
+        return steps
 
-    def run_simulation(self, num_walks):
+    def run_simulation(self, num_walks, trajectories=None):
         """
         Run a set of walks, returns list of number of steps taken.
 
@@ -74,13 +175,15 @@ class Simulation:
         ---------
         num_walks : int
             The number of walks to simulate
+        trajectories : TrajectoryStore or None
+            If given, the path of every walk is appended to this store
 
         Returns
         -------
         list[int]
             List with the number of steps per walk
         """
-        return [self.single_walk() for _ in range(num_walks)]
+        return [self.single_walk(trajectories) for _ in range(num_walks)]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for the logistic regression estimator.
+``run_benchmarks`` fits every solver to simulated datasets of 10**3 to
+10**7 rows and 5 to 1000 features and reports the fit time, the number of
+iterations, whether the solver converged, the predictions per second of
+``predict_proba`` and the peak memory of fitting and scoring, as traced by
+``tracemalloc`` (which includes NumPy arrays). The time of one
+``logistic_gradient`` evaluation is reported for every dataset, and
+scikit-learn's own ``LogisticRegression`` is fitted to the same data as a
+reference point. The results can be stored as a JSON baseline that later
+runs are compared against.
+``compare_precision`` fits and scores the same simulated dataset with
+``dtype=np.float64`` and ``dtype=np.float32``, and reports the same
+measures and how much the probabilities of the two models differ.
+"""
+
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+import sklearn
+from sklearn.linear_model import (
+    LogisticRegression as SklearnLogisticRegression
+)
+
+from logistic_regression import (
+    LogisticRegression, logistic_gradient, predict_proba
+)
+
+__author__ = 'Johan Stabekk'
+__email__ = 'johansta@nmbu.no'
+
+
+def make_data(num_samples, num_features, seed=0, dtype=np.float64):
+    """Simulate a dataset like the ``__main__`` block of
+    ``logistic_regression``.
+    The labels are drawn with the model probabilities instead of
+    thresholded, so the classes overlap and the solvers converge, and the
+    true coefficients are scaled so that the logits stay of order one for
+    any number of features.
+    Parameters
+    ----------
+    num_samples : int
+    num_features : int
+    seed : int (default=0)
+        Seed of the random generator.
+    dtype : np.float64 or np.float32 (default=np.float64)
+        The floating point type of X, which is drawn in this type.
+    Returns
+    -------
+    X : np.ndarray(shape=(num_samples, num_features))
+    y : np.ndarray(shape=(num_samples,), dtype=bool)
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((num_samples, num_features), dtype=dtype)
+    coef = rng.standard_normal(num_features) / np.sqrt(num_features)
+    y = rng.uniform(size=num_samples) < predict_proba(coef, X)
+    return X, y
+
+
+def measure(function, *args, **kwargs):
+    """Call a function and measure its wall time and peak memory use.
+    Returns
+    -------
+    result
+        What the function returned.
+    seconds : float
+    peak_bytes : int
+        The largest amount of memory allocated during the call, as traced
+        by ``tracemalloc``.
+    """
+    tracemalloc.start()
+    try:
+        start_time = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter() - start_time
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak_bytes
+
+
+def benchmark_model(model, X, y):
+    """Fit a model and score the training data with it.
+    Returns
+    -------
+    results : dict
+        The fit time, iterations, whether the solver converged before
+        ``max_iter``, predictions per second and the peak memory of
+        fitting and scoring, in MB.
+    proba : np.ndarray(shape=(n,))
+        The predicted probabilities.
+    """
+    _, fit_seconds, fit_peak = measure(model.fit, X, y)
+    proba, predict_seconds, predict_peak = measure(model.predict_proba, X)
+    n_iter = int(np.max(model.n_iter_))
+    results = {
+        "fit_seconds": fit_seconds,
+        "n_iter": n_iter,
+        "converged": n_iter < model.max_iter,
+        "fit_peak_mb": fit_peak / 2 ** 20,
+        "predictions_per_second": X.shape[0] / predict_seconds,
+        "predict_peak_mb": predict_peak / 2 ** 20,
+    }
+    return results, proba
+
+
+def compare_precision(num_samples, num_features, solver="lbfgs", seed=0):
+    """Compare fitting and scoring in double and single precision.
+    The data is simulated in float64 and converted to float32 for the
+    single precision model, so both models see the same values, and each
+    model gets its data in its own type (the float64 model would otherwise
+    upcast a float32 X).
+    Parameters
+    ----------
+    num_samples : int
+    num_features : int
+    solver : str (default="lbfgs")
+        The solver of both models.
+    seed : int (default=0)
+        Seed of the simulation and the models.
+    Returns
+    -------
+    results : dict
+        The results of ``benchmark_model`` for ``"float64"`` and
+        ``"float32"``, the size of X in both types in MB and the largest
+        difference between the probabilities of the two models.
+    """
+    X, y = make_data(num_samples, num_features, seed)
+    results = {}
+    probas = {}
+    for dtype in [np.float64, np.float32]:
+        X = X.astype(dtype, copy=False)
+        model = LogisticRegression(
+            solver=solver, fit_intercept=True, random_state=seed,
+            dtype=dtype,
+        )
+        name = np.dtype(dtype).name
+        results[name], probas[name] = benchmark_model(model, X, y)
+        results[name]["data_mb"] = X.nbytes / 2 ** 20
+    results["max_proba_difference"] = float(
+        np.max(np.abs(probas["float64"] - probas["float32"]))
+    )
+    return results
+
+
+# The solvers of the suite. The first order solvers use Adam on
+# mini-batches, since its steps do not depend on the scale of the gradient,
+# which grows with the number of rows.
+SOLVERS = {
+    "lbfgs": {"solver": "lbfgs"},
+    "newton": {"solver": "newton"},
+    "adam": {"solver": "adam", "batch_size": 4096, "max_iter": 20},
+}
+
+
+def time_gradient(X, y, repeats=3):
+    """Time one ``logistic_gradient`` evaluation, with preallocated output
+    and work arrays.
+    Returns
+    -------
+    results : dict
+        The shortest time of ``repeats`` evaluations and the rows per
+        second it corresponds to.
+    """
+    coef = np.zeros(X.shape[1])
+    out = np.empty(X.shape[1])
+    work = np.empty(X.shape[0])
+    seconds = np.inf
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        logistic_gradient(coef, X, y, out, work)
+        seconds = min(seconds, time.perf_counter() - start_time)
+    return {"seconds": seconds, "rows_per_second": X.shape[0] / seconds}
+
+
+def run_benchmarks(num_samples=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7),
+                   num_features=(5, 100, 1000), solvers=None, tol=1e-4,
+                   max_iter=1000, max_data_bytes=2 ** 30, seed=0):
+    """Benchmark the solvers and scikit-learn on a grid of dataset sizes.
+    All models fit an intercept without a penalty. scikit-learn stops when
+    the largest element of the gradient of the mean loss is below ``tol``,
+    while the solvers here use the gradient of the summed loss, so they get
+    the tolerance ``tol * num_samples``, which is about as strict.
+    Parameters
+    ----------
+    num_samples : sequence of int
+        The numbers of rows.
+    num_features : sequence of int
+        The numbers of features.
+    solvers : dict or None (default=None)
+        The parameters of the ``LogisticRegression`` of every solver, by
+        name, ``SOLVERS`` if None.
+    tol : float (default=1e-4)
+        The tolerance of scikit-learn, see above.
+    max_iter : int (default=1000)
+        The largest number of iterations, unless the solver parameters
+        set another.
+    max_data_bytes : int (default=2 ** 30)
+        Datasets whose float64 data matrix is larger than this are skipped.
+    seed : int (default=0)
+        Seed of the simulations and the models.
+    Returns
+    -------
+    results : dict
+        Results that can be written with ``write_baseline``, by
+        ``"n=<rows>,r=<features>/<solver>"``, with ``"sklearn"`` for the
+        reference and ``"logistic_gradient"`` for the gradient timing.
+    """
+    if solvers is None:
+        solvers = SOLVERS
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": platform.machine(),
+            "tol": tol,
+            "seed": seed,
+        },
+        "benchmarks": {},
+        "skipped": [],
+    }
+    benchmarks = results["benchmarks"]
+
+    for n in num_samples:
+        for r in num_features:
+            size = f"n={n},r={r}"
+            if n * r * 8 > max_data_bytes:
+                results["skipped"].append(size)
+                continue
+
+            X, y = make_data(n, r, seed)
+            benchmarks[f"{size}/logistic_gradient"] = time_gradient(X, y)
+            for name, params in solvers.items():
+                params = dict(
+                    dict(fit_intercept=True, tol=tol * n, max_iter=max_iter,
+                         random_state=seed),
+                    **params
+                )
+                benchmarks[f"{size}/{name}"] = benchmark_model(
+                    LogisticRegression(**params), X, y
+                )[0]
+            # C=inf is no penalty
+            reference = SklearnLogisticRegression(
+                C=np.inf, tol=tol, max_iter=max_iter
+            )
+            benchmarks[f"{size}/sklearn"] = benchmark_model(
+                reference, X, y
+            )[0]
+            del X, y
+    return results
+
+
+def write_baseline(results, filename):
+    """Write benchmark results to a JSON file."""
+    with open(filename, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, filename):
+    """Compare benchmark results with a JSON baseline.
+    Parameters
+    ----------
+    results : dict
+        Results from ``run_benchmarks``
+    filename : str
+        File written by ``write_baseline``
+    Returns
+    -------
+    ratios : dict
+        The baseline fit time divided by the new fit time (or the same for
+        the gradient time) for every benchmark present in both, larger is
+        faster.
+    """
+    with open(filename) as file:
+        baseline = json.load(file)["benchmarks"]
+
+    def seconds(result):
+        return result.get("fit_seconds", result.get("seconds"))
+
+    return {
+        name: seconds(baseline[name]) / seconds(result)
+        for name, result in results["benchmarks"].items()
+        if name in baseline
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--max-rows", type=float, default=1e7)
+    parser.add_argument("--max-features", type=int, default=1000)
+    parser.add_argument("--max-data-bytes", type=float, default=2 ** 30)
+    parser.add_argument(
+        "--baseline", help="JSON file to compare with, written if missing"
+    )
+    parser.add_argument(
+        "--precision", action="store_true",
+        help="compare float64 and float32 instead, on the largest size"
+    )
+    args = parser.parse_args()
+
+    if args.precision:
+        num_samples = int(args.max_rows)
+        for solver in ["lbfgs", "newton"]:
+            results = compare_precision(num_samples, args.max_features,
+                                        solver)
+            print(f"{solver}, {num_samples} x {args.max_features}, largest "
+                  f"difference in probability "
+                  f"{results.pop('max_proba_difference'):.2g}")
+            for name, result in results.items():
+                print(f"    {name}: data {result['data_mb']:8.1f} MB, "
+                      f"fit {result['fit_seconds']:7.2f} s "
+                      f"({result['n_iter']} iterations, peak "
+                      f"{result['fit_peak_mb']:8.1f} MB), "
+                      f"{result['predictions_per_second']:10.3g} "
+                      f"predictions/s "
+                      f"(peak {result['predict_peak_mb']:6.1f} MB)")
+        raise SystemExit
+
+    results = run_benchmarks(
+        num_samples=[n for n in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+                     if n <= args.max_rows],
+        num_features=[r for r in (5, 100, 1000) if r <= args.max_features],
+        max_data_bytes=args.max_data_bytes,
+    )
+    for name, result in results["benchmarks"].items():
+        if "fit_seconds" not in result:
+            print(f"{name:>32}: {result['seconds'] * 1e3:10.2f} ms "
+                  f"({result['rows_per_second']:.3g} rows/s)")
+            continue
+        print(f"{name:>32}: fit {result['fit_seconds']:8.2f} s, "
+              f"{result['n_iter']:4d} iterations, "
+              f"peak {result['fit_peak_mb']:8.1f} MB, "
+              f"{result['predictions_per_second']:9.3g} predictions/s"
+              f"{'' if result['converged'] else ', not converged'}")
+    for size in results["skipped"]:
+        print(f"{size:>32}: skipped, the data is too large")
+
+    if args.baseline:
+        if os.path.exists(args.baseline):
+            ratios = compare_to_baseline(results, args.baseline)
+            for name, ratio in ratios.items():
+                print(f"{name:>32}: {ratio:5.2f} x baseline")
+        else:
+            write_baseline(results, args.baseline)
@@ -121,14 +121,111 @@ Code
 """
 
 
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+
 import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize
+from scipy.special import logsumexp
 from sklearn.base import BaseEstimator, ClassifierMixin
 from sklearn.exceptions import NotFittedError
 from sklearn.utils import check_random_state, check_X_y
 from sklearn.linear_model import LinearRegression
 
 
-def sigmoid(z):
+def _matvec(A, v, out=None):
+    """Matrix-vector product that works for dense and ``scipy.sparse`` A.
+    Parameters
+    ----------
+    A : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+    v : np.ndarray(shape=(r,)) or np.ndarray(shape=(r, k))
+    out : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k)) or None
+        Array to store the product in. Sparse products do not support
+        ``out``, so for them the result is copied into it.
+    Returns
+    -------
+    product : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k))
+    """
+    if isinstance(A, (_AffineDesign, _AffineDesignTranspose)):
+        return A.matmul(v, out=out)
+    if out is None:
+        return A @ v
+    if sparse.issparse(A):
+        out[...] = A @ v
+        return out
+    return np.matmul(A, v, out=out)
+
+
+def _transposed_matvec(X, R, out=None):
+    """The product ``X.T @ R`` of the data and the residuals.
+    For float32 data, the product is computed in single precision for
+    blocks of ``_BLOCK_SIZE`` rows and the blocks are summed in ``out``, so
+    with a float64 ``out`` the rounding error does not grow with the
+    number of rows.
+    Parameters
+    ----------
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+    R : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k))
+    out : np.ndarray(shape=(r,)) or np.ndarray(shape=(r, k)) or None
+        Array to store the product in.
+    Returns
+    -------
+    product : np.ndarray(shape=(r,)) or np.ndarray(shape=(r, k))
+    """
+    blocked = (
+        _working_dtype(X) == np.float32 and X.shape[0] > _BLOCK_SIZE
+        and (isinstance(X, np.ndarray) or getattr(X, "format", "") == "csr")
+    )
+    if not blocked:
+        return _matvec(X.T, R, out=out)
+
+    block_dtype = np.result_type(X.dtype, R.dtype)
+    if out is None:
+        out = np.empty(X.shape[1:] + R.shape[1:], dtype=block_dtype)
+    block_product = np.empty(out.shape, dtype=block_dtype)
+    out[...] = 0
+    for start in range(0, X.shape[0], _BLOCK_SIZE):
+        stop = start + _BLOCK_SIZE
+        out += _matvec(X[start:stop].T, R[start:stop], out=block_product)
+    return out
+
+
+def _working_dtype(X):
+    """The floating point type of the computations with X, float32 for
+    float32 data, which is then never upcast, and float64 otherwise."""
+    if getattr(X, "dtype", None) == np.float32:
+        return np.float32
+    return np.float64
+
+
+def _logits(coef, X, out=None):
+    """The logits ``X @ coef.T`` as a floating point array that the caller
+    may transform in place. For a matrix of coefficients, with one row per
+    class, there is one column of logits per class. The coefficients are
+    cast to the working type of X, so that X is not upcast."""
+    coef = np.asarray(coef, dtype=_working_dtype(X))
+    z = _matvec(X, coef.T, out=out)
+    if out is None and z.dtype.kind != "f":
+        z = z.astype(float)
+    return z
+
+
+# The number of rows the blocked kernels process at a time, small enough
+# that the work arrays of a block stay in the cache
+_BLOCK_SIZE = 16384
+
+
+def _float_copy(z):
+    """Copy of z with a floating point type, to be transformed in place."""
+    return np.array(z, dtype=np.result_type(z, 1.0))
+
+
+def sigmoid(z, out=None):
     """Perform a logistic transform on the input.
     This function applies the sigmoidal function element-wise to all
     elements of `z`. The sigmoidal function is on the following form:
@@ -138,16 +235,70 @@ def sigmoid(z):
     ----------
     z : np.ndarray
         Logit to transform.
+    out : np.ndarray or None (default=None)
+        Array to store the result in, may be ``z`` itself. If given, the
+        only temporary arrays are the work arrays of one block.
     Returns
     -------
     sigmoidal_transformed_z : np.ndarray
         Transformed input.
+    Notes
+    -----
+    With ``e = exp(-|z|)``, which never overflows, the sigmoid is
+    ``1 / (1 + e)`` for positive and ``e / (1 + e)`` for negative logits,
+    so it keeps its relative precision in both tails. The numerator is
+    ``max(e, z >= 0)``, which avoids masked operations, and the logits are
+    processed in blocks of ``_BLOCK_SIZE`` rows with small work arrays.
+    """
+    if out is None:
+        return sigmoid(z, out=_float_copy(z))[()]
+
+    # A view with at least one axis, so that a scalar out is written to
+    z_rows, out_rows = np.atleast_1d(z), np.atleast_1d(out)
+    e = np.empty_like(out_rows[:_BLOCK_SIZE])
+    denominator = np.empty_like(e)
+    for start in range(0, len(out_rows), _BLOCK_SIZE):
+        z_block = z_rows[start:start + _BLOCK_SIZE]
+        out_block = out_rows[start:start + _BLOCK_SIZE]
+        e_block = e[:len(z_block)]
+        denominator_block = denominator[:len(z_block)]
+        np.abs(z_block, out=e_block)
+        np.negative(e_block, out=e_block)
+        np.exp(e_block, out=e_block)
+        np.add(e_block, 1, out=denominator_block)
+        np.maximum(e_block, z_block >= 0, out=out_block)
+        out_block /= denominator_block
+    return out
+
+
+def log_sigmoid(z, out=None):
+    r"""The logarithm of the sigmoidal function, element-wise.
+    It is computed as
+    .. math::
+        \log \sigma(z) = -\log(1 + \exp(-z)),
+    with ``np.logaddexp``, which is finite for all finite logits. Taking
+    the logarithm of the sigmoid instead gives ``-inf`` when the sigmoid
+    rounds to zero.
+    Parameters
+    ----------
+    z : np.ndarray
+        Logit to transform.
+    out : np.ndarray or None (default=None)
+        Array to store the result in, may be ``z`` itself.
+    Returns
+    -------
+    log_sigmoid_z : np.ndarray
+        The logarithm of the sigmoid of the input.
     """
-    sigmoidal_transformed_z = 1/(1 + np.exp(-z))
-    return sigmoidal_transformed_z
+    if out is None:
+        return log_sigmoid(z, out=_float_copy(z))[()]
 
+    log_sigmoid_z = np.negative(z, out=out)
+    np.logaddexp(0, log_sigmoid_z, out=log_sigmoid_z)
+    return np.negative(log_sigmoid_z, out=log_sigmoid_z)
 
-def predict_proba(coef, X):
+
+def predict_proba(coef, X, out=None):
     """Predict the class probabilities for each data point in :math:`X`.
     Estimate which class each data point in X corresponds to. This is done
     according to the following formula.
@@ -157,23 +308,55 @@ def predict_proba(coef, X):
     the sigmoidal function. Alternatively, in matrix-vector form:
     .. math::
         \hat{\mathbf{y}} = \sigma(X \mathbf{w}).
+    If ``coef`` is a matrix with one row per class, the probabilities of
+    the multinomial model, ``softmax(X @ coef.T)``, are returned instead.
     Parameters
     ----------
-    coef : np.ndarray(shape=(r,))
+    coef : np.ndarray(shape=(r,)) or np.ndarray(shape=(k, r))
         The weight vector, :math:`w`
-    X : np.ndarray(shape=(n, r))
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
         The data matrix (aka design or measurement matrix)
+    out : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k)) or None
+        Array to store the probabilities in.
     Returns
     -------
-    p : np.ndarray(shape(n,))
+    p : np.ndarray(shape(n,)) or np.ndarray(shape(n, k))
         The predicted class probabilities.
     """
+    z = _logits(coef, X, out=out)
+    if z.ndim == 2:
+        return softmax(z, out=z)
+    return sigmoid(z, out=z)
 
-    p = sigmoid(X @ coef)
-    return p
+
+def predict_log_proba(coef, X, out=None):
+    r"""Predict the logarithm of the class probabilities of :math:`X`.
+    This is :math:`\log \sigma(X \mathbf{w})`, computed with
+    ``log_sigmoid`` in the array that holds the logits, so it allocates at
+    most one array and is finite also when the probability rounds to zero.
+    If ``coef`` is a matrix with one row per class, ``log_softmax`` is
+    used instead.
+    Parameters
+    ----------
+    coef : np.ndarray(shape=(r,)) or np.ndarray(shape=(k, r))
+        The weight vector, :math:`w`
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+        The data matrix (aka design or measurement matrix)
+    out : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k)) or None
+        Array to store the log probabilities in.
+    Returns
+    -------
+    log_p : np.ndarray(shape(n,)) or np.ndarray(shape(n, k))
+        The predicted log probabilities of the positive class, or of every
+        class.
+    """
+    z = _logits(coef, X, out=out)
+    if z.ndim == 2:
+        return log_softmax(z, out=z)
+    return log_sigmoid(z, out=z)
 
 
-def logistic_gradient(coef, X, y):
+def logistic_gradient(coef, X, y, out=None, work=None):
     """Returns the gradient of a logistic regression model.
     The gradient is given by
     .. math::
@@ -189,22 +372,744 @@ def logistic_gradient(coef, X, y):
     ----------
     coef : np.ndarray(shape=(r,))
         The weight vector, :math:`w`
-    X : np.ndarray(shape=(n, r))
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
         The data matrix (aka design or measurement matrix)
     y : np.ndarray(shape=(n,))
         The true class labels for each data point.
+    out : np.ndarray(shape=(r,)) or None (default=None)
+        Array to store the gradient in.
+    work : np.ndarray(shape=(n,)) or None (default=None)
+        Work array for the residuals :math:`\hat{y}_i - y_i`, which it
+        contains when the function returns. Together with ``out``, this
+        lets repeated calls run without allocating any arrays.
     Returns
     -------
     gradient : np.ndarray(shape=(r,))
         The gradient of the cross entropy loss related to the linear
         logistic regression model.
     """
-    gradient = (X.T @ (predict_proba(coef, X)-y))
-    return gradient
+    residual = predict_proba(coef, X, out=work)
+    residual -= y
+    return _transposed_matvec(X, residual, out=out)
+
+
+def cross_entropy(z, y, work=None):
+    r"""Returns the cross entropy loss computed directly from the logits.
+    The loss is
+    .. math::
+        C = \sum_i \log(1 + \exp(z_i)) - y_i z_i,
+    which is equal to the cost function in the module docstring, but does
+    not overflow or take the logarithm of zero for large logits.
+    Parameters
+    ----------
+    z : np.ndarray(shape=(n,))
+        The logits, :math:`z_i = \mathbf{x}_i^T \mathbf{w}`.
+    y : np.ndarray(shape=(n,))
+        The true class labels for each data point.
+    work : np.ndarray(shape=(n,)) or None (default=None)
+        Work array for the terms of the sum, may be ``z`` itself (which is
+        then overwritten).
+    Returns
+    -------
+    loss : float
+        The cross entropy loss.
+    """
+    # Both sums are accumulated in float64, also for float32 logits
+    z_dot_y = np.einsum("i,i->", z, y, dtype=np.float64)
+    terms = np.logaddexp(0, z, out=work)
+    return terms.sum(dtype=np.float64) - z_dot_y
+
+
+def logistic_loss(coef, X, y, work=None):
+    r"""Returns the cross entropy loss of a logistic regression model.
+    The logits :math:`z_i = \mathbf{x}_i^T \mathbf{w}` are passed to
+    ``cross_entropy``.
+    Parameters
+    ----------
+    coef : np.ndarray(shape=(r,))
+        The weight vector, :math:`w`
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+        The data matrix (aka design or measurement matrix)
+    y : np.ndarray(shape=(n,))
+        The true class labels for each data point.
+    work : np.ndarray(shape=(n,)) or None (default=None)
+        Work array for the logits. If given, no arrays are allocated.
+    Returns
+    -------
+    loss : float
+        The cross entropy loss.
+    """
+    z = _logits(coef, X, out=work)
+    return cross_entropy(z, y, work=z)
+
+
+def logistic_hessian(coef, X):
+    r"""Returns the Hessian matrix of the cross entropy loss.
+    The Hessian is given by
+    .. math::
+        \nabla^2_w L(\mathbf{w}; X, \mathbf{y}) = X^T D X,
+    where :math:`D` is the diagonal matrix with the elements
+    :math:`\hat{y}_i (1 - \hat{y}_i)`.
+    Parameters
+    ----------
+    coef : np.ndarray(shape=(r,))
+        The weight vector, :math:`w`
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+        The data matrix (aka design or measurement matrix)
+    Returns
+    -------
+    hessian : np.ndarray(shape=(r, r))
+        The Hessian matrix.
+    """
+    p = predict_proba(coef, X)
+    p *= 1 - p
+    if isinstance(X, _AffineDesign):
+        return X.weighted_gram(p)
+    return _weighted_gram(X, p)
+
+
+def _weighted_gram(X, d):
+    """The matrix ``X.T @ diag(d) @ X`` for dense and sparse X, as float64
+    so that the Hessians of blocks of rows are accumulated in float64.
+    For dense X, the products of blocks of ``_BLOCK_SIZE`` rows are summed,
+    so only one block of ``X * d`` is in memory at a time."""
+    if sparse.issparse(X):
+        gram = (X.T @ (sparse.diags(d) @ X)).toarray()
+        return gram.astype(np.float64, copy=False)
+
+    gram = np.zeros((X.shape[1], X.shape[1]))
+    for start in range(0, X.shape[0], _BLOCK_SIZE):
+        X_block = X[start:start + _BLOCK_SIZE]
+        d_block = d[start:start + _BLOCK_SIZE, np.newaxis]
+        gram += X_block.T @ (X_block * d_block)
+    return gram
+
+
+def softmax(Z, out=None):
+    r"""Row-wise softmax of a matrix of logits.
+    .. math::
+        \text{softmax}(Z)_{ik} = \frac{\exp(Z_{ik})}{\sum_l \exp(Z_{il})}
+    The largest logit of every row is subtracted before the exponential is
+    taken, which does not change the result but prevents overflow.
+    Parameters
+    ----------
+    Z : np.ndarray(shape=(n, k))
+        The logits, one column per class.
+    out : np.ndarray(shape=(n, k)) or None (default=None)
+        Array to store the result in, may be ``Z`` itself.
+    Returns
+    -------
+    P : np.ndarray(shape=(n, k))
+        The class probabilities, every row sums to one.
+    """
+    if out is None:
+        out = np.empty(Z.shape, dtype=np.result_type(Z, 1.0))
+    P = np.subtract(Z, Z.max(axis=1, keepdims=True), out=out)
+    np.exp(P, out=P)
+    P /= P.sum(axis=1, keepdims=True)
+    return P
+
+
+def log_softmax(Z, out=None):
+    """The logarithm of the row-wise softmax of a matrix of logits.
+    Computed as ``Z - logsumexp(Z)`` row by row, which is finite for all
+    finite logits.
+    Parameters
+    ----------
+    Z : np.ndarray(shape=(n, k))
+        The logits, one column per class.
+    out : np.ndarray(shape=(n, k)) or None (default=None)
+        Array to store the result in, may be ``Z`` itself.
+    Returns
+    -------
+    log_P : np.ndarray(shape=(n, k))
+        The logarithm of the class probabilities.
+    """
+    if out is None:
+        out = np.empty(Z.shape, dtype=np.result_type(Z, 1.0))
+    return np.subtract(Z, logsumexp(Z, axis=1, keepdims=True), out=out)
+
+
+def softmax_gradient(coef, X, Y, out=None, work=None):
+    r"""Returns the gradient of a multinomial logistic regression model.
+    The gradient with respect to the coefficients of class :math:`k` is
+    .. math::
+        \nabla_{w_k} L = \sum_i \mathbf{x}_i (\hat{Y}_{ik} - Y_{ik}),
+    where :math:`\hat{Y} = \text{softmax}(X W^T)`, or in matrix form
+    :math:`(\hat{Y} - Y)^T X`.
+    Parameters
+    ----------
+    coef : np.ndarray(shape=(k, r))
+        The coefficient matrix, one row per class.
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+        The data matrix (aka design or measurement matrix)
+    Y : np.ndarray(shape=(n, k))
+        The one-hot encoded class labels.
+    out : np.ndarray(shape=(k, r)) or None (default=None)
+        Array to store the gradient in.
+    work : np.ndarray(shape=(n, k)) or None (default=None)
+        Work array for the residuals :math:`\hat{Y} - Y`.
+    Returns
+    -------
+    gradient : np.ndarray(shape=(k, r))
+        The gradient of the cross entropy loss.
+    """
+    residual = predict_proba(coef, X, out=work)
+    residual -= Y
+    if out is None:
+        return _transposed_matvec(X, residual).T
+    _transposed_matvec(X, residual, out=out.T)
+    return out
+
+
+def softmax_loss(coef, X, Y, work=None):
+    r"""Returns the cross entropy loss of a multinomial logistic regression
+    model,
+    .. math::
+        C = \sum_i \log \sum_k \exp(Z_{ik}) - \sum_k Y_{ik} Z_{ik},
+    with :math:`Z = X W^T` the logits.
+    Parameters
+    ----------
+    coef : np.ndarray(shape=(k, r))
+        The coefficient matrix, one row per class.
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+        The data matrix (aka design or measurement matrix)
+    Y : np.ndarray(shape=(n, k))
+        The one-hot encoded class labels.
+    work : np.ndarray(shape=(n, k)) or None (default=None)
+        Work array for the logits.
+    Returns
+    -------
+    loss : float
+        The cross entropy loss.
+    """
+    Z = _logits(coef, X, out=work)
+    return (
+        logsumexp(Z, axis=1).sum(dtype=np.float64)
+        - np.einsum("ik,ik->", Z, Y, dtype=np.float64)
+    )
+
+
+def ovr_predict_proba(coef, X, out=None):
+    """Class probabilities of a one-vs-rest model.
+    Every class has its own binary model, the probabilities of these are
+    normalised so that every row sums to one.
+    Parameters
+    ----------
+    coef : np.ndarray(shape=(k, r))
+        The coefficients of the binary models, one row per class.
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+        The data matrix (aka design or measurement matrix)
+    out : np.ndarray(shape=(n, k)) or None (default=None)
+        Array to store the probabilities in.
+    Returns
+    -------
+    p : np.ndarray(shape=(n, k))
+        The class probabilities.
+    """
+    z = _logits(coef, X, out=out)
+    p = sigmoid(z, out=z)
+    p /= p.sum(axis=1, keepdims=True)
+    return p
+
+
+def _gradient(coef, X, y, out=None, work=None):
+    """``logistic_gradient``, or ``softmax_gradient`` if ``coef`` is a
+    matrix of coefficients."""
+    if coef.ndim == 2:
+        return softmax_gradient(coef, X, y, out, work)
+    return logistic_gradient(coef, X, y, out, work)
+
+
+def iter_chunks(X, y, chunk_size):
+    """Split a dataset into consecutive blocks of rows without copying it.
+    The blocks are slices, so for a ``numpy.memmap`` only the block that is
+    being used has to be read into memory. Blocks of a sparse CSR matrix
+    are small copies that only hold the non-zeros of the block.
+    Parameters
+    ----------
+    X : np.ndarray(shape=(n, r))
+        The data matrix, may be a ``numpy.memmap``.
+    y : np.ndarray(shape=(n,))
+        The target vector, may be a ``numpy.memmap``.
+    chunk_size : int
+        The number of rows per block.
+    Yields
+    ------
+    X_chunk : np.ndarray(shape=(chunk_size, r))
+    y_chunk : np.ndarray(shape=(chunk_size,))
+    """
+    for start in range(0, X.shape[0], chunk_size):
+        yield X[start:start + chunk_size], y[start:start + chunk_size]
+
+
+class _RowSubset:
+    """A subset of the rows of a data matrix or target array, which is not
+    copied.
+    Indexing it gathers only the selected rows, so the blocks of
+    ``iter_chunks`` and the mini-batches are small copies.
+    Parameters
+    ----------
+    data : np.ndarray or scipy.sparse matrix or _AffineDesign
+    rows : np.ndarray(shape=(m,))
+        The sorted indices of the rows in the subset.
+    """
+
+    def __init__(self, data, rows):
+        self.data = data
+        self.rows = rows
+        self.shape = (len(rows),) + data.shape[1:]
+        self.dtype = data.dtype
+
+    def __getitem__(self, rows):
+        return self.data[self.rows[rows]]
+
+
+class _AffineDesign:
+    r"""The data matrix :math:`(X - \mathbf{1} \boldsymbol{\mu}^T)
+    \text{diag}(\boldsymbol{\sigma})^{-1}`, with an extra column of ones
+    for the intercept, without forming it.
+    Products with the matrix and its transpose are computed from products
+    with X and rank-one corrections for the mean and the column of ones, so
+    X is never copied and sparse matrices stay sparse. The solvers use this
+    object in place of X when ``fit_intercept`` or ``standardize`` is set,
+    and the intercept is the last coefficient.
+    Parameters
+    ----------
+    X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+        The data matrix
+    mean : np.ndarray(shape=(r,)) or None (default=None)
+        The column means :math:`\boldsymbol{\mu}` to subtract, none if None.
+    scale : np.ndarray(shape=(r,)) or None (default=None)
+        The column scales :math:`\boldsymbol{\sigma}` to divide by, none if
+        None.
+    intercept : bool (default=False)
+        Whether the matrix has a column of ones at the end.
+    """
+
+    def __init__(self, X, mean=None, scale=None, intercept=False):
+        self.X = X
+        self.mean = mean
+        self.scale = scale
+        self.intercept = intercept
+        self.shape = (X.shape[0], X.shape[1] + intercept)
+        self.dtype = X.dtype
+
+    @property
+    def T(self):
+        return _AffineDesignTranspose(self)
+
+    def __getitem__(self, rows):
+        return _AffineDesign(self.X[rows], self.mean, self.scale,
+                             self.intercept)
+
+    def __matmul__(self, v):
+        return self.matmul(v)
+
+    def _per_feature(self, values, ndim):
+        """Reshape a vector over the features to broadcast against an
+        array with ``ndim`` dimensions and the features along axis 0."""
+        return values if ndim == 1 else values[:, np.newaxis]
+
+    def matmul(self, v, out=None):
+        """The product with a vector, or a matrix with one column per class.
+        Parameters
+        ----------
+        v : np.ndarray(shape=(r + intercept,))
+            Shape (r + intercept, k) for a matrix.
+        out : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k)) or None
+        Returns
+        -------
+        product : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k))
+        """
+        w = v[:self.X.shape[1]]
+        if self.scale is not None:
+            w = w / self._per_feature(self.scale, w.ndim)
+        w = np.asarray(w, dtype=_working_dtype(self.X))
+        product = _matvec(self.X, w, out=out)
+        if out is None and product.dtype.kind != "f":
+            product = product.astype(float)
+
+        shift = 0
+        if self.mean is not None:
+            shift = -(self.mean @ w)
+        if self.intercept:
+            shift = shift + v[-1]
+        product += shift
+        return product
+
+    def weighted_gram(self, d):
+        """The matrix ``A.T @ diag(d) @ A`` of this matrix ``A``.
+        Computed from the same matrix for X, ``X.T @ d`` and ``sum(d)``.
+        """
+        gram = _weighted_gram(self.X, d)
+        column = _transposed_matvec(self.X, d,
+                                    out=np.empty(self.X.shape[1]))
+        total = d.sum()
+        if self.mean is not None:
+            gram -= np.outer(column, self.mean)
+            gram -= np.outer(self.mean, column)
+            gram += total * np.outer(self.mean, self.mean)
+            column = column - total * self.mean
+        if self.scale is not None:
+            gram /= np.outer(self.scale, self.scale)
+            column = column / self.scale
+        if not self.intercept:
+            return gram
+        return np.block([
+            [gram, column[:, np.newaxis]],
+            [column[np.newaxis, :], np.array([[total]])],
+        ])
+
+
+class _AffineDesignTranspose:
+    """The transpose of an ``_AffineDesign``."""
+
+    def __init__(self, design):
+        self.design = design
+        self.shape = design.shape[::-1]
+
+    def __matmul__(self, R):
+        return self.matmul(R)
+
+    def matmul(self, R, out=None):
+        """The product with a vector, or a matrix with one column per class.
+        Parameters
+        ----------
+        R : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k))
+        out : np.ndarray(shape=(r + intercept,)) or None
+            Shape (r + intercept, k) if R is a matrix. If None, a new array
+            of the type of the product of X and R.
+        Returns
+        -------
+        product : np.ndarray(shape=(r + intercept,))
+            Shape (r + intercept, k) if R is a matrix.
+        """
+        design = self.design
+        num_features = design.X.shape[1]
+        if out is None:
+            out = np.empty((design.shape[1],) + R.shape[1:],
+                           dtype=np.result_type(design.dtype, R.dtype))
+        product = _transposed_matvec(design.X, R, out=out[:num_features])
+
+        if design.mean is not None or design.intercept:
+            total = R.sum(axis=0)
+        if design.mean is not None:
+            product -= np.multiply.outer(design.mean, total)
+        if design.scale is not None:
+            product /= design._per_feature(design.scale, R.ndim)
+        if design.intercept:
+            out[num_features] = total
+        return out
+
+
+def _column_stats(chunks):
+    """Column means and standard deviations, computed block by block.
+    The means are computed in a first pass and the squared deviations from
+    them in a second, so only blocks of rows are ever in memory.
+    Parameters
+    ----------
+    chunks : callable
+        Function that returns an iterable of (X, y) pairs.
+    Returns
+    -------
+    mean : np.ndarray(shape=(r,))
+    scale : np.ndarray(shape=(r,))
+        The standard deviations, with 1 for constant columns.
+    """
+    total, count = 0, 0
+    for X, _ in chunks():
+        total = total + np.asarray(X.sum(axis=0, dtype=np.float64)).ravel()
+        count += X.shape[0]
+    mean = total / count
+
+    squares = 0
+    for X, _ in chunks():
+        if sparse.issparse(X):
+            column_sums = np.asarray(X.sum(axis=0, dtype=np.float64)).ravel()
+            squares = squares + (
+                np.asarray(X.multiply(X).sum(axis=0, dtype=np.float64))
+                .ravel()
+                - 2 * mean * column_sums + X.shape[0] * mean ** 2
+            )
+        else:
+            squares = squares + ((X - mean) ** 2).sum(axis=0)
+    scale = np.sqrt(squares / count)
+    scale[scale == 0] = 1
+    return mean, scale
+
+
+# The parameters of an _AffineDesign that only appends a column of ones
+_INTERCEPT_COLUMN = {"mean": None, "scale": None, "intercept": True}
+
+
+def _to_design(X, parameters):
+    """Wrap X in an ``_AffineDesign`` with the given parameters, or return
+    X itself if they are None."""
+    if parameters is None:
+        return X
+    return _AffineDesign(X, **parameters)
+
+
+def _to_original_space(coef, parameters):
+    """The coefficients and intercepts for the original features.
+    Parameters
+    ----------
+    coef : np.ndarray(shape=(r',)) or np.ndarray(shape=(k, r'))
+        The coefficients for the ``_AffineDesign`` with the given
+        parameters.
+    parameters : dict or None
+        The parameters of the ``_AffineDesign``, None if X was used as is.
+    Returns
+    -------
+    coef : np.ndarray(shape=(r,)) or np.ndarray(shape=(k, r))
+    intercept : float or np.ndarray(shape=(k,))
+    """
+    if parameters is None:
+        return coef, np.zeros(coef.shape[:-1])[()]
+    if parameters["intercept"]:
+        coef, intercept = coef[..., :-1], coef[..., -1]
+    else:
+        intercept = np.zeros(coef.shape[:-1])
+    if parameters["scale"] is not None:
+        coef = coef / parameters["scale"]
+    if parameters["mean"] is not None:
+        intercept = intercept - coef @ parameters["mean"]
+    return coef, intercept[()]
+
+
+def _to_design_space(coef, intercept, parameters):
+    """The inverse of ``_to_original_space``."""
+    if parameters is None:
+        return coef
+    if parameters["mean"] is not None:
+        intercept = intercept + coef @ parameters["mean"]
+    if parameters["scale"] is not None:
+        coef = coef * parameters["scale"]
+    if not parameters["intercept"]:
+        return coef
+    return np.concatenate([coef, np.asarray(intercept)[..., np.newaxis]],
+                          axis=-1)
+
+
+def _num_workers(n_jobs):
+    """The number of threads or processes to use for a given ``n_jobs``
+    parameter."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(os.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def _to_shared_memory(array):
+    """Copy an array to a new block of shared memory.
+    Returns
+    -------
+    memory : multiprocessing.shared_memory.SharedMemory
+        The block, which the caller must close and unlink.
+    spec : tuple
+        The name of the block and the shape and dtype of the array, to pass
+        to ``_from_shared_memory`` in other processes.
+    """
+    memory = shared_memory.SharedMemory(
+        create=True, size=max(array.nbytes, 1)
+    )
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)
+    shared[...] = array
+    return memory, (memory.name, array.shape, array.dtype.str)
+
+
+def _from_shared_memory(name, shape, dtype):
+    """Map an array that ``_to_shared_memory`` put in shared memory.
+    Returns
+    -------
+    memory : multiprocessing.shared_memory.SharedMemory
+        The block, which must be closed when the array is no longer used.
+    array : np.ndarray
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def _call_with_shared_arrays(function, specs, task):
+    """Call ``function(*arrays, *task)`` in a worker process.
+    Parameters
+    ----------
+    function : callable
+    specs : list of tuple
+        For every array, either ``(spec, None)`` with the ``spec`` from
+        ``_to_shared_memory``, or ``(None, array)`` for a pickled array.
+    task : tuple
+        The remaining arguments.
+    """
+    memories, arrays = [], []
+    for spec, array in specs:
+        if spec is not None:
+            memory, array = _from_shared_memory(*spec)
+            memories.append(memory)
+        arrays.append(array)
+    try:
+        return function(*arrays, *task)
+    finally:
+        # The arrays must be released before the memory can be closed
+        del arrays, array
+        for memory in memories:
+            memory.close()
+
+
+def _map_with_shared_arrays(function, arrays, tasks, num_processes):
+    """Call ``function(*arrays, *task)`` for every task in a process pool.
+    Dense numeric arrays are copied once to shared memory, which all
+    workers map, instead of being pickled to every worker. Sparse matrices
+    and arrays of objects are pickled.
+    Parameters
+    ----------
+    function : callable
+        A module level function, so that it can be pickled.
+    arrays : list of np.ndarray or scipy.sparse matrix
+        The arrays that are shared by all tasks.
+    tasks : iterable of tuple
+        The remaining arguments of every call.
+    num_processes : int
+        The number of worker processes.
+    Returns
+    -------
+    results : list
+        The return values, in the order of the tasks.
+    """
+    memories, specs = [], []
+    try:
+        for array in arrays:
+            if sparse.issparse(array) or array.dtype.hasobject:
+                specs.append((None, array))
+                continue
+            memory, spec = _to_shared_memory(array)
+            memories.append(memory)
+            specs.append((spec, None))
+
+        with ProcessPoolExecutor(num_processes) as pool:
+            return list(pool.map(
+                _call_with_shared_arrays, repeat(function), repeat(specs),
+                tasks,
+            ))
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def _fit_binary_problem(X, y_index, params, label):
+    """Fit the binary model of class ``label`` against the rest.
+    Returns
+    -------
+    model : LogisticRegression
+    """
+    y = (y_index == label).astype(float)
+    return LogisticRegression(**params).fit(X, y)
+
+
+def _fit_path_segment(X, y, params, alphas):
+    """Fit a model for every penalty strength in alphas, each warm-started
+    from the previous one.
+    Returns
+    -------
+    coefs : np.ndarray(shape=(len(alphas), r))
+        With ``fit_intercept``, the intercept is appended as an extra
+        column.
+    """
+    model = LogisticRegression(**params)
+    parameters = _INTERCEPT_COLUMN if params["fit_intercept"] else None
+    coefs = []
+    for alpha in alphas:
+        model.set_params(alpha=alpha).fit(X, y)
+        coefs.append(
+            _to_design_space(model.coef_, model.intercept_, parameters)
+        )
+    return np.array(coefs)
+
+
+class _Workspace:
+    """A work array that is reused between calls, and grows when a larger
+    block of data comes along.
+    """
+
+    def __init__(self):
+        self._buffer = np.empty(0)
+
+    def get(self, *shape, dtype=np.float64):
+        size = int(np.prod(shape))
+        if self._buffer.shape[0] < size or self._buffer.dtype != dtype:
+            self._buffer = np.empty(size, dtype=dtype)
+        return self._buffer[:size].reshape(shape)
+
+
+class _ConvergenceMonitor:
+    """Records the progress of a solver and decides when to stop early.
+    The solvers count their iterations in ``n_iter`` and call ``update``
+    once per iteration with the coefficients and the gradient norm (or,
+    for the L1 penalty, the norm of the gradient mapping), and stop when
+    it returns True.
+    Parameters
+    ----------
+    model : LogisticRegression
+        The model that is fitted, whose ``callback``, ``tol`` and
+        ``n_iter_no_change`` are used.
+    validation : tuple or None (default=None)
+        The held out (X, y) pair for early stopping, None for no early
+        stopping.
+    """
+
+    def __init__(self, model, validation=None):
+        self.model = model
+        self.validation = validation
+        self.n_iter = 0
+        self.gradient_norms = []
+        self.validation_losses = []
+        self.best_coef = None
+        self._no_improvement = 0
+
+    def update(self, coef, gradient_norm):
+        """Record an iteration.
+        Returns
+        -------
+        stop : bool
+            True if the validation loss has not improved by more than
+            ``tol`` for ``n_iter_no_change`` iterations, or if the callback
+            returned True.
+        """
+        self.gradient_norms.append(float(gradient_norm))
+        stop = False
+        if self.validation is not None:
+            stop |= self._validate(coef)
+        callback = self.model.callback
+        if callback is not None:
+            stop = bool(callback(self.n_iter, coef, gradient_norm)) or stop
+        return stop
+
+    def _validate(self, coef):
+        """Record the mean validation loss, returns True when it has
+        stopped improving."""
+        X, y = self.validation
+        loss = self.model._data_loss(X, y, coef) / X.shape[0]
+        best_loss = min(self.validation_losses, default=np.inf)
+        self.validation_losses.append(loss)
+        if loss < best_loss:
+            self.best_coef = coef.copy()
+        if loss < best_loss - self.model.tol:
+            self._no_improvement = 0
+        else:
+            self._no_improvement += 1
+        return self._no_improvement >= self.model.n_iter_no_change
+
+    def result(self, coef):
+        """The coefficients to return, those with the smallest validation
+        loss when early stopping."""
+        return coef if self.best_coef is None else self.best_coef
 
 
 class LogisticRegression(BaseEstimator, ClassifierMixin):
-    """A logistic regression classifier that follows the scikit-learn API.
+    r"""A logistic regression classifier that follows the scikit-learn API.
     Note that the ``__init__`` method of scikit-learn estimators should not do
     any logic or input validation. This is all taken care of in the ``fit``
     method.
@@ -216,26 +1121,194 @@ class LogisticRegression(BaseEstimator, ClassifierMixin):
         The gradient descent iterations will converge when the gradient
         norm is less than this.
     learning_rate : float (default=0.01)
-        The step-size for the gradient descent updates.
+        The step-size for the gradient descent updates. The updates
+        use the gradient of the loss summed over the batch, so the
+        step grows with ``batch_size`` (or the number of rows for
+        full-batch updates), and a larger batch needs a smaller
+        learning rate. Adam steps do not depend on this scale.
     random_state : np.random.random_state or int or None (default=None)
         A numpy random state object or a seed for a numpy random state object.
+    solver : str (default="gd")
+        The update rule, one of ``"gd"`` (plain gradient descent),
+        ``"momentum"``, ``"nesterov"`` or ``"adam"``, or one of the second
+        order solvers ``"newton"`` (Newton-Raphson, also known as
+        iteratively reweighted least squares), which is fast when there are
+        few features, and ``"lbfgs"`` (limited memory BFGS), which suits
+        data with many features. The second order solvers need no learning
+        rate and ignore the mini-batch and momentum parameters.
+    batch_size : int or None (default=None)
+        Number of data points per update. If None, every update uses the
+        whole dataset. Otherwise, the data is shuffled with ``random_state``
+        every epoch and split into mini-batches, and ``max_iter`` is the
+        maximum number of epochs.
+    momentum : float (default=0.9)
+        Momentum of the ``"momentum"`` and ``"nesterov"`` update rules.
+    beta_1 : float (default=0.9)
+        Decay rate of the first moment estimate of ``"adam"``.
+    beta_2 : float (default=0.999)
+        Decay rate of the second moment estimate of ``"adam"``.
+    epsilon : float (default=1e-8)
+        Numerical stability constant of ``"adam"``.
+    n_jobs : int or None (default=None)
+        Number of threads used for prediction, and of processes used to fit
+        one-vs-rest models. None means one and negative values count back
+        from the number of CPUs, so -1 uses all of them.
+    multi_class : str (default="auto")
+        The model for targets with more than two classes. ``"multinomial"``
+        fits one softmax model with a coefficient vector per class,
+        ``"ovr"`` (one-vs-rest) fits one binary model per class. With
+        ``"auto"``, targets that are all numbers between 0 and 1 give a
+        binary model and other targets a multinomial model.
+    penalty : str or None (default=None)
+        ``"l2"`` adds :math:`\frac{\alpha}{2} ||\mathbf{w}||_2^2` to the
+        loss, ``"l1"`` adds :math:`\alpha ||\mathbf{w}||_1`. The L1 penalty
+        is not differentiable, so the first order solvers follow every update
+        with a proximal step (soft thresholding with the threshold
+        ``alpha`` times the step of the update, per coefficient for
+        ``"adam"``), which gives the exact L1 solution for ``"gd"`` and
+        ``"adam"`` and an approximate, sparse one for the momentum rules.
+        ``"lbfgs"`` solves the equivalent smooth problem with the
+        coefficients split into positive and negative parts. ``"newton"``
+        does not support the L1 penalty.
+    alpha : float (default=1.0)
+        The strength of the penalty.
+    warm_start : bool (default=False)
+        If True, ``fit`` starts from the ``coef_`` of the previous fit (if
+        it has the right shape) instead of from random coefficients. Not
+        used for one-vs-rest models.
+    fit_intercept : bool (default=False)
+        Whether to fit an intercept. The solvers use the data matrix with a
+        column of ones appended, which is never formed (see
+        ``_AffineDesign``). The intercept is not penalised.
+    standardize : bool (default=False)
+        Whether the solvers work with standardized features, which makes
+        the problem much better conditioned when the features have very
+        different scales. The columns are divided by their standard
+        deviations (and centered if ``fit_intercept`` is set) implicitly,
+        so X is not copied and sparse data stays sparse. ``coef_`` and
+        ``intercept_`` are always for the original features, but a penalty
+        applies to the coefficients of the standardized features.
+    callback : callable or None (default=None)
+        Called by the solvers after every iteration as
+        ``callback(iteration, coef, gradient_norm)``, where ``iteration``
+        is the number of iterations done so far and ``coef`` the
+        coefficients the solver works with (see ``loss``). The fit stops
+        if it returns True. Must be picklable for one-vs-rest models that
+        are fitted in processes.
+    early_stopping : bool (default=False)
+        Whether to hold out ``validation_fraction`` of the rows and stop
+        when the mean validation loss has not improved by more than
+        ``tol`` for ``n_iter_no_change`` iterations. The coefficients with
+        the smallest validation loss are kept. ``fit_stream`` takes the
+        validation data as an argument instead.
+    validation_fraction : float (default=0.1)
+        The share of the rows held out for early stopping.
+    n_iter_no_change : int (default=5)
+        The number of iterations without improvement before early
+        stopping.
+    dtype : np.float64 or np.float32 (default=np.float64)
+        The floating point type X is converted to and the solvers and
+        predictions compute in. With float32, X is stored and multiplied
+        in single precision (float32 data is not copied), which halves the
+        memory use and bandwidth, while ``coef_``, the sums over rows
+        (losses, the gradients of blocks of ``_BLOCK_SIZE`` rows and the
+        Hessians of blocks) and the L-BFGS iterations stay in float64. The
+        newton and lbfgs solvers also stop when their steps fall below the
+        precision of ``dtype`` (see ``_fit_newton`` and ``_fit_lbfgs``).
     Attributes
     ----------
-    coef_ : np.ndarray(shape=(r,))
-        The logistic regression weights (initialised in ``self.fit``)
+    coef_ : np.ndarray(shape=(r,)) or np.ndarray(shape=(k, r))
+        The logistic regression weights (initialised in ``self.fit``), one
+        row per class for multiclass models.
+    intercept_ : float or np.ndarray(shape=(k,))
+        The intercept, one per class for multiclass models, zero unless
+        ``fit_intercept`` is set.
+    n_iter_ : int or np.ndarray(shape=(k,))
+        The number of iterations (epochs for mini-batch updates) the solver
+        ran, one per class for one-vs-rest models. ``partial_fit`` adds one
+        per call.
+    gradient_norms_ : np.ndarray or list
+        The gradient norm (the convergence measure compared with ``tol``)
+        at every iteration the solver checked, a list with one array per
+        class for one-vs-rest models.
+    validation_losses_ : np.ndarray or list or None
+        The mean validation loss at every iteration with
+        ``early_stopping``, None otherwise.
+    fit_time_ : float
+        The wall time of the last ``fit`` or ``fit_stream``, in seconds.
+    classes_ : np.ndarray(shape=(k,))
+        The class labels of a multiclass model.
+    multi_class_ : str
+        The kind of model that was fitted, ``"binary"``, ``"multinomial"``
+        or ``"ovr"``.
     max_iter : int (default=1000)
         Maximum number of gradient descent iterations to run.
     tol : float (default=1e-5)
         The gradient descent iterations will converge when the gradient
         norm is less than this.
     learning_rate : float (default=0.01)
-        The step-size for the gradient descent updates.
+        The step-size for the gradient descent updates. The updates
+        use the gradient of the loss summed over the batch, so the
+        step grows with ``batch_size`` (or the number of rows for
+        full-batch updates), and a larger batch needs a smaller
+        learning rate. Adam steps do not depend on this scale.
     random_state : np.random.random_state or int or None (default=None)
         A numpy random state object or a seed for a numpy random state object.
+    solver : str (default="gd")
+        The update rule or second order solver.
+    batch_size : int or None (default=None)
+        Number of data points per update, None for full-batch updates.
+    momentum : float (default=0.9)
+        Momentum of the ``"momentum"`` and ``"nesterov"`` update rules.
+    beta_1 : float (default=0.9)
+        Decay rate of the first moment estimate of ``"adam"``.
+    beta_2 : float (default=0.999)
+        Decay rate of the second moment estimate of ``"adam"``.
+    epsilon : float (default=1e-8)
+        Numerical stability constant of ``"adam"``.
+    n_jobs : int or None (default=None)
+        Number of threads used for prediction and of processes used to fit
+        one-vs-rest models.
+    multi_class : str (default="auto")
+        ``"auto"``, ``"multinomial"`` or ``"ovr"``.
+    penalty : str or None (default=None)
+        ``"l2"``, ``"l1"`` or None.
+    alpha : float (default=1.0)
+        The strength of the penalty.
+    warm_start : bool (default=False)
+        Whether ``fit`` starts from the previous ``coef_``.
+    fit_intercept : bool (default=False)
+        Whether to fit an intercept.
+    standardize : bool (default=False)
+        Whether the solvers work with standardized features.
+    callback : callable or None (default=None)
+        Called after every iteration, stops the fit if it returns True.
+    early_stopping : bool (default=False)
+        Whether to stop when the validation loss stops improving.
+    validation_fraction : float (default=0.1)
+        The share of the rows held out for early stopping.
+    n_iter_no_change : int (default=5)
+        The number of iterations without improvement before early
+        stopping.
+    dtype : np.float64 or np.float32 (default=np.float64)
+        The floating point type the data is converted to and computed in.
     """
 
+    _solvers = ("gd", "momentum", "nesterov", "adam", "newton", "lbfgs")
+    _multi_class_modes = ("auto", "multinomial", "ovr")
+    _penalties = (None, "l2", "l1")
+    _dtypes = (np.float64, np.float32)
+    # Sparse data matrices are kept sparse, so that the cost of the solvers
+    # scales with the number of non-zeros.
+    _sparse_formats = ("csr", "csc")
+
     def __init__(
-        self, max_iter=1000, tol=1e-5, learning_rate=0.01, random_state=None
+        self, max_iter=1000, tol=1e-5, learning_rate=0.01, random_state=None,
+        solver="gd", batch_size=None, momentum=0.9, beta_1=0.9, beta_2=0.999,
+        epsilon=1e-8, n_jobs=None, multi_class="auto", penalty=None,
+        alpha=1.0, warm_start=False, fit_intercept=False, standardize=False,
+        callback=None, early_stopping=False, validation_fraction=0.1,
+        n_iter_no_change=5, dtype=np.float64,
     ):
         """Initialise a logistic regression instance.
         The ``__init__`` method of scikit-learn estimators should not do any
@@ -249,14 +1322,79 @@ class LogisticRegression(BaseEstimator, ClassifierMixin):
             The gradient descent iterations will converge when the gradient
             norm is less than this.
         learning_rate : float (default=0.01)
-            The step-size for the gradient descent updates.
+            The step-size for the gradient descent updates. The updates
+            use the gradient of the loss summed over the batch, so the
+            step grows with ``batch_size`` (or the number of rows for
+            full-batch updates), and a larger batch needs a smaller
+            learning rate. Adam steps do not depend on this scale.
         random_state : np.random.random_state or int or None (default=None)
             A numpy random state object or a seed for a numpy random state object.
+        solver : str (default="gd")
+            The update rule, one of ``"gd"``, ``"momentum"``, ``"nesterov"``
+            or ``"adam"``, or the second order solver ``"newton"`` or
+            ``"lbfgs"``.
+        batch_size : int or None (default=None)
+            Number of data points per update, None for full-batch updates.
+        momentum : float (default=0.9)
+            Momentum of the ``"momentum"`` and ``"nesterov"`` update rules.
+        beta_1 : float (default=0.9)
+            Decay rate of the first moment estimate of ``"adam"``.
+        beta_2 : float (default=0.999)
+            Decay rate of the second moment estimate of ``"adam"``.
+        epsilon : float (default=1e-8)
+            Numerical stability constant of ``"adam"``.
+        n_jobs : int or None (default=None)
+            Number of threads used for prediction and of processes used to
+            fit one-vs-rest models, None for one and -1 for one per CPU.
+        multi_class : str (default="auto")
+            ``"auto"``, ``"multinomial"`` (softmax) or ``"ovr"``
+            (one-vs-rest).
+        penalty : str or None (default=None)
+            ``"l2"``, ``"l1"`` or None for no penalty.
+        alpha : float (default=1.0)
+            The strength of the penalty.
+        warm_start : bool (default=False)
+            Whether ``fit`` starts from the ``coef_`` of the previous fit.
+        fit_intercept : bool (default=False)
+            Whether to fit an intercept.
+        standardize : bool (default=False)
+            Whether the solvers work with standardized features.
+        callback : callable or None (default=None)
+            Called as ``callback(iteration, coef, gradient_norm)`` after
+            every iteration, stops the fit if it returns True.
+        early_stopping : bool (default=False)
+            Whether to stop when the validation loss stops improving.
+        validation_fraction : float (default=0.1)
+            The share of the rows held out for early stopping.
+        n_iter_no_change : int (default=5)
+            The number of iterations without improvement before early
+            stopping.
+        dtype : np.float64 or np.float32 (default=np.float64)
+            The floating point type the data is converted to and computed
+            in.
         """
         self.max_iter = max_iter
         self.tol = tol
         self.learning_rate = learning_rate
         self.random_state = random_state
+        self.solver = solver
+        self.batch_size = batch_size
+        self.momentum = momentum
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+        self.n_jobs = n_jobs
+        self.multi_class = multi_class
+        self.penalty = penalty
+        self.alpha = alpha
+        self.warm_start = warm_start
+        self.fit_intercept = fit_intercept
+        self.standardize = standardize
+        self.callback = callback
+        self.early_stopping = early_stopping
+        self.validation_fraction = validation_fraction
+        self.n_iter_no_change = n_iter_no_change
+        self.dtype = dtype
 
     def _has_converged(self, coef, X, y):
         """Whether the gradient descent algorithm has converged.
@@ -283,7 +1421,112 @@ class LogisticRegression(BaseEstimator, ClassifierMixin):
         """
         return np.linalg.norm(logistic_gradient(coef, X, y)) < self.tol
 
-    def _fit_gradient_descent(self, coef, X, y):
+    def _init_optimizer_state(self, coef):
+        """Create the state of the update rule.
+        Parameters
+        ----------
+        coef : np.ndarray(shape=(r,))
+            The initial coefficient vector.
+        Returns
+        -------
+        state : dict
+            The velocity (or first moment estimate for Adam), the second
+            moment estimate, the number of updates done so far and the step
+            of the last update, which is the learning rate or, for Adam, an
+            array with the step of every coefficient.
+        """
+        return {
+            "velocity": np.zeros_like(coef),
+            "second_moment": np.zeros_like(coef),
+            "t": 0,
+            "step": self.learning_rate,
+        }
+
+    def _update(self, coef, gradient, state):
+        r"""Update the coefficients inplace with the chosen update rule.
+        With :math:`\mathbf{g}` the gradient, :math:`\eta` the learning rate
+        and :math:`\mu` the momentum, the update rules are
+          * ``"gd"``: :math:`\mathbf{w} \gets \mathbf{w} - \eta \mathbf{g}`
+          * ``"momentum"``:
+            :math:`\mathbf{v} \gets \mu \mathbf{v} - \eta \mathbf{g}`
+            and :math:`\mathbf{w} \gets \mathbf{w} + \mathbf{v}`
+          * ``"nesterov"``: as momentum, but
+            :math:`\mathbf{w} \gets
+            \mathbf{w} + \mu \mathbf{v} - \eta \mathbf{g}`,
+            which is Nesterov's method written so that the gradient is
+            evaluated at the current coefficients
+          * ``"adam"``: the update of Kingma and Ba (2015), with bias
+            corrected moment estimates. Every coefficient has its own step,
+            which is stored in ``state["step"]`` for the proximal step.
+        Parameters
+        ----------
+        coef : np.ndarray(shape=(r,))
+            The current coefficients, modified inplace.
+        gradient : np.ndarray(shape=(r,))
+            The gradient at ``coef``.
+        state : dict
+            The state from ``_init_optimizer_state``, modified inplace.
+        Returns
+        -------
+        coef : np.ndarray(shape=(r,))
+            The updated coefficients.
+        """
+        velocity = state["velocity"]
+        if self.solver == "gd":
+            coef -= self.learning_rate * gradient
+        elif self.solver == "momentum":
+            velocity *= self.momentum
+            velocity -= self.learning_rate * gradient
+            coef += velocity
+        elif self.solver == "nesterov":
+            velocity *= self.momentum
+            velocity -= self.learning_rate * gradient
+            coef += self.momentum * velocity - self.learning_rate * gradient
+        else:
+            state["t"] += 1
+            second_moment = state["second_moment"]
+            velocity *= self.beta_1
+            velocity += (1 - self.beta_1) * gradient
+            second_moment *= self.beta_2
+            second_moment += (1 - self.beta_2) * gradient ** 2
+            step_size = (
+                self.learning_rate
+                * np.sqrt(1 - self.beta_2 ** state["t"])
+                / (1 - self.beta_1 ** state["t"])
+            )
+            step = state["step"]
+            if np.ndim(step) == 0:
+                step = state["step"] = np.empty_like(coef)
+            np.sqrt(second_moment, out=step)
+            step += self.epsilon
+            np.divide(step_size, step, out=step)
+            coef -= step * velocity
+        return coef
+
+    def _batches(self, n, random_state):
+        """Generate the row indices of the (mini-)batches of one epoch.
+        Parameters
+        ----------
+        n : int
+            The number of data points.
+        random_state : np.random.RandomState
+            Used to shuffle the data points.
+        Yields
+        ------
+        batch : slice or np.ndarray
+            A slice of all rows for full-batch updates, otherwise the sorted
+            row indices of the mini-batch (sorted for faster row gathering).
+        """
+        if self.batch_size is None or self.batch_size >= n:
+            yield slice(None)
+            return
+        order = random_state.permutation(n)
+        for start in range(0, n, self.batch_size):
+            yield np.sort(order[start:start + self.batch_size])
+
+    def _fit_gradient_descent(
+        self, coef, X, y, random_state=None, chunks=None, monitor=None
+    ):
         """Fit the logisitc regression model to the data given initial weights
         Gradient descent works by iteratively applying the following update
         rule
@@ -296,7 +1539,11 @@ class LogisticRegression(BaseEstimator, ClassifierMixin):
         the loss function at iteration k-1.
         The iterative algorithm should be performed for at most
         ``self.max_iter`` iterations, or until the convergence criteria is
-        reached.
+        reached. If ``self.batch_size`` is set, every iteration is an epoch
+        of mini-batch updates and convergence is checked after each epoch.
+        The update rule is chosen with ``self.solver``. With an L1 penalty,
+        every update is followed by a proximal step, see
+        ``_proximal_step``.
         Parameters
         ----------
         coef : np.ndarray(shape=(r,))
@@ -306,90 +1553,1061 @@ class LogisticRegression(BaseEstimator, ClassifierMixin):
             The data matrix
         y : np.ndarray(shape=(n,))
             The target vector
+        random_state : np.random.RandomState or int or None (default=None)
+            Used to shuffle the data points for mini-batch updates.
+        chunks : callable or None (default=None)
+            Function that returns an iterable of (X, y) pairs. If given, the
+            full gradient is summed over these blocks of rows, and ``X`` and
+            ``y`` may be None, in which case only full-batch updates are
+            done.
+        monitor : _ConvergenceMonitor or None (default=None)
+            Records the iterations and may stop the solver early.
         Returns
         -------
         coef : np.ndarray(shape=(n,))
             The logistic regression weights
         """
+        random_state = check_random_state(random_state)
+        if monitor is None:
+            monitor = _ConvergenceMonitor(self)
+        state = self._init_optimizer_state(coef)
+        if chunks is None:
+            chunks = self._single_chunk(X, y)
+        n = None if X is None else X.shape[0]
+        full_batch = (
+            n is None or self.batch_size is None or self.batch_size >= n
+        )
+
+        # Work buffers reused by every gradient computation
+        gradient = np.empty_like(coef)
+        workspace = _Workspace()
+        for i in range(self.max_iter):
+            if not full_batch:
+                for batch in self._batches(n, random_state):
+                    _gradient(
+                        coef, X[batch], y[batch], gradient,
+                        workspace.get(len(batch), *coef.shape[:-1],
+                                      dtype=_working_dtype(X)),
+                    )
+                    # A mini-batch carries its share of the penalty
+                    scale = len(batch) / n
+                    self._add_penalty_gradient(coef, gradient, scale)
+                    coef = self._update(coef, gradient, state)
+                    self._proximal_step(coef, scale, state["step"])
+                monitor.n_iter += 1
+
+            # The full gradient decides convergence, and for full-batch
+            # descent it is also the gradient of the next update, so it is
+            # only computed once per iteration.
+            self._chunk_gradient(coef, chunks, gradient, workspace)
+            optimality = self._optimality(coef, gradient)
+            if monitor.update(coef, optimality) or optimality < self.tol:
+                break
+            if full_batch:
+                coef = self._update(coef, gradient, state)
+                self._proximal_step(coef, step=state["step"])
+                monitor.n_iter += 1
+        return coef
+
+    @staticmethod
+    def _single_chunk(X, y):
+        """Chunk source for a dataset that is in memory.
+        Parameters
+        ----------
+        X : np.ndarray(shape=(n, r))
+        y : np.ndarray(shape=(n,))
+        Returns
+        -------
+        chunks : callable
+            Function that returns an iterable with the single pair (X, y).
+        """
+        return lambda: ((X, y),)
+
+    def _chunk_gradient(self, coef, chunks, out, workspace):
+        """Compute the gradient as the sum of the gradients of all chunks.
+        Parameters
+        ----------
+        coef : np.ndarray(shape=(r,))
+            The weight vector
+        chunks : callable
+            Function that returns an iterable of (X, y) pairs, the blocks
+            of rows of the dataset.
+        out : np.ndarray(shape=(r,))
+            Array to store the gradient in.
+        workspace : _Workspace
+            Provides the work array for ``logistic_gradient`` (or
+            ``softmax_gradient``).
+        Returns
+        -------
+        gradient : np.ndarray(shape=(r,))
+            The gradient, ``out``, including the gradient of an L2 penalty.
+        """
+        chunk_gradient = None
+        for i, (X, y) in enumerate(chunks()):
+            work = workspace.get(
+                X.shape[0], *coef.shape[:-1], dtype=_working_dtype(X)
+            )
+            if i == 0:
+                _gradient(coef, X, y, out, work)
+                continue
+            if chunk_gradient is None:
+                chunk_gradient = np.empty_like(out)
+            out += _gradient(coef, X, y, chunk_gradient, work)
+        return self._add_penalty_gradient(coef, out)
+
+    def _chunk_loss(self, coef, chunks, workspace):
+        """The loss as the sum of the losses of all chunks, plus the L2
+        penalty."""
+        loss = sum(
+            self._data_loss(
+                X, y, coef, workspace.get(
+                    X.shape[0], *coef.shape[:-1], dtype=_working_dtype(X)
+                )
+            )
+            for X, y in chunks()
+        )
+        return loss + self._penalty_value(coef, smooth_only=True)
+
+    def _chunk_hessian(self, coef, chunks):
+        """The Hessian as the sum of the Hessians of all chunks, plus the
+        Hessian of the L2 penalty."""
+        hessian = sum(logistic_hessian(coef, X) for X, y in chunks())
+        if self.penalty == "l2":
+            penalized = np.arange(len(hessian) - self.fit_intercept)
+            hessian[penalized, penalized] += self.alpha
+        return hessian
+
+    def _penalized(self, coef):
+        """View of the penalised coefficients, all but the intercept."""
+        return coef[..., :-1] if self.fit_intercept else coef
+
+    def _penalty_value(self, coef, smooth_only=False):
+        """The value of the penalty, without the L1 penalty if
+        ``smooth_only``."""
+        coef = self._penalized(coef)
+        if self.penalty == "l2":
+            return 0.5 * self.alpha * np.vdot(coef, coef)
+        if self.penalty == "l1" and not smooth_only:
+            return self.alpha * np.abs(coef).sum()
+        return 0.0
+
+    def _add_penalty_gradient(self, coef, gradient, scale=1.0):
+        """Add ``scale`` times the gradient of an L2 penalty to gradient."""
+        if self.penalty == "l2":
+            penalized = self._penalized(gradient)
+            penalized += (scale * self.alpha) * self._penalized(coef)
+        return gradient
+
+    def _proximal_step(self, coef, scale=1.0, step=None):
+        r"""Soft-threshold the coefficients inplace for an L1 penalty.
+        After an update with step :math:`\eta`, the proximal operator of
+        :math:`\eta \alpha ||\mathbf{w}||_1` moves every coefficient
+        :math:`\eta \alpha` towards zero, and sets it to zero if it is
+        closer than that.
+        Parameters
+        ----------
+        coef : np.ndarray(shape=(r,))
+            The coefficients after an update.
+        scale : float (default=1.0)
+            The share of the penalty, less than one for mini-batches.
+        step : float or np.ndarray(shape=(r,)) or None (default=None)
+            The step of the update, per coefficient for Adam. None means
+            ``self.learning_rate``.
+        Returns
+        -------
+        coef : np.ndarray(shape=(r,))
+            The thresholded coefficients, ``coef``.
+        """
+        if self.penalty == "l1":
+            penalized = self._penalized(coef)
+            if step is None:
+                step = self.learning_rate
+            elif np.ndim(step):
+                step = self._penalized(step)
+            threshold = (scale * self.alpha) * step
+            shrunk = np.maximum(np.abs(penalized) - threshold, 0)
+            np.copysign(shrunk, penalized, out=penalized)
+        return coef
+
+    def _optimality(self, coef, gradient):
+        """Convergence measure of the first order solvers.
+        This is the norm of the gradient, or with an L1 penalty, the norm of
+        the gradient mapping ``(coef - prox(coef - lr * gradient)) / lr``,
+        which is zero at the minimum.
+        """
+        if self.penalty != "l1":
+            return np.linalg.norm(gradient)
+        mapped = self._proximal_step(coef - self.learning_rate * gradient)
+        return np.linalg.norm(coef - mapped) / self.learning_rate
+
+    def _fit_newton(self, coef, chunks, monitor=None):
+        r"""Fit the model with Newton's method.
+        Every iteration solves :math:`H \mathbf{s} = \nabla L` for the
+        Newton step :math:`\mathbf{s}`, where :math:`H` is the Hessian
+        (see ``logistic_hessian``), and updates the coefficients as
+        :math:`\mathbf{w} \gets \mathbf{w} - t \mathbf{s}`. The step
+        length :math:`t` starts at 1 and is halved until the loss decreases
+        sufficiently (backtracking line search), which keeps the method
+        stable when the classes are (almost) separable and the Hessian is
+        close to singular. The iterations also stop when the step is
+        smaller than the machine epsilon of ``dtype`` relative to the
+        coefficients. With float32 data, the rounding of the logits can
+        keep the gradient norm above ``tol`` from that point on.
+        Parameters
+        ----------
+        coef : np.ndarray(shape=(r,))
+            The initial guess for the coefficient vector.
+        chunks : callable
+            Function that returns an iterable of (X, y) pairs, the blocks
+            of rows of the dataset.
+        monitor : _ConvergenceMonitor or None (default=None)
+            Records the iterations and may stop the solver early.
+        Returns
+        -------
+        coef : np.ndarray(shape=(r,))
+            The logistic regression weights
+        """
+        if monitor is None:
+            monitor = _ConvergenceMonitor(self)
+        gradient = np.empty_like(coef)
+        workspace = _Workspace()
+        loss = self._chunk_loss(coef, chunks, workspace)
         for i in range(self.max_iter):
-            coef -= self.learning_rate * logistic_gradient(coef, X, y)
-            if self._has_converged(coef, X, y):
+            self._chunk_gradient(coef, chunks, gradient, workspace)
+            gradient_norm = np.linalg.norm(gradient)
+            stop = monitor.update(coef, gradient_norm)
+            if stop or gradient_norm < self.tol:
+                break
+
+            hessian = self._chunk_hessian(coef, chunks)
+            try:
+                step = np.linalg.solve(hessian, gradient)
+            except np.linalg.LinAlgError:
+                step = np.linalg.lstsq(hessian, gradient, rcond=None)[0]
+
+            step_length, decrease = 1.0, 1e-4 * (gradient @ step)
+            while step_length > 1e-10:
+                new_coef = coef - step_length * step
+                new_loss = self._chunk_loss(new_coef, chunks, workspace)
+                if new_loss <= loss - step_length * decrease:
+                    break
+                step_length /= 2
+            else:
+                break
+            # Once the step is below the precision of the working type, the
+            # coefficients that X is multiplied with no longer change
+            converged = np.linalg.norm(coef - new_coef) <= (
+                np.finfo(self.dtype).eps * np.linalg.norm(coef)
+            )
+            coef, loss = new_coef, new_loss
+            monitor.n_iter += 1
+            if converged:
                 break
         return coef
 
+    def _fit_lbfgs(self, coef, chunks, monitor=None):
+        r"""Fit the model with the limited memory BFGS method.
+        This uses the L-BFGS-B implementation of ``scipy.optimize.minimize``
+        with ``logistic_loss`` and ``logistic_gradient``. It stops when the
+        largest element of the gradient is smaller than ``self.tol``, when
+        a step is smaller than the machine epsilon of ``dtype`` relative to
+        the coefficients (see ``_fit_newton``), or after ``self.max_iter``
+        iterations.
+        With an L1 penalty, the coefficients are split as
+        :math:`\mathbf{w} = \mathbf{u} - \mathbf{v}` with
+        :math:`\mathbf{u}, \mathbf{v} \geq 0`, so the penalty is the
+        smooth function :math:`\alpha \sum_j (u_j + v_j)` (without the
+        intercept), and the bounds are handled by L-BFGS-B.
+        Parameters
+        ----------
+        coef : np.ndarray(shape=(r,))
+            The initial guess for the coefficient vector.
+        chunks : callable
+            Function that returns an iterable of (X, y) pairs, the blocks
+            of rows of the dataset.
+        monitor : _ConvergenceMonitor or None (default=None)
+            Records the iterations and may stop the solver early.
+        Returns
+        -------
+        coef : np.ndarray(shape=(r,))
+            The logistic regression weights
+        """
+        if monitor is None:
+            monitor = _ConvergenceMonitor(self)
+        gradient = np.empty_like(coef)
+        workspace = _Workspace()
+
+        # scipy works with flat vectors, so a coefficient matrix is
+        # flattened and reshaped
+        def loss_and_gradient(w):
+            w = w.reshape(coef.shape)
+            self._chunk_gradient(w, chunks, gradient, workspace)
+            return self._chunk_loss(w, chunks, workspace), gradient.flatten()
+
+        x0, bounds, objective = coef.ravel(), None, loss_and_gradient
+        if self.penalty == "l1":
+            size = coef.size
+            weights = np.zeros(coef.shape)
+            self._penalized(weights)[...] = self.alpha
+            weights = np.tile(weights.ravel(), 2)
+
+            def l1_objective(x):
+                loss, w_gradient = loss_and_gradient(x[:size] - x[size:])
+                return (
+                    loss + weights @ x,
+                    np.concatenate([w_gradient, -w_gradient]) + weights,
+                )
+
+            objective = l1_objective
+            x0 = np.concatenate([np.maximum(x0, 0), np.maximum(-x0, 0)])
+            bounds = [(0, None)] * x0.size
+
+        # The line search ends with an evaluation at the new iterate, so
+        # the callback can usually reuse the last gradient
+        last = {}
+        previous = {"x": x0}
+        eps = np.finfo(self.dtype).eps
+
+        def recorded_objective(x):
+            value, x_gradient = objective(x)
+            last.update(x=x.copy(), gradient=x_gradient)
+            return value, x_gradient
+
+        def callback(intermediate_result):
+            monitor.n_iter += 1
+            x = intermediate_result.x
+            if not np.array_equal(x, last["x"]):
+                recorded_objective(x)
+            x_gradient = last["gradient"]
+            w = x
+            if bounds is not None:
+                # The projected gradient, zero where a bound is active
+                x_gradient = np.where((x <= 0) & (x_gradient > 0), 0,
+                                      x_gradient)
+                w = x[:size] - x[size:]
+            if monitor.update(w.reshape(coef.shape),
+                              np.linalg.norm(x_gradient)):
+                raise StopIteration
+            step = np.linalg.norm(x - previous["x"])
+            previous["x"] = x.copy()
+            if step <= eps * np.linalg.norm(x):
+                raise StopIteration
+
+        result = minimize(
+            recorded_objective, x0, jac=True, method="L-BFGS-B",
+            bounds=bounds, callback=callback,
+            # ftol=0 so that only the gradient decides convergence
+            options={"maxiter": self.max_iter, "gtol": self.tol, "ftol": 0},
+        )
+        monitor.n_iter = result.nit
+        if self.penalty == "l1":
+            return (result.x[:size] - result.x[size:]).reshape(coef.shape)
+        return result.x.reshape(coef.shape)
+
+    def _check_solver(self):
+        if self.solver not in self._solvers:
+            raise ValueError(
+                f"Unknown solver {self.solver!r}, use one of {self._solvers}."
+            )
+        if self.penalty not in self._penalties:
+            raise ValueError(
+                f"Unknown penalty {self.penalty!r}, use one of "
+                f"{self._penalties}."
+            )
+        if self.penalty is not None and self.alpha < 0:
+            raise ValueError("The penalty strength alpha must be positive.")
+        if self.penalty == "l1" and self.solver == "newton":
+            raise ValueError(
+                "The newton solver does not support the L1 penalty."
+            )
+        if np.dtype(self.dtype) not in self._dtypes:
+            raise ValueError(
+                f"Unsupported dtype {self.dtype!r}, use float64 or float32."
+            )
+
+    def _initial_coef(self, shape, random_state, parameters=None):
+        """The coefficients the solvers start from, the previous ``coef_``
+        and ``intercept_`` with ``warm_start``, or else random coefficients.
+        ``parameters`` are those of the ``_AffineDesign`` the solvers use.
+        """
+        if self.warm_start and getattr(self, "coef_", None) is not None:
+            coef = _to_design_space(
+                self.coef_, getattr(self, "intercept_", 0.0), parameters
+            )
+            if coef.shape == shape:
+                return np.array(coef, dtype=float)
+        return random_state.standard_normal(shape)
+
+    def _design_parameters(self, chunks):
+        """The parameters of the ``_AffineDesign`` the solvers use in place
+        of X, or None if they use X itself.
+        Parameters
+        ----------
+        chunks : callable
+            Function that returns an iterable of (X, y) pairs, used to
+            compute the column statistics for ``standardize``.
+        Returns
+        -------
+        parameters : dict or None
+        """
+        if not (self.fit_intercept or self.standardize):
+            return None
+        mean = scale = None
+        if self.standardize:
+            mean, scale = _column_stats(chunks)
+            if not self.fit_intercept:
+                # Centering without an intercept would change the model
+                mean = None
+        return {"mean": mean, "scale": scale, "intercept": self.fit_intercept}
+
+    @staticmethod
+    def _check_targets(y):
+        if any((y < 0) | (y > 1)):
+            raise ValueError("Only y-values between 0 and 1 are accepted.")
+
+    def _check_binary(self, method):
+        if self.multi_class != "auto":
+            raise ValueError(
+                f"{method} only supports binary problems, not "
+                f"multi_class={self.multi_class!r}."
+            )
+
+    def _multi_class_mode(self, y):
+        """The kind of model to fit to the targets y.
+        Returns
+        -------
+        mode : str
+            ``"binary"`` if ``multi_class`` is ``"auto"`` and all targets are
+            numbers between 0 and 1, otherwise ``"multinomial"`` or
+            ``"ovr"``.
+        """
+        if self.multi_class not in self._multi_class_modes:
+            raise ValueError(
+                f"Unknown multi_class {self.multi_class!r}, use one of "
+                f"{self._multi_class_modes}."
+            )
+        if self.multi_class != "auto":
+            return self.multi_class
+        if y.dtype.kind in "biuf" and np.all((y >= 0) & (y <= 1)):
+            return "binary"
+        return "multinomial"
+
+    def _fit_one_vs_rest(self, X, y_index, random_state):
+        """Fit one binary model per class, in parallel processes, and set
+        the fitted attributes from the binary models.
+        With ``n_jobs`` processes, X and the class indices are copied once
+        to shared memory, which all workers map, instead of being pickled to
+        every worker (see ``_map_with_shared_arrays``).
+        Parameters
+        ----------
+        X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+            The data matrix
+        y_index : np.ndarray(shape=(n,))
+            The index in ``classes_`` of the class of each data point.
+        random_state : np.random.RandomState
+            Draws the seeds of the binary models.
+        """
+        num_classes = len(self.classes_)
+        params = self.get_params()
+        params.update(multi_class="auto", n_jobs=None)
+        seeds = random_state.randint(np.iinfo(np.int32).max, size=num_classes)
+        all_params = [dict(params, random_state=seed) for seed in seeds]
+        labels = range(num_classes)
+
+        num_processes = min(_num_workers(self.n_jobs), num_classes)
+        tasks = zip(all_params, labels)
+        if num_processes == 1:
+            models = [
+                _fit_binary_problem(X, y_index, *task) for task in tasks
+            ]
+        else:
+            models = _map_with_shared_arrays(
+                _fit_binary_problem, [X, y_index], tasks, num_processes
+            )
+        self.coef_ = np.array([model.coef_ for model in models])
+        self.intercept_ = np.array([model.intercept_ for model in models])
+        self.n_iter_ = np.array([model.n_iter_ for model in models])
+        self.gradient_norms_ = [model.gradient_norms_ for model in models]
+        self.validation_losses_ = None
+        if self.early_stopping:
+            self.validation_losses_ = [
+                model.validation_losses_ for model in models
+            ]
+
+    def _solve(
+        self, coef, chunks, random_state, X=None, y=None, validation=None
+    ):
+        """Run the chosen solver and record its progress in ``n_iter_``,
+        ``gradient_norms_`` and ``validation_losses_``.
+        Parameters
+        ----------
+        coef : np.ndarray(shape=(r,))
+            The initial guess for the coefficient vector.
+        chunks : callable
+            Function that returns an iterable of (X, y) pairs, the blocks
+            of rows of the dataset.
+        random_state : np.random.RandomState
+            Used to shuffle the data points for mini-batch updates.
+        X : np.ndarray(shape=(n, r)) or None (default=None)
+            The data matrix, needed for mini-batch updates.
+        y : np.ndarray(shape=(n,)) or None (default=None)
+            The target vector, needed for mini-batch updates.
+        validation : tuple or None (default=None)
+            The held out (X, y) pair for early stopping.
+        Returns
+        -------
+        coef : np.ndarray(shape=(r,))
+            The logistic regression weights
+        """
+        monitor = _ConvergenceMonitor(self, validation)
+        if self.solver == "newton":
+            coef = self._fit_newton(coef, chunks, monitor)
+        elif self.solver == "lbfgs":
+            coef = self._fit_lbfgs(coef, chunks, monitor)
+        else:
+            coef = self._fit_gradient_descent(
+                coef, X, y, random_state, chunks, monitor
+            )
+        self.n_iter_ = monitor.n_iter
+        self.gradient_norms_ = np.array(monitor.gradient_norms)
+        self.validation_losses_ = None
+        if validation is not None:
+            self.validation_losses_ = np.array(monitor.validation_losses)
+        return monitor.result(coef)
+
+    def _split_validation(self, X, y, random_state):
+        """Hold out a random ``validation_fraction`` of the rows for early
+        stopping.
+        Only the held out rows are copied, the training rows are used
+        through a ``_RowSubset``.
+        Returns
+        -------
+        train : np.ndarray(shape=(n - m,))
+            The sorted indices of the training rows.
+        validation : tuple
+            The held out (X, y) pair of m rows.
+        """
+        n = X.shape[0]
+        num_validation = int(np.ceil(self.validation_fraction * n))
+        if not 0 < num_validation < n:
+            raise ValueError(
+                f"validation_fraction={self.validation_fraction} leaves no "
+                f"training or validation data."
+            )
+        # Sorted indices keep the row gathering sequential
+        order = random_state.permutation(n)
+        train = np.sort(order[num_validation:])
+        validation = np.sort(order[:num_validation])
+        return train, (X[validation], y[validation])
+
     def fit(self, X, y):
         """Fit a logistic regression model to the data.
         Parameters
         ----------
-        X : np.ndarray(shape=(n, r))
+        X : np.ndarray(shape=(n, r)) or scipy.sparse CSR/CSC matrix
             The data matrix
         y : np.ndarray(shape=(n,))
             The observed classes for each data point in X.
         """
+        start_time = time.perf_counter()
         # This function ensures that X and y has acceptable data types
         # and flattens y to have shape (n,) if it has shape (n, 1)
-        X, y = check_X_y(X, y, order="C")
-
-        if any((y < 0) | (y > 1)):
-            raise ValueError("Only y-values between 0 and 1 are accepted.")
+        self._check_solver()
+        X, y = check_X_y(
+            X, y, accept_sparse=self._sparse_formats, order="C",
+            dtype=self.dtype,
+        )
+        self.multi_class_ = self._multi_class_mode(y)
 
         # A random state is a random number generator, akin to those
         # you made in earlier coursework. It has all functions of
         # np.random, but its sequence of random numbers is not affected
         # by calls to np.random.
         random_state = check_random_state(self.random_state)
-        coef = random_state.standard_normal(X.shape[1])
 
-        self.coef_ = self._fit_gradient_descent(coef, X, y)
+        if self.multi_class_ == "ovr":
+            # The binary models handle the intercept and standardization
+            self.classes_, y_index = np.unique(y, return_inverse=True)
+            self._fit_one_vs_rest(X, y_index, random_state)
+            self._design_ = None
+            self._optimizer_state = None
+            self.fit_time_ = time.perf_counter() - start_time
+            return self
+
+        if self.multi_class_ == "binary":
+            self._check_targets(y)
+            targets = y
+        else:
+            if self.solver == "newton":
+                raise ValueError(
+                    "The newton solver does not support multinomial "
+                    "models, use lbfgs."
+                )
+            self.classes_, y_index = np.unique(y, return_inverse=True)
+            targets = self._one_hot(y_index)
+        train, validation = None, None
+        train_X, train_targets = X, targets
+        if self.early_stopping:
+            train, validation = self._split_validation(
+                X, targets, random_state
+            )
+            train_X = _RowSubset(X, train)
+            train_targets = _RowSubset(targets, train)
+
+        # The solvers use the (implicitly) standardized data matrix with a
+        # column of ones for the intercept, see _AffineDesign
+        parameters = self._design_parameters(
+            lambda: iter_chunks(train_X, train_targets, 65536)
+        )
+        design = _to_design(X, parameters)
+        if validation is None:
+            chunks = self._single_chunk(design, targets)
+        else:
+            validation = (_to_design(validation[0], parameters),
+                          validation[1])
+            # The training rows are gathered block by block
+            design = _RowSubset(design, train)
+
+            def chunks():
+                return iter_chunks(design, train_targets, 65536)
+
+        # (r,) for binary models and (k, r) for multinomial models
+        shape = targets.shape[1:] + (design.shape[1],)
+        coef = self._initial_coef(shape, random_state, parameters)
+        coef = self._solve(
+            coef, chunks, random_state, design, train_targets, validation,
+        )
+        self.coef_, self.intercept_ = _to_original_space(coef, parameters)
+        self._design_ = parameters
+        self._optimizer_state = None
+        self.fit_time_ = time.perf_counter() - start_time
+        return self
+
+    def _one_hot(self, y_index):
+        """One-hot encoding of class indices, one column per class."""
+        Y = np.zeros((len(y_index), len(self.classes_)), dtype=self.dtype)
+        Y[np.arange(len(y_index)), y_index] = 1
+        return Y
+
+    def fit_stream(self, data, y=None, chunk_size=65536,
+                   validation_data=None):
+        """Fit the model to data that is read one block of rows at a time.
+        Every pass of the solver over the data accumulates the gradient
+        (and loss and Hessian, if the solver needs them) block by block, so
+        only one block has to be in memory at a time and the data is never
+        copied as a whole. The result is the same as for ``fit``, up to
+        rounding errors. Mini-batch updates (``batch_size``) are not used.
+        Parameters
+        ----------
+        data : np.ndarray(shape=(n, r)), scipy.sparse matrix or callable
+            Either the data matrix, for example a ``numpy.memmap``, which is
+            then split into blocks of ``chunk_size`` rows, or a function
+            that returns a new iterable of (X_chunk, y_chunk) pairs every
+            time it is called (the solvers make several passes).
+        y : np.ndarray(shape=(n,)) or None (default=None)
+            The target vector, must be given if ``data`` is a data matrix.
+        chunk_size : int (default=65536)
+            The number of rows per block when ``data`` is a data matrix.
+        validation_data : tuple or None (default=None)
+            The (X, y) pair the validation loss is computed on, needed for
+            ``early_stopping``.
+        """
+        start_time = time.perf_counter()
+        self._check_solver()
+        self._check_binary("fit_stream")
+        if self.early_stopping and validation_data is None:
+            raise ValueError(
+                "fit_stream needs validation_data for early stopping."
+            )
+        if callable(data):
+            chunks = data
+        else:
+            if y is None:
+                raise ValueError("y must be given with a data matrix.")
+            if data.shape[0] != y.shape[0]:
+                raise ValueError("X and y have different numbers of rows.")
+
+            def chunks():
+                return iter_chunks(data, y, chunk_size)
+
+        def checked_chunks():
+            for X_chunk, y_chunk in chunks():
+                X_chunk, y_chunk = check_X_y(
+                    X_chunk, y_chunk, accept_sparse=self._sparse_formats,
+                    dtype=self.dtype,
+                )
+                self._check_targets(y_chunk)
+                yield X_chunk, y_chunk
+
+        parameters = self._design_parameters(checked_chunks)
+
+        def design_chunks():
+            for X_chunk, y_chunk in checked_chunks():
+                yield _to_design(X_chunk, parameters), y_chunk
+
+        X_first, _ = next(iter(design_chunks()))
+        random_state = check_random_state(self.random_state)
+        coef = self._initial_coef(
+            (X_first.shape[1],), random_state, parameters
+        )
+        del X_first
+
+        validation = None
+        if self.early_stopping:
+            X_val, y_val = check_X_y(
+                *validation_data, accept_sparse=self._sparse_formats,
+                dtype=self.dtype,
+            )
+            validation = (_to_design(X_val, parameters), y_val)
+
+        coef = self._solve(
+            coef, design_chunks, random_state, validation=validation
+        )
+        self.coef_, self.intercept_ = _to_original_space(coef, parameters)
+        self._design_ = parameters
+        self._optimizer_state = None
+        self.fit_time_ = time.perf_counter() - start_time
+        return self
+
+    def partial_fit(self, X, y):
+        """Make one update of the coefficients with a block of data.
+        The gradient of the block is used for one update with the update
+        rule chosen with ``solver``, which must be one of the first order
+        solvers. The state of the update rule (momentum or moment
+        estimates) is kept between calls, so calling ``partial_fit`` with
+        consecutive blocks of a large dataset is stochastic gradient
+        descent with the block as mini-batch. The full penalty is applied
+        in every update.
+        Parameters
+        ----------
+        X : np.ndarray(shape=(n, r))
+            A block of the data matrix
+        y : np.ndarray(shape=(n,))
+            The observed classes for each data point in X.
+        """
+        self._check_solver()
+        X, y = check_X_y(
+            X, y, accept_sparse=self._sparse_formats, dtype=self.dtype
+        )
+        self._check_targets(y)
+        self._check_binary("partial_fit")
+        if self.solver in ("newton", "lbfgs"):
+            raise ValueError(
+                f"partial_fit needs a first order solver, not {self.solver!r}."
+            )
+        if self.standardize:
+            # The column statistics are not known from a single block
+            raise ValueError("partial_fit does not support standardize.")
+
+        parameters = _INTERCEPT_COLUMN if self.fit_intercept else None
+        design = _to_design(X, parameters)
+        if not hasattr(self, "coef_"):
+            random_state = check_random_state(self.random_state)
+            coef = random_state.standard_normal(design.shape[1])
+        else:
+            coef = _to_design_space(
+                self.coef_, getattr(self, "intercept_", 0.0), parameters
+            )
+        if getattr(self, "_optimizer_state", None) is None:
+            self._optimizer_state = self._init_optimizer_state(coef)
+
+        gradient = logistic_gradient(coef, design, y)
+        self._add_penalty_gradient(coef, gradient)
+        coef = self._update(coef, gradient, self._optimizer_state)
+        self._proximal_step(coef, step=self._optimizer_state["step"])
+        self.coef_, self.intercept_ = _to_original_space(coef, parameters)
+        self._design_ = parameters
+        self.n_iter_ = getattr(self, "n_iter_", 0) + 1
         return self
 
+    def regularization_path(self, X, y, alphas):
+        """Fit the model for a sequence of penalty strengths.
+        Every fit starts from the solution for the previous alpha, which is
+        close to the new solution when the alphas are close, so that every
+        fit but the first needs few iterations. The alphas should therefore
+        be sorted, preferably from the strongest penalty, whose solution is
+        close to zero, to the weakest. With ``n_jobs`` processes, the alphas
+        are split into ``n_jobs`` contiguous segments that are fitted in
+        parallel, and only the first fit of every segment is a cold start.
+        X and y are shared with the workers as in ``_fit_one_vs_rest``.
+        The estimator itself is not fitted.
+        Parameters
+        ----------
+        X : np.ndarray(shape=(n, r)) or scipy.sparse CSR/CSC matrix
+            The data matrix
+        y : np.ndarray(shape=(n,))
+            The observed classes for each data point in X.
+        alphas : sequence of float
+            The penalty strengths.
+        Returns
+        -------
+        coefs : np.ndarray(shape=(len(alphas), r))
+            The coefficients for every alpha, shape (len(alphas), k, r) for
+            multiclass models. With ``fit_intercept``, the intercept is
+            appended as an extra coefficient.
+        """
+        self._check_solver()
+        if self.penalty is None:
+            raise ValueError("regularization_path needs a penalty.")
+        X, y = check_X_y(
+            X, y, accept_sparse=self._sparse_formats, order="C",
+            dtype=self.dtype,
+        )
+        alphas = np.asarray(alphas, dtype=float)
+
+        params = self.get_params()
+        params.update(n_jobs=None, warm_start=True)
+        num_processes = min(_num_workers(self.n_jobs), len(alphas))
+        if num_processes <= 1:
+            return _fit_path_segment(X, y, params, alphas)
+
+        tasks = [
+            (params, segment)
+            for segment in np.array_split(alphas, num_processes)
+        ]
+        coefs = _map_with_shared_arrays(
+            _fit_path_segment, [X, y], tasks, num_processes
+        )
+        return np.concatenate(coefs)
+
     def predict_proba(self, X):
         """Estimate the class probabilities.
         This function returns the probability that each datapoint belongs to
-        the positive class.
+        the positive class, or for multiclass models, to each class. Large
+        inputs are scored in blocks of rows, in parallel if ``n_jobs`` is not
+        None, see ``predict_proba_batched``.
         Parameters
         ----------
-        X : np.ndarray
+        X : np.ndarray or scipy.sparse matrix
             The data matrix.
         Returns
         -------
         p : np.ndarray
             A vector of probabilities. The i-th entry is the probability for
-            the i-th data point belonging to the positive class.
+            the i-th data point belonging to the positive class. For
+            multiclass models, a matrix with one column per class.
         """
+        return self.predict_proba_batched(X)
+
+    def _check_fitted(self):
         if not hasattr(self, "coef_"):
             raise NotFittedError("Call fit before prediction")
-        return predict_proba(self.coef_, X)
+
+    def _proba_function(self):
+        """The function that computes the probabilities of the model."""
+        if getattr(self, "multi_class_", "binary") == "ovr":
+            return ovr_predict_proba
+        return predict_proba
+
+    def _prediction_operands(self, X):
+        """The coefficients and data matrix to compute the logits with.
+        A non-zero intercept is appended to the coefficients, and X gets an
+        implicit column of ones (see ``_AffineDesign``).
+        """
+        intercept = getattr(self, "intercept_", 0.0)
+        if not np.any(intercept):
+            return self.coef_, X
+        coef = _to_design_space(self.coef_, intercept, _INTERCEPT_COLUMN)
+        return coef, _to_design(X, _INTERCEPT_COLUMN)
+
+    def predict_proba_batched(self, X, out=None, chunk_size=65536):
+        """Estimate the class probabilities block by block.
+        The rows of X are scored in blocks of ``chunk_size`` rows, on
+        ``n_jobs`` threads (NumPy releases the GIL in the matrix products and
+        the sigmoid). Every block is written straight into its slice of
+        ``out``, so no temporary arrays larger than a block are created.
+        Parameters
+        ----------
+        X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+            The data matrix, may be a ``numpy.memmap``.
+        out : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k)) or None
+            Array to store the probabilities in, for example a writable
+            ``numpy.memmap``. A new array is allocated if None.
+        chunk_size : int (default=65536)
+            The number of rows per block.
+        Returns
+        -------
+        p : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k))
+            The probabilities, ``out`` if it was given.
+        """
+        self._check_fitted()
+        if not hasattr(X, "shape"):
+            X = np.asarray(X)
+        if out is None:
+            out = np.empty(
+                (X.shape[0],) + self.coef_.shape[:-1], dtype=self.dtype
+            )
+        proba = self._proba_function()
+        coef, X = self._prediction_operands(X)
+
+        def score(start):
+            stop = start + chunk_size
+            proba(coef, X[start:stop], out=out[start:stop])
+
+        starts = range(0, X.shape[0], chunk_size)
+        num_threads = min(_num_workers(self.n_jobs), len(starts))
+        if num_threads <= 1:
+            for start in starts:
+                score(start)
+        else:
+            with ThreadPoolExecutor(num_threads) as pool:
+                # list propagates the exceptions raised in the threads
+                list(pool.map(score, starts))
+        return out
+
+    def iter_predict_proba(self, X, chunk_size=65536):
+        """Estimate the class probabilities as a stream of blocks.
+        The blocks of ``chunk_size`` rows are scored on ``n_jobs`` threads
+        and yielded in order. At most two blocks per thread are scored ahead
+        of the consumer, so the memory use does not grow with the size of X.
+        Parameters
+        ----------
+        X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+            The data matrix, may be a ``numpy.memmap``.
+        chunk_size : int (default=65536)
+            The number of rows per block.
+        Yields
+        ------
+        p_chunk : np.ndarray(shape=(chunk_size,))
+            The probabilities of a block of rows, one column per class for
+            multiclass models.
+        """
+        self._check_fitted()
+        if not hasattr(X, "shape"):
+            X = np.asarray(X)
+        coef, X = self._prediction_operands(X)
+        proba = self._proba_function()
+        chunks = (
+            X[start:start + chunk_size]
+            for start in range(0, X.shape[0], chunk_size)
+        )
+
+        num_threads = _num_workers(self.n_jobs)
+        if num_threads == 1:
+            for X_chunk in chunks:
+                yield proba(coef, X_chunk)
+            return
+
+        with ThreadPoolExecutor(num_threads) as pool:
+            pending = deque()
+            for X_chunk in chunks:
+                pending.append(pool.submit(proba, coef, X_chunk))
+                if len(pending) >= 2 * num_threads:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
     def predict_log_proba(self, X):
         """Estimate the class log probabilities.
-        This function returns the probability that each datapoint belongs to
-        the positive class.
+        This function returns the logarithm of the probability that each
+        datapoint belongs to the positive class. It is computed from the
+        logits with ``log_sigmoid``, so it is finite also for saturated
+        predictions.
         Parameters
         ----------
-        X : np.ndarray
+        X : np.ndarray or scipy.sparse matrix
             The data matrix.
         Returns
         -------
         lp : np.ndarray
             A vector of log probabilities. The i-th entry is the log
             probability for the i-th data point belonging to the positive
+            class. For multiclass models, a matrix with one column per
             class.
         """
-        return np.log(self.predict_proba(X))
+        self._check_fitted()
+        if not hasattr(X, "shape"):
+            X = np.asarray(X)
+        coef, X = self._prediction_operands(X)
+        if getattr(self, "multi_class_", "binary") == "ovr":
+            return np.log(ovr_predict_proba(coef, X))
+        return predict_log_proba(coef, X)
+
+    def loss(self, X, y, coef=None, work=None):
+        """The cross entropy loss of the model on a dataset.
+        This is the function the solvers minimise. They evaluate it block
+        by block with ``_data_loss``, which this method also uses.
+        Parameters
+        ----------
+        X : np.ndarray(shape=(n, r)) or scipy.sparse matrix
+            The data matrix.
+        y : np.ndarray(shape=(n,)) or np.ndarray(shape=(n, k))
+            The observed classes for each data point in X. For multiclass
+            models, either the class labels or their one-hot encoding.
+        coef : np.ndarray(shape=(r,)) or None (default=None)
+            The coefficients to evaluate the loss for, used with X as is,
+            or the fitted model if None. The penalty is then computed for
+            the coefficients the solvers work with (of the standardized
+            features, without the intercept).
+        work : np.ndarray(shape=(n,)) or None (default=None)
+            Work array for the logits, shape (n, k) for multiclass models.
+        Returns
+        -------
+        loss : float
+            The cross entropy loss plus the penalty. For one-vs-rest
+            models, the sum of the losses of the binary models.
+        """
+        if coef is None:
+            if not hasattr(self, "coef_"):
+                raise NotFittedError("Call fit before computing the loss")
+            parameters = getattr(self, "_design_", None)
+            if parameters is None and self.fit_intercept:
+                parameters = _INTERCEPT_COLUMN
+            coef = _to_design_space(
+                self.coef_, getattr(self, "intercept_", 0.0), parameters
+            )
+            X = _to_design(X, parameters)
+        return self._data_loss(X, y, coef, work) + self._penalty_value(coef)
 
-    def predict(self, X):
+    def _data_loss(self, X, y, coef, work=None):
+        """The cross entropy loss without the penalty, see ``loss``."""
+        if coef.ndim == 1:
+            return logistic_loss(coef, X, y, work=work)
+
+        if np.ndim(y) == 1:
+            y = self._one_hot(np.searchsorted(self.classes_, y))
+        if self.multi_class_ == "ovr":
+            return sum(
+                logistic_loss(class_coef, X, class_y)
+                for class_coef, class_y in zip(coef, y.T)
+            )
+        return softmax_loss(coef, X, y, work=work)
+
+    def predict(self, X, out=None, chunk_size=65536):
         """Predict whether each data point in X belongs to the positive class
+        For multiclass models, the most probable class is predicted.
         Parameters
         ----------
-        X : np.ndarray
+        X : np.ndarray or scipy.sparse matrix
             Data matrix
+        out : np.ndarray(shape=(n,)) or None (default=None)
+            Array to store the predicted classes in. A new boolean array (or
+            array of class labels for multiclass models) is allocated if
+            None.
+        chunk_size : int (default=65536)
+            The number of rows per block, see ``iter_predict_proba``. Only
+            the probabilities of a few blocks are kept in memory at a time.
         Returns
         -------
         yhat : np.ndarray
             Predicted classes for the input data matrix. len(yhat) == len(X)
         """
-        return self.predict_proba(X) >= 0.5
+        if not hasattr(X, "shape"):
+            X = np.asarray(X)
+        multiclass = getattr(self, "multi_class_", "binary") != "binary"
+        if out is None:
+            dtype = self.classes_.dtype if multiclass else bool
+            out = np.empty(X.shape[0], dtype=dtype)
+
+        start = 0
+        for p in self.iter_predict_proba(X, chunk_size):
+            stop = start + len(p)
+            if multiclass:
+                out[start:stop] = self.classes_[np.argmax(p, axis=1)]
+            else:
+                np.greater_equal(p, 0.5, out=out[start:stop])
+            start = stop
+        return out
 
 
 if __name__ == "__main__":
@@ -3,11 +3,14 @@
 __author__ = 'Johan Stabekk'
 __email__ = 'johansta@nmbu.no'
 
+import tracemalloc
 from contextlib import contextmanager
 from unittest import mock
 
 import pytest
 import numpy as np
+from scipy import sparse
+from sklearn.exceptions import NotFittedError
 
 import logistic_regression as lr
 
@@ -111,4 +114,848 @@ class TestLogisticRegression:
         lr_model = lr.LogisticRegression()
         p = lr.predict_proba(coef, X)
         assert lr_model._has_converged(coef, X, p)
-        assert not lr_model._has_converged(np.array([1, 1000]), X, p)
\ No newline at end of file
+        assert not lr_model._has_converged(np.array([1, 1000]), X, p)
+
+
+@pytest.fixture
+def data():
+    random_state = np.random.RandomState(0)
+    X = random_state.standard_normal((300, 4))
+    y = lr.predict_proba(np.array([1.0, -2.0, 0.5, 0.0]), X) > 0.5
+    return X, y
+
+
+class TestOptimizers:
+    """Tests for the mini-batch and momentum based update rules.
+    """
+
+    @pytest.mark.parametrize(
+        "solver", ["gd", "momentum", "nesterov", "adam"]
+    )
+    @pytest.mark.parametrize("batch_size", [None, 32])
+    def test_solvers_fit_separable_data(self, data, solver, batch_size):
+        X, y = data
+        lr_model = lr.LogisticRegression(
+            max_iter=50, solver=solver, batch_size=batch_size, random_state=1,
+            learning_rate=0.1 if solver == "adam" else 0.01,
+        )
+        lr_model.fit(X, y)
+        assert lr_model.score(X, y) > 0.95
+
+    def test_mini_batches_use_random_state(self, data):
+        X, y = data
+        coefs = [
+            lr.LogisticRegression(
+                max_iter=3, batch_size=16, random_state=seed
+            ).fit(X, y).coef_
+            for seed in [1, 1, 2]
+        ]
+        assert np.array_equal(coefs[0], coefs[1])
+        assert not np.array_equal(coefs[0], coefs[2])
+
+    def test_mini_batches_cover_all_rows(self):
+        lr_model = lr.LogisticRegression(batch_size=4)
+        batches = list(lr_model._batches(10, np.random.RandomState(0)))
+        assert [len(batch) for batch in batches] == [4, 4, 2]
+        assert sorted(np.concatenate(batches)) == list(range(10))
+
+    def test_unknown_solver(self, X, y):
+        with pytest.raises(ValueError):
+            lr.LogisticRegression(solver="sgdx").fit(X, y)
+
+
+def test_gradient_with_work_buffers(coef, X, y):
+    gradient, work = np.empty(2), np.empty(3)
+    result = lr.logistic_gradient(coef, X, y, out=gradient, work=work)
+    assert result is gradient
+    assert np.allclose(gradient, lr.logistic_gradient(coef, X, y))
+    assert np.allclose(work, lr.predict_proba(coef, X) - y)
+
+
+def test_sigmoid_inplace():
+    z = np.array([-2.0, 0.0, 3.0])
+    expected = lr.sigmoid(z)
+    assert lr.sigmoid(z, out=z) is z
+    assert np.allclose(z, expected)
+
+
+def test_gradient_computed_once_per_iteration(X, y):
+    with patch_with_mock(lr, "logistic_gradient"):
+        lr.LogisticRegression(max_iter=5, tol=0).fit(X, y)
+        assert lr.logistic_gradient.call_count == 5
+
+
+@pytest.fixture
+def noisy_data():
+    random_state = np.random.RandomState(0)
+    X = random_state.standard_normal((500, 3))
+    p = lr.predict_proba(np.array([1.0, -2.0, 0.5]), X)
+    y = random_state.uniform(size=500) < p
+    return X, y
+
+
+class TestSecondOrderSolvers:
+    """Tests for the Newton and L-BFGS solvers.
+    """
+
+    @pytest.mark.parametrize("solver", ["newton", "lbfgs"])
+    def test_solution_has_zero_gradient(self, noisy_data, solver):
+        X, y = noisy_data
+        lr_model = lr.LogisticRegression(
+            solver=solver, tol=1e-8, random_state=0
+        ).fit(X, y)
+        assert np.linalg.norm(
+            lr.logistic_gradient(lr_model.coef_, X, y)
+        ) < 1e-5
+
+    def test_newton_converges_in_few_iterations(self, noisy_data):
+        X, y = noisy_data
+        with patch_with_mock(lr, "logistic_hessian"):
+            lr.LogisticRegression(solver="newton", random_state=0).fit(X, y)
+            assert lr.logistic_hessian.call_count < 20
+
+    def test_solvers_agree(self, noisy_data):
+        X, y = noisy_data
+        coefs = [
+            lr.LogisticRegression(solver=solver, tol=1e-8, random_state=0)
+            .fit(X, y).coef_
+            for solver in ["newton", "lbfgs"]
+        ]
+        assert np.allclose(coefs[0], coefs[1], atol=1e-4)
+
+    def test_newton_on_separable_data(self, data):
+        X, y = data
+        lr_model = lr.LogisticRegression(solver="newton", max_iter=30)
+        assert lr_model.fit(X, y).score(X, y) == 1
+        assert np.all(np.isfinite(lr_model.coef_))
+
+
+def test_logistic_loss(coef, X, y):
+    X_small = X / 100
+    p = lr.predict_proba(coef, X_small)
+    expected = -np.sum(y * np.log(p) + (1 - y) * np.log(1 - p))
+    assert abs(lr.logistic_loss(coef, X_small, y) - expected) < 1e-8
+    assert np.isfinite(lr.logistic_loss(np.array([1000, 0]), X, ~y))
+
+
+class TestStreaming:
+    """Tests for fitting with data that is read in blocks.
+    """
+
+    @pytest.fixture
+    def memmap_data(self, noisy_data, tmp_path):
+        X, y = noisy_data
+        X_file = np.memmap(
+            tmp_path / "X.dat", dtype=float, mode="w+", shape=X.shape
+        )
+        X_file[:] = X
+        X_file.flush()
+        X_map = np.memmap(tmp_path / "X.dat", dtype=float, mode="r",
+                          shape=X.shape)
+        return X_map, y.astype(float)
+
+    @pytest.mark.parametrize("solver", ["gd", "newton", "lbfgs"])
+    def test_fit_stream_matches_fit(self, memmap_data, solver):
+        X, y = memmap_data
+        kwargs = dict(solver=solver, tol=1e-8, random_state=0, max_iter=200)
+        coef = lr.LogisticRegression(**kwargs).fit(np.array(X), y).coef_
+        stream_coef = (
+            lr.LogisticRegression(**kwargs).fit_stream(X, y, chunk_size=64)
+            .coef_
+        )
+        assert np.allclose(coef, stream_coef)
+
+    def test_fit_stream_with_chunk_function(self, noisy_data):
+        X, y = noisy_data
+
+        def chunks():
+            return lr.iter_chunks(X, y, 100)
+
+        coef = lr.LogisticRegression(solver="newton").fit(X, y).coef_
+        stream_coef = (
+            lr.LogisticRegression(solver="newton").fit_stream(chunks).coef_
+        )
+        assert np.allclose(coef, stream_coef)
+
+    def test_iter_chunks_does_not_copy(self, memmap_data):
+        X, y = memmap_data
+        for X_chunk, _ in lr.iter_chunks(X, y, 64):
+            assert np.shares_memory(X_chunk, X)
+
+    def test_partial_fit(self, noisy_data):
+        X, y = noisy_data
+        lr_model = lr.LogisticRegression(
+            solver="adam", learning_rate=0.1, random_state=0
+        )
+        lr_model.partial_fit(X[:50], y[:50])
+        loss = lr.logistic_loss(lr_model.coef_, X, y)
+        for epoch in range(20):
+            for X_chunk, y_chunk in lr.iter_chunks(X, y, 50):
+                lr_model.partial_fit(X_chunk, y_chunk)
+        assert lr.logistic_loss(lr_model.coef_, X, y) < loss
+
+    def test_partial_fit_needs_first_order_solver(self, X, y):
+        with pytest.raises(ValueError):
+            lr.LogisticRegression(solver="lbfgs").partial_fit(X, y)
+
+
+class TestSparse:
+    """Tests for scipy.sparse data matrices.
+    """
+
+    @pytest.fixture
+    def sparse_data(self):
+        random_state = np.random.RandomState(0)
+        X = random_state.standard_normal((400, 20))
+        X[random_state.uniform(size=X.shape) < 0.9] = 0
+        p = lr.predict_proba(random_state.standard_normal(20), X)
+        y = random_state.uniform(size=400) < p
+        return X, y
+
+    @pytest.mark.parametrize("format", ["csr", "csc"])
+    def test_functions_accept_sparse(self, sparse_data, format):
+        X, y = sparse_data
+        X_sparse = sparse.csr_matrix(X).asformat(format)
+        coef = np.linspace(-1, 1, 20)
+        gradient, work = np.empty(20), np.empty(400)
+        lr.logistic_gradient(coef, X_sparse, y, gradient, work)
+        assert np.allclose(gradient, lr.logistic_gradient(coef, X, y))
+        assert np.allclose(
+            lr.logistic_hessian(coef, X_sparse), lr.logistic_hessian(coef, X)
+        )
+
+    @pytest.mark.parametrize("solver", ["gd", "adam", "newton", "lbfgs"])
+    @pytest.mark.parametrize("format", ["csr", "csc"])
+    def test_fit_sparse_matches_dense(self, sparse_data, solver, format):
+        X, y = sparse_data
+        X_sparse = sparse.csr_matrix(X).asformat(format)
+        kwargs = dict(solver=solver, random_state=0, max_iter=100,
+                      batch_size=64 if solver == "adam" else None)
+        dense_model = lr.LogisticRegression(**kwargs).fit(X, y)
+        sparse_model = lr.LogisticRegression(**kwargs).fit(X_sparse, y)
+        assert np.allclose(dense_model.coef_, sparse_model.coef_)
+        assert np.allclose(
+            dense_model.predict_proba(X), sparse_model.predict_proba(X_sparse)
+        )
+        assert np.all(dense_model.predict(X) == sparse_model.predict(X_sparse))
+        assert np.allclose(
+            dense_model.predict_log_proba(X),
+            sparse_model.predict_log_proba(X_sparse),
+        )
+
+    def test_fit_stream_sparse(self, sparse_data):
+        X, y = sparse_data
+        coef = lr.LogisticRegression(solver="newton").fit(X, y).coef_
+        stream_coef = (
+            lr.LogisticRegression(solver="newton")
+            .fit_stream(sparse.csr_matrix(X), y, chunk_size=100).coef_
+        )
+        assert np.allclose(coef, stream_coef)
+
+
+def test_stable_sigmoid():
+    z = np.array([-1000.0, -40.0, 0.0, 40.0, 1000.0])
+    with np.errstate(over="raise", invalid="raise", divide="raise"):
+        p = lr.sigmoid(z)
+        log_p = lr.log_sigmoid(z)
+    assert np.allclose(p, [0, np.exp(-40), 0.5, 1, 1], rtol=1e-12, atol=0)
+    assert np.allclose(log_p, [-1000, -40, -np.log(2), 0, 0])
+    out = np.empty_like(z)
+    assert lr.log_sigmoid(z, out=out) is out
+
+
+def test_sigmoid_across_blocks():
+    z = np.linspace(-50, 50, 2 * lr._BLOCK_SIZE + 3).reshape(-1, 1)
+    expected = np.exp(-np.logaddexp(0, -z))
+    assert np.allclose(lr.sigmoid(z), expected, rtol=1e-14, atol=0)
+    assert lr.sigmoid(z, out=z) is z
+    assert np.allclose(z, expected, rtol=1e-14, atol=0)
+
+
+def test_predict_log_proba_is_finite(X, y):
+    lr_model = lr.LogisticRegression(max_iter=0).fit(X, y)
+    lr_model.coef_ = np.array([10.0, -10.0])
+    log_p = lr_model.predict_log_proba(X)
+    assert np.all(np.isfinite(log_p))
+    assert np.allclose(log_p, lr.log_sigmoid(X @ lr_model.coef_))
+
+
+def test_cross_entropy_and_loss_method(coef, X, y):
+    z = (X @ coef).astype(float)
+    loss = lr.logistic_loss(coef, X, y)
+    assert abs(lr.cross_entropy(z, y) - loss) < 1e-8
+    assert abs(lr.cross_entropy(z.copy(), y, work=z) - loss) < 1e-8
+
+    lr_model = lr.LogisticRegression(max_iter=0).fit(X, y)
+    lr_model.coef_ = coef
+    assert lr_model.loss(X, y) == loss
+    assert lr_model.loss(X, y, np.zeros(2), work=np.empty(3)) == (
+        pytest.approx(3 * np.log(2))
+    )
+
+
+class TestBatchedPrediction:
+    """Tests for block-wise and multi-threaded prediction.
+    """
+
+    @pytest.fixture
+    def model(self, noisy_data):
+        X, y = noisy_data
+        return lr.LogisticRegression(solver="newton").fit(X, y)
+
+    @pytest.mark.parametrize("n_jobs", [None, 1, 3, -1])
+    def test_batched_matches_whole(self, model, noisy_data, n_jobs):
+        X, _ = noisy_data
+        model.n_jobs = n_jobs
+        expected = lr.predict_proba(model.coef_, X)
+        assert np.allclose(
+            model.predict_proba_batched(X, chunk_size=64), expected
+        )
+        assert np.allclose(
+            np.concatenate(list(model.iter_predict_proba(X, chunk_size=64))),
+            expected,
+        )
+        assert np.all(model.predict(X, chunk_size=64) == (expected >= 0.5))
+
+    def test_batched_writes_to_memmap(self, model, noisy_data, tmp_path):
+        X, _ = noisy_data
+        model.n_jobs = 2
+        out = np.memmap(tmp_path / "p.dat", dtype=float, mode="w+",
+                        shape=(len(X),))
+        assert model.predict_proba_batched(X, out=out, chunk_size=100) is out
+        assert np.allclose(out, lr.predict_proba(model.coef_, X))
+
+    def test_iter_predict_proba_block_sizes(self, model, noisy_data):
+        X, _ = noisy_data
+        model.n_jobs = 2
+        sizes = [len(p) for p in model.iter_predict_proba(X, chunk_size=120)]
+        assert sizes == [120, 120, 120, 120, 20]
+
+    def test_not_fitted(self, X):
+        with pytest.raises(NotFittedError):
+            lr.LogisticRegression().predict_proba_batched(X)
+
+
+@pytest.fixture
+def multiclass_data():
+    random_state = np.random.RandomState(0)
+    centres = np.array([[3, 0, 0], [0, 3, 0], [0, 0, 3], [-3, -3, -3]])
+    labels = random_state.randint(4, size=400)
+    X = centres[labels] + random_state.standard_normal((400, 3))
+    return X, np.array(["a", "b", "c", "d"])[labels]
+
+
+class TestMulticlass:
+    """Tests for the multinomial and one-vs-rest models.
+    """
+
+    def test_softmax_gradient(self, multiclass_data):
+        X, _ = multiclass_data
+        random_state = np.random.RandomState(1)
+        coef = random_state.standard_normal((4, 3))
+        Y = np.eye(4)[random_state.randint(4, size=len(X))]
+
+        gradient = lr.softmax_gradient(coef, X, Y)
+        numerical = np.empty_like(coef)
+        for index in np.ndindex(*coef.shape):
+            step = np.zeros_like(coef)
+            step[index] = 1e-6
+            numerical[index] = (
+                lr.softmax_loss(coef + step, X, Y)
+                - lr.softmax_loss(coef - step, X, Y)
+            ) / 2e-6
+        assert np.allclose(gradient, numerical, rtol=1e-4, atol=1e-4)
+
+        out, work = np.empty((4, 3)), np.empty((len(X), 4))
+        assert lr.softmax_gradient(coef, X, Y, out, work) is out
+        assert np.allclose(out, gradient)
+
+    def test_softmax_is_stable(self):
+        Z = np.array([[1000.0, 0.0, -1000.0], [1.0, 2.0, 3.0]])
+        P = lr.softmax(Z)
+        assert np.allclose(P.sum(axis=1), 1)
+        assert np.allclose(np.exp(lr.log_softmax(Z)), P)
+        assert np.all(np.isfinite(lr.log_softmax(Z)))
+
+    @pytest.mark.parametrize("solver", ["gd", "adam", "lbfgs"])
+    def test_multinomial(self, multiclass_data, solver):
+        X, y = multiclass_data
+        lr_model = lr.LogisticRegression(
+            solver=solver, learning_rate=0.01, batch_size=64, random_state=0
+        ).fit(X, y)
+        assert lr_model.multi_class_ == "multinomial"
+        assert lr_model.coef_.shape == (4, 3)
+        assert list(lr_model.classes_) == ["a", "b", "c", "d"]
+        assert lr_model.score(X, y) > 0.95
+
+        p = lr_model.predict_proba(X)
+        assert p.shape == (400, 4)
+        assert np.allclose(p.sum(axis=1), 1)
+        assert np.allclose(np.exp(lr_model.predict_log_proba(X)), p)
+
+    def test_multinomial_with_newton_raises(self, multiclass_data):
+        with pytest.raises(ValueError):
+            lr.LogisticRegression(solver="newton").fit(*multiclass_data)
+
+    def test_binary_targets_give_binary_model(self, noisy_data):
+        lr_model = lr.LogisticRegression(solver="newton").fit(*noisy_data)
+        assert lr_model.multi_class_ == "binary"
+        assert lr_model.coef_.shape == (3,)
+
+    @pytest.mark.parametrize("to_sparse", [False, True])
+    def test_one_vs_rest_in_processes(self, multiclass_data, to_sparse):
+        X, y = multiclass_data
+        if to_sparse:
+            X = sparse.csr_matrix(X)
+        kwargs = dict(multi_class="ovr", solver="newton", random_state=0)
+        serial = lr.LogisticRegression(**kwargs).fit(X, y)
+        parallel = lr.LogisticRegression(n_jobs=2, **kwargs).fit(X, y)
+        assert serial.coef_.shape == (4, 3)
+        assert np.allclose(serial.coef_, parallel.coef_)
+        assert parallel.score(X, y) > 0.95
+        assert np.allclose(parallel.predict_proba(X).sum(axis=1), 1)
+
+    def test_one_vs_rest_models_are_binary_fits(self, multiclass_data):
+        X, y = multiclass_data
+        lr_model = lr.LogisticRegression(
+            multi_class="ovr", solver="newton", tol=1e-8
+        ).fit(X, y)
+        for coef, label in zip(lr_model.coef_, lr_model.classes_):
+            binary = lr.LogisticRegression(solver="newton", tol=1e-8)
+            binary.fit(X, (y == label).astype(float))
+            assert np.allclose(coef, binary.coef_, atol=1e-5)
+
+
+class TestPenalties:
+    """Tests for the L2 and L1 penalties, warm starts and regularization
+    paths.
+    """
+
+    @pytest.mark.parametrize("solver", ["gd", "newton", "lbfgs"])
+    def test_l2_solution_has_zero_gradient(self, noisy_data, solver):
+        X, y = noisy_data
+        lr_model = lr.LogisticRegression(
+            solver=solver, penalty="l2", alpha=50, tol=1e-6,
+            learning_rate=1e-3, max_iter=10000, random_state=0,
+        ).fit(X, y)
+        gradient = (
+            lr.logistic_gradient(lr_model.coef_, X, y) + 50 * lr_model.coef_
+        )
+        assert np.linalg.norm(gradient) < 1e-4
+
+    @pytest.mark.parametrize("solver", ["gd", "lbfgs"])
+    def test_l1_solution_is_optimal(self, noisy_data, solver):
+        X, y = noisy_data
+        X = np.hstack([X, np.random.RandomState(1).standard_normal((500, 3))])
+        alpha = 20
+        lr_model = lr.LogisticRegression(
+            solver=solver, penalty="l1", alpha=alpha, tol=1e-6,
+            learning_rate=1e-3, max_iter=20000, random_state=0,
+        ).fit(X, y)
+        coef = lr_model.coef_
+        gradient = lr.logistic_gradient(coef, X, y)
+
+        # Subgradient conditions of the L1 penalised problem
+        nonzero = np.abs(coef) > 1e-6
+        assert np.allclose(gradient[nonzero], -alpha * np.sign(coef[nonzero]),
+                           atol=1e-2)
+        assert np.all(np.abs(gradient[~nonzero]) <= alpha + 1e-2)
+        assert np.sum(~nonzero) > 0
+
+    @pytest.mark.parametrize("alpha", [1, 20])
+    def test_adam_l1_matches_lbfgs(self, noisy_data, alpha):
+        X, y = noisy_data
+        X = np.hstack([X, np.random.RandomState(1).standard_normal((500, 3))])
+        kwargs = dict(penalty="l1", alpha=alpha, max_iter=20000,
+                      random_state=0)
+        lbfgs = lr.LogisticRegression(solver="lbfgs", tol=1e-8, **kwargs)
+        adam = lr.LogisticRegression(
+            solver="adam", tol=1e-6, learning_rate=1e-2, **kwargs
+        )
+        lbfgs.fit(X, y)
+        adam.fit(X, y)
+        assert np.allclose(adam.coef_, lbfgs.coef_, atol=1e-5)
+        assert np.any(adam.coef_ != 0)
+
+    def test_strong_l1_penalty_gives_zero(self, noisy_data):
+        lr_model = lr.LogisticRegression(
+            solver="lbfgs", penalty="l1", alpha=1e4
+        ).fit(*noisy_data)
+        assert np.allclose(lr_model.coef_, 0)
+
+    def test_l1_with_newton_raises(self, noisy_data):
+        with pytest.raises(ValueError):
+            lr.LogisticRegression(solver="newton", penalty="l1").fit(
+                *noisy_data
+            )
+
+    def test_loss_includes_penalty(self, noisy_data):
+        X, y = noisy_data
+        lr_model = lr.LogisticRegression(
+            solver="newton", penalty="l2", alpha=2
+        ).fit(X, y)
+        coef = lr_model.coef_
+        assert lr_model.loss(X, y) == pytest.approx(
+            lr.logistic_loss(coef, X, y) + coef @ coef
+        )
+
+    def test_warm_start(self, noisy_data):
+        X, y = noisy_data
+        lr_model = lr.LogisticRegression(
+            solver="newton", warm_start=True
+        ).fit(X, y)
+        coef = lr_model.coef_
+        lr_model.set_params(max_iter=0).fit(X, y)
+        assert np.all(lr_model.coef_ == coef)
+        assert lr_model.coef_ is not coef
+
+    @pytest.mark.parametrize("n_jobs", [None, 2])
+    def test_regularization_path(self, noisy_data, n_jobs):
+        X, y = noisy_data
+        alphas = np.logspace(2, -2, 8)
+        kwargs = dict(solver="lbfgs", penalty="l2", tol=1e-8, random_state=0)
+        path = lr.LogisticRegression(
+            n_jobs=n_jobs, **kwargs
+        ).regularization_path(X, y, alphas)
+        assert path.shape == (8, 3)
+        for alpha, coef in zip(alphas, path):
+            cold = lr.LogisticRegression(alpha=alpha, **kwargs).fit(X, y)
+            assert np.allclose(coef, cold.coef_, atol=1e-5)
+
+    def test_warm_started_path_needs_fewer_iterations(self, noisy_data):
+        X, y = noisy_data
+        alphas = np.logspace(2, -2, 10)
+        kwargs = dict(solver="newton", penalty="l2", random_state=0)
+        with patch_with_mock(lr, "logistic_hessian"):
+            lr.LogisticRegression(**kwargs).regularization_path(X, y, alphas)
+            warm_calls = lr.logistic_hessian.call_count
+        with patch_with_mock(lr, "logistic_hessian"):
+            for alpha in alphas:
+                lr.LogisticRegression(alpha=alpha, **kwargs).fit(X, y)
+            cold_calls = lr.logistic_hessian.call_count
+        assert warm_calls < cold_calls
+
+
+@pytest.fixture
+def offset_data():
+    random_state = np.random.RandomState(0)
+    X = random_state.standard_normal((500, 3)) * [1, 100, 0.01] + [5, 0, 0]
+    p = lr.predict_proba(np.array([1.0, -0.02, 50.0]), X - [4, 0, 0])
+    y = random_state.uniform(size=500) < p
+    return X, y
+
+
+class TestInterceptAndStandardize:
+    """Tests for ``fit_intercept`` and ``standardize``, which the solvers
+    handle with an implicit design matrix.
+    """
+
+    @pytest.mark.parametrize("to_sparse", [False, True])
+    @pytest.mark.parametrize("block_size", [7, 65536])
+    def test_design_matches_explicit_matrix(self, offset_data, to_sparse,
+                                            block_size, monkeypatch):
+        X, y = offset_data
+        monkeypatch.setattr(lr, "_BLOCK_SIZE", block_size)
+        mean, scale = X.mean(axis=0), X.std(axis=0)
+        explicit = np.column_stack([(X - mean) / scale, np.ones(len(X))])
+        design = lr._AffineDesign(
+            sparse.csr_matrix(X) if to_sparse else X, mean, scale, True
+        )
+        coef = np.array([0.5, -1.0, 2.0, 0.3])
+        assert np.allclose(design @ coef, explicit @ coef)
+        assert np.allclose(
+            lr.logistic_gradient(coef, design, y),
+            lr.logistic_gradient(coef, explicit, y),
+        )
+        assert np.allclose(
+            lr.logistic_hessian(coef, design),
+            lr.logistic_hessian(coef, explicit),
+        )
+        residual = np.ones((len(X), 2))
+        assert np.allclose(design.T @ residual, explicit.T @ residual)
+
+    def test_design_keeps_float32(self, offset_data):
+        X, y = offset_data
+        X = X.astype(np.float32)
+        design = lr._AffineDesign(X, X.mean(axis=0), X.std(axis=0), True)
+        residual = np.ones(len(X), dtype=np.float32)
+        assert (design @ np.ones(4)).dtype == np.float32
+        assert (design.T @ residual).dtype == np.float32
+
+    @pytest.mark.parametrize("solver", ["newton", "lbfgs"])
+    def test_intercept_matches_column_of_ones(self, offset_data, solver):
+        X, y = offset_data
+        X = X[:, [0, 2]]
+        kwargs = dict(solver=solver, tol=1e-8, random_state=0)
+        explicit = lr.LogisticRegression(**kwargs).fit(
+            np.column_stack([X, np.ones(len(X))]), y
+        )
+        lr_model = lr.LogisticRegression(fit_intercept=True, **kwargs).fit(
+            X, y
+        )
+        assert np.allclose(lr_model.coef_, explicit.coef_[:-1], atol=1e-4)
+        assert lr_model.intercept_ == pytest.approx(
+            explicit.coef_[-1], abs=1e-4
+        )
+        assert np.allclose(
+            lr_model.predict_proba(X), explicit.predict_proba(
+                np.column_stack([X, np.ones(len(X))])
+            )
+        )
+
+    @pytest.mark.parametrize("solver", ["newton", "lbfgs"])
+    def test_standardize_gives_same_model(self, offset_data, solver):
+        X, y = offset_data
+        kwargs = dict(
+            solver=solver, tol=1e-8, fit_intercept=True, random_state=0
+        )
+        plain = lr.LogisticRegression(**kwargs).fit(X, y)
+        standardized = lr.LogisticRegression(standardize=True, **kwargs)
+        standardized.fit(X, y)
+        assert np.allclose(
+            standardized.predict_proba(X), plain.predict_proba(X), atol=1e-5
+        )
+
+    def test_standardize_speeds_up_gradient_descent(self, offset_data):
+        X, y = offset_data
+        kwargs = dict(
+            solver="gd", learning_rate=1e-3, max_iter=2000, tol=1e-3,
+            fit_intercept=True, random_state=0,
+        )
+        with patch_with_mock(lr, "logistic_gradient"):
+            lr.LogisticRegression(standardize=True, **kwargs).fit(X, y)
+            standardized_calls = lr.logistic_gradient.call_count
+        with patch_with_mock(lr, "logistic_gradient"):
+            lr.LogisticRegression(**kwargs).fit(X, y)
+            plain_calls = lr.logistic_gradient.call_count
+        assert standardized_calls < plain_calls
+
+    def test_sparse_standardize_matches_dense(self, offset_data):
+        X, y = offset_data
+        X = X.copy()
+        X[np.random.RandomState(1).uniform(size=X.shape) < 0.5] = 0
+        kwargs = dict(solver="lbfgs", tol=1e-8, standardize=True,
+                      fit_intercept=True, random_state=0)
+        dense = lr.LogisticRegression(**kwargs).fit(X, y)
+        with mock.patch.object(
+            sparse.csr_matrix, "toarray", side_effect=AssertionError
+        ):
+            sparse_model = lr.LogisticRegression(**kwargs).fit(
+                sparse.csr_matrix(X), y
+            )
+        assert np.allclose(sparse_model.coef_, dense.coef_, atol=1e-4)
+        assert sparse_model.intercept_ == pytest.approx(
+            dense.intercept_, abs=1e-4
+        )
+
+    def test_fit_stream_matches_fit(self, offset_data):
+        X, y = offset_data
+        kwargs = dict(solver="newton", tol=1e-8, standardize=True,
+                      fit_intercept=True, random_state=0)
+        whole = lr.LogisticRegression(**kwargs).fit(X, y)
+        streamed = lr.LogisticRegression(**kwargs).fit_stream(
+            X, y, chunk_size=64
+        )
+        assert np.allclose(streamed.coef_, whole.coef_, atol=1e-6)
+        assert streamed.intercept_ == pytest.approx(whole.intercept_)
+
+    def test_intercept_is_not_penalized(self, offset_data):
+        X, y = offset_data
+        lr_model = lr.LogisticRegression(
+            solver="lbfgs", penalty="l1", alpha=1e4, fit_intercept=True,
+            standardize=True,
+        ).fit(X, y)
+        assert np.allclose(lr_model.coef_, 0)
+        assert lr_model.intercept_ == pytest.approx(
+            np.log(y.mean() / (1 - y.mean())), abs=1e-4
+        )
+
+    def test_multiclass_intercepts(self, multiclass_data):
+        X, y = multiclass_data
+        X = X + 10
+        for multi_class in ["multinomial", "ovr"]:
+            lr_model = lr.LogisticRegression(
+                solver="lbfgs", multi_class=multi_class, fit_intercept=True,
+                standardize=True, random_state=0,
+            ).fit(X, y)
+            assert lr_model.intercept_.shape == (4,)
+            assert np.mean(lr_model.predict(X) == y) > 0.8
+
+
+class TestConvergenceMonitoring:
+    """Tests for the convergence attributes, callbacks and early stopping.
+    """
+
+    @pytest.mark.parametrize("solver", ["gd", "newton", "lbfgs"])
+    def test_convergence_attributes(self, noisy_data, solver):
+        lr_model = lr.LogisticRegression(
+            solver=solver, learning_rate=1e-3, random_state=0
+        ).fit(*noisy_data)
+        assert 0 < lr_model.n_iter_ < lr_model.max_iter
+        assert len(lr_model.gradient_norms_) >= lr_model.n_iter_
+        # L-BFGS stops on the largest element of the gradient
+        assert lr_model.gradient_norms_[-1] < np.sqrt(3) * lr_model.tol
+        assert lr_model.validation_losses_ is None
+        assert lr_model.fit_time_ > 0
+
+    @pytest.mark.parametrize("solver", ["gd", "newton", "lbfgs"])
+    def test_callback_stops_fit(self, noisy_data, solver):
+        calls = []
+
+        def callback(iteration, coef, gradient_norm):
+            calls.append(iteration)
+            return iteration >= 3
+
+        lr_model = lr.LogisticRegression(
+            solver=solver, tol=0, callback=callback, random_state=0
+        ).fit(*noisy_data)
+        assert lr_model.n_iter_ == 3
+        assert calls[-1] == 3
+
+    def test_early_stopping_keeps_best_coefficients(self):
+        random_state = np.random.RandomState(0)
+        X = random_state.standard_normal((100, 50))
+        y = random_state.uniform(size=100) < lr.sigmoid(X[:, 0])
+        coefs = []
+        lr_model = lr.LogisticRegression(
+            learning_rate=0.1, tol=0, early_stopping=True,
+            n_iter_no_change=3, random_state=0,
+            callback=lambda i, coef, norm: coefs.append(coef.copy()),
+        ).fit(X, y)
+        losses = lr_model.validation_losses_
+        assert lr_model.n_iter_ < lr_model.max_iter
+        best = np.argmin(losses)
+        assert best == len(losses) - 1 - 3
+        assert np.all(lr_model.coef_ == coefs[best])
+
+    @pytest.mark.parametrize("solver", ["gd", "newton", "lbfgs"])
+    def test_early_stopping_stops_at_convergence(self, noisy_data, solver):
+        lr_model = lr.LogisticRegression(
+            solver=solver, learning_rate=1e-3, early_stopping=True,
+            n_iter_no_change=10000, random_state=0,
+        ).fit(*noisy_data)
+        assert lr_model.n_iter_ < lr_model.max_iter
+        assert lr_model.gradient_norms_[-1] < np.sqrt(3) * lr_model.tol
+
+    def test_early_stopping_with_mini_batches(self, noisy_data):
+        lr_model = lr.LogisticRegression(
+            learning_rate=1e-3, batch_size=64, tol=0.1,
+            early_stopping=True, n_iter_no_change=10000, random_state=0,
+        ).fit(*noisy_data)
+        assert lr_model.n_iter_ < lr_model.max_iter
+        assert len(lr_model.validation_losses_) == (
+            len(lr_model.gradient_norms_)
+        )
+
+    def test_fit_stream_early_stopping(self, noisy_data):
+        X, y = noisy_data
+        lr_model = lr.LogisticRegression(
+            solver="newton", early_stopping=True, random_state=0
+        )
+        with pytest.raises(ValueError):
+            lr_model.fit_stream(X, y)
+        lr_model.fit_stream(X[:400], y[:400], validation_data=(X[400:],
+                                                               y[400:]))
+        assert len(lr_model.validation_losses_) == (
+            len(lr_model.gradient_norms_)
+        )
+
+    def test_one_vs_rest_attributes(self, multiclass_data):
+        lr_model = lr.LogisticRegression(
+            solver="newton", multi_class="ovr", early_stopping=True,
+            random_state=0,
+        ).fit(*multiclass_data)
+        assert lr_model.n_iter_.shape == (4,)
+        assert len(lr_model.gradient_norms_) == 4
+        assert len(lr_model.validation_losses_) == 4
+
+
+class TestSinglePrecision:
+    """Tests for ``dtype=np.float32``.
+    """
+
+    @pytest.fixture
+    def float32_data(self, noisy_data):
+        X, y = noisy_data
+        return X.astype(np.float32), y
+
+    @pytest.mark.parametrize("solver", ["gd", "newton", "lbfgs"])
+    def test_matches_double_precision(self, float32_data, solver):
+        X, y = float32_data
+        kwargs = dict(solver=solver, fit_intercept=True, random_state=0)
+        double = lr.LogisticRegression(**kwargs).fit(X, y)
+        single = lr.LogisticRegression(dtype=np.float32, **kwargs).fit(X, y)
+        assert single.coef_.dtype == np.float64
+        assert np.allclose(single.coef_, double.coef_, atol=1e-3)
+        assert single.intercept_ == pytest.approx(double.intercept_,
+                                                  abs=1e-3)
+
+    def test_data_is_not_upcast(self):
+        random_state = np.random.RandomState(0)
+        X = random_state.standard_normal((10000, 50)).astype(np.float32)
+        y = random_state.uniform(size=10000) < lr.sigmoid(X[:, 0])
+        lr_model = lr.LogisticRegression(
+            solver="lbfgs", dtype=np.float32, random_state=0
+        )
+        tracemalloc.start()
+        try:
+            lr_model.fit(X, y)
+            p = lr_model.predict_proba(X)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert p.dtype == np.float32
+        assert peak < X.nbytes / 2
+
+    def test_loss_is_accumulated_in_double(self, float32_data):
+        X, y = float32_data
+        coef = np.array([1.0, -2.0, 0.5])
+        assert lr.logistic_loss(coef, X, y) == pytest.approx(
+            lr.logistic_loss(coef, X.astype(float), y), rel=1e-6
+        )
+
+    @pytest.mark.parametrize("to_matrix", [np.asarray, sparse.csr_matrix])
+    def test_gradient_is_accumulated_in_double(self, float32_data,
+                                               monkeypatch, to_matrix):
+        X, y = float32_data
+        monkeypatch.setattr(lr, "_BLOCK_SIZE", 7)
+        coef = np.array([1.0, -2.0, 0.5])
+        gradient = lr.logistic_gradient(coef, to_matrix(X), y,
+                                        out=np.empty(3))
+        assert np.allclose(
+            gradient, lr.logistic_gradient(coef, X.astype(float), y),
+            rtol=1e-6, atol=0
+        )
+
+    @pytest.mark.parametrize("solver", ["newton", "lbfgs"])
+    def test_stops_at_working_precision(self, float32_data, solver):
+        X, y = float32_data
+        kwargs = dict(solver=solver, tol=0, max_iter=100, random_state=0)
+        double = lr.LogisticRegression(**kwargs).fit(X, y)
+        single = lr.LogisticRegression(dtype=np.float32, **kwargs).fit(X, y)
+        assert single.n_iter_ < single.max_iter
+        assert np.allclose(single.coef_, double.coef_, atol=1e-3)
+
+    def test_unsupported_dtype(self, X, y):
+        with pytest.raises(ValueError):
+            lr.LogisticRegression(dtype=np.int32).fit(X, y)
+
+
+def test_benchmark_suite(tmp_path):
+    import benchmarks
+
+    results = benchmarks.run_benchmarks(
+        num_samples=[500], num_features=[5, 10], max_data_bytes=500 * 5 * 8
+    )
+    assert results["skipped"] == ["n=500,r=10"]
+    names = {"logistic_gradient", "sklearn", *benchmarks.SOLVERS}
+    assert set(results["benchmarks"]) == {f"n=500,r=5/{n}" for n in names}
+    for name in ["lbfgs", "newton", "sklearn"]:
+        result = results["benchmarks"][f"n=500,r=5/{name}"]
+        assert result["converged"]
+        assert result["predictions_per_second"] > 0
+
+    filename = str(tmp_path / "baseline.json")
+    benchmarks.write_baseline(results, filename)
+    ratios = benchmarks.compare_to_baseline(results, filename)
+    assert all(ratio == 1 for ratio in ratios.values())